@@ -5,17 +5,20 @@
 from saleae.analyzers import HighLevelAnalyzer, AnalyzerFrame, StringSetting, NumberSetting, ChoicesSetting
 import ctypes
 import os
+import sys
 from enum import Enum
-from lr_gnss import LrGnss
-from lr_wifi import LrWifi
-from lr_modem_e import LrModemE, modem_e_rc_readback, modem_e_rc_crc_ok, modem_e_resp_crc_note, modem_e_orphan_read, crc8 as modem_e_crc8, rcDict as modem_e_rc_dict
+from lr_modem_e_frame import modem_e_rc_readback, modem_e_rc_crc_ok, modem_e_resp_crc_note, modem_e_orphan_read, crc_ok as modem_e_crc_ok, rcDict as modem_e_rc_dict
+from lr_cache import DecodeCache, cache_size, stateAttrs, checkpointAttrs, CACHE_MAX_XFER
+from lr_state import DecodeState
+import lr_profile
+from lr_fields import (u16, u24, u32, u64, s8, u32le, setRxTxFields, setRfFrequencyFields, setDioIrqParamsFields,
+                       modulationFskFields, modulationLoraFields, modulationBpskFields, packetFskFields,
+                       packetLoraFields, packetBpskFields, statsFskFields, statsLoraFields, rxBufferStatusFields,
+                       packetStatusLoraFields)
+from lr_dispatch import compile_group, load_group, lazyGroups, opcode_key, need_len, short_frame, short_response, fallbackTable, GROUP_SYSTEM, GROUP_MODEM_E, KIND_WRITE_NO_RC, FALLBACK_IRQ_READ, FALLBACK_ORPHAN_READ, FALLBACK_SHORT_READ, FALLBACK_RC_READBACK, FALLBACK_UNKNOWN_RESPONSE
 c_uint8 = ctypes.c_uint8
 c_uint32 = ctypes.c_uint32
 
-lr_gnss = LrGnss()
-lr_wifi = LrWifi()
-lr_modem_e = LrModemE()
-
 class PacketType(Enum): # lr11xx_radio_pkt_type_t
     NONE = 0
     FSK = 1
@@ -76,6 +79,41 @@ class IrqFlags( ctypes.Union ):
         ("asWord", c_uint32    )
     ]
 
+# IRQ word decoding, one table per byte of the word: entry b is the names of the
+# IrqFlags fields starting in that byte which read as 1 when the byte is b.  a
+# multi-bit reserved field is only named when its value is exactly 1.
+def irqByteTable(k):
+    table = []
+    for b in range(256):
+        f = IrqFlags()
+        f.asWord = b << (8 * k)
+        names = ''
+        offset = 0
+        for name, ctype, width in IrqFlags_bits._fields_:
+            if offset // 8 == k and getattr(f, name) == 1:
+                names = names + name + ' '
+            offset += width
+        table.append(names)
+    return tuple(table)
+
+irqByteNames = ()  # the four tables, built on the first decodeIrqs
+irqFlagsMask = 0x03f80ffc  # the single-bit flags, bits 2-11 and 19-25
+
+def decodeIrqs(word):
+    # returns (text, mask of the flags set)
+    global irqByteNames
+    if not irqByteNames:
+        irqByteNames = tuple(irqByteTable(k) for k in range(4))
+    b1 = (word >> 8) & 0xff
+    b2 = (word >> 16) & 0xff
+    if b2 & 0x07 and b1 >> 4 == 1:
+        # res12_18 runs on into byte 2, so it isn't 1 after all
+        b1 &= 0x0f
+    mystr = irqByteNames[0][word & 0xff] + irqByteNames[1][b1] + irqByteNames[2][b2] + irqByteNames[3][(word >> 24) & 0xff]
+    if len(mystr) > 80: # too much text for one line (TODO find newline character)
+        mystr = hex(word)
+    return mystr, word & irqFlagsMask
+
 class Stat1_bits( ctypes.LittleEndianStructure ):
     _fields_ = [
                 ("intActive",      c_uint8, 1 ),  # 
@@ -104,6 +142,73 @@ class Stat2( ctypes.Union ):
                  ("asByte", c_uint8    )
                 ]
 
+def stat1String(byte):
+    stat1 = Stat1()
+    stat1.asByte = byte
+    if stat1.cmdStatus == 0:
+        cmdStatStr = 'CMD_FAIL'
+    elif stat1.cmdStatus == 1:
+        cmdStatStr = 'CMD_PERR'
+    elif stat1.cmdStatus == 2:
+        cmdStatStr = 'CMD_OK'
+    elif stat1.cmdStatus == 3:
+        cmdStatStr = 'CMD_DAT'
+    else:
+        cmdStatStr = '?' + str(stat1.cmdStatus) + '?'
+
+    if stat1.intActive == 1:
+        my_str = 'intActive  '
+    else:
+        my_str = ''
+    return my_str + cmdStatStr
+
+def stat2String(byte):
+    # appended to the stat1 string for the full status
+    stat2 = Stat2()
+    stat2.asByte = byte
+    if stat2.resetStatus == 0:
+        resetStr = 'no-reset'
+    elif stat2.resetStatus == 1:
+        resetStr = 'analog-reset'
+    elif stat2.resetStatus == 2:
+        resetStr = 'NRESET-pin'
+    elif stat2.resetStatus == 3:
+        resetStr = 'system-reset'
+    elif stat2.resetStatus == 4:
+        resetStr = 'watchdog-reset'
+    elif stat2.resetStatus == 5:
+        resetStr = 'nSS-wakeup'
+    elif stat2.resetStatus == 6:
+        resetStr = 'RTC-restart'
+    else:
+        resetStr = '?' + str(stat2.resetStatus) + '?'
+
+    if stat2.chipMode == 0:
+        cmStr = 'sleep'
+    elif stat2.chipMode == 1:
+        cmStr = 'STBY_RC'
+    elif stat2.chipMode == 2:
+        cmStr = 'STBY_XOSC'
+    elif stat2.chipMode == 3:
+        cmStr = 'FS'
+    elif stat2.chipMode == 4:
+        cmStr = 'RX'
+    elif stat2.chipMode == 5:
+        cmStr = 'TX'
+    elif stat2.chipMode == 6:
+        cmStr = 'sniff'
+    else:
+        cmStr = '?' + str(stat2.chipMode) + '?'
+
+    my_str = ' ' + resetStr + '  ' + cmStr
+    if stat2.bootLoader == 0:
+        my_str = my_str + ' BOOT'
+    return my_str
+
+# parseStatus runs on nearly every transaction: decode each possible stat byte once
+stat1Strings = tuple(stat1String(b) for b in range(256))
+stat2Strings = tuple(stat2String(b) for b in range(256))
+
 class SleepConfig_bits( ctypes.LittleEndianStructure ):
     _fields_ = [
                 ("retention", c_uint8, 1 ),  #
@@ -241,133 +346,27 @@ class Hla(HighLevelAnalyzer):
     }
 
     def parseStatus(self, half):
-        stat1 = Stat1()
-        stat1.asByte = self.ba_miso[0]
-        if stat1.cmdStatus == 0:
-            cmdStatStr = 'CMD_FAIL'
-        elif stat1.cmdStatus == 1:
-            cmdStatStr = 'CMD_PERR'
-        elif stat1.cmdStatus == 2:
-            cmdStatStr = 'CMD_OK'
-        elif stat1.cmdStatus == 3:
-            cmdStatStr = 'CMD_DAT'
-        else:
-            cmdStatStr = '?' + str(stat1.cmdStatus) + '?'
-
-        if stat1.intActive == 1:
-            my_str = 'intActive  '
-        else:
-            my_str = ''
-
-        my_str = my_str + cmdStatStr
         if half == 1:
-            return my_str
-
-        stat2 = Stat2()
-        stat2.asByte = self.ba_miso[1]
-        if stat2.resetStatus == 0:
-            resetStr = 'no-reset'
-        elif stat2.resetStatus == 1:
-            resetStr = 'analog-reset'
-        elif stat2.resetStatus == 2:
-            resetStr = 'NRESET-pin'
-        elif stat2.resetStatus == 3:
-            resetStr = 'system-reset'
-        elif stat2.resetStatus == 4:
-            resetStr = 'watchdog-reset'
-        elif stat2.resetStatus == 5:
-            resetStr = 'nSS-wakeup'
-        elif stat2.resetStatus == 6:
-            resetStr = 'RTC-restart'
-        else:
-            resetStr = '?' + str(stat2.resetStatus) + '?'
-
-        if stat2.chipMode == 0:
-            cmStr = 'sleep'
-        elif stat2.chipMode == 1:
-            cmStr = 'STBY_RC'
-        elif stat2.chipMode == 2:
-            cmStr = 'STBY_XOSC'
-        elif stat2.chipMode == 3:
-            cmStr = 'FS'
-        elif stat2.chipMode == 4:
-            cmStr = 'RX'
-        elif stat2.chipMode == 5:
-            cmStr = 'TX'
-        elif stat2.chipMode == 6:
-            cmStr = 'sniff'
-        else:
-            cmStr = '?' + str(stat2.chipMode) + '?'
-
-        my_str = my_str + ' ' + resetStr + '  ' + cmStr 
-        if stat2.bootLoader == 0:
-            my_str = my_str + ' BOOT'
-        return my_str
+            return stat1Strings[self.ba_miso[0]]
+        return stat1Strings[self.ba_miso[0]] + stat2Strings[self.ba_miso[1]]
 
     def parseIrqs(self, word):
-        f = IrqFlags()
-        f.asWord = word
-        mystr = ''
-        if f.rfu01 == 1:
-            mystr = mystr + 'rfu01 '
-        if f.TxDone == 1:
-            mystr = mystr + 'TxDone '
-        if f.RxDone == 1:
-            mystr = mystr + 'RxDone '
-        if f.PreambleDetected == 1:
-            mystr = mystr + 'PreambleDetected '
-        if f.SyncWordValid == 1:
-            mystr = mystr + 'SyncWordValid '
-        if f.HeaderErr == 1:
-            mystr = mystr + 'HeaderErr '
-        if f.Err == 1:
-            mystr = mystr + 'Err '
-        if f.CadDone == 1:
-            mystr = mystr + 'CadDone '
-        if f.CadDetected == 1:
-            mystr = mystr + 'CadDetected '
-        if f.Timeout == 1:
-            mystr = mystr + 'Timeout '
-        if f.LrFhssHop == 1:
-            mystr = mystr + 'LrFhssHop '
-        if f.res12_18 == 1:
-            mystr = mystr + 'res12_18 '
-        if f.GNSSDone == 1:
-            mystr = mystr + 'GNSSDone '
-        if f.WifiDone == 1:
-            mystr = mystr + 'WifiDone '
-        if f.LBD == 1:
-            mystr = mystr + 'LBD '
-        if f.CmdError == 1:
-            mystr = mystr + 'CmdError '
-        if f.Error == 1:
-            mystr = mystr + 'Error '
-        if f.FskLenError == 1:
-            mystr = mystr + 'FskLenError '
-        if f.FskAddrError == 1:
-            mystr = mystr + 'FskAddrError '
-        if f.rfu == 1:
-            mystr = mystr + 'rfu '
-
-        if len(mystr) > 80: # too much text for one line (TODO find newline character)
-            return hex(f.asWord)
-        else:
-            return mystr
+        return decodeIrqs(word)[0]
 
     def GetRxBufferStatus(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'GetRxBufferStatus'
 
     def GetPacketStatus(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'GetPacketStatus'
 
     def GetRssiInst(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'GetRssiInst'
 
     def SetGfskSyncWord(self):
-        syncWord = int.from_bytes(bytearray(self.ba_mosi[2:10]), 'big')
+        syncWord = u64(self.ba_mosi, 2)
         return 'SetGfskSyncWord ' + hex(syncWord)
 
     def SetLoRaPublicNetwork(self):
@@ -376,7 +375,8 @@ class Hla(HighLevelAnalyzer):
         return 'SetLoRaPublicNetwork ' + ntDict.get(self.ba_mosi[2], hex(self.ba_mosi[2])+'?')
 
     def SetRx(self):
-        timeout = int.from_bytes(bytearray(self.ba_mosi[2:5]), 'big')
+        hi, lo = setRxTxFields(self.ba_mosi)
+        timeout = hi << 16 | lo
         if timeout == 0xffffff:
             _str = 'continuous'
         elif timeout == 0:
@@ -387,7 +387,8 @@ class Hla(HighLevelAnalyzer):
         return 'SetRx ' + _str
 
     def SetTx(self):
-        timeout = int.from_bytes(bytearray(self.ba_mosi[2:5]), 'big')
+        hi, lo = setRxTxFields(self.ba_mosi)
+        timeout = hi << 16 | lo
         _str = ''
         if timeout != 0:
             us = timeout * .03052
@@ -395,7 +396,7 @@ class Hla(HighLevelAnalyzer):
         return 'SetTx ' + _str
 
     def SetRfFrequency(self):
-        hz = int.from_bytes(bytearray(self.ba_mosi[2:6]), 'big')
+        hz, = setRfFrequencyFields(self.ba_mosi)
         return 'SetRfFrequency %.3f' % (hz / 1000000) + 'MHz'
 
     def AutoTxRx(self):
@@ -405,9 +406,9 @@ class Hla(HighLevelAnalyzer):
             2: 'STANDBY_XOSC',
             3: 'FS',
         }
-        delay = int.from_bytes(bytearray(self.ba_mosi[2:5]), 'big')
+        delay = u24(self.ba_mosi, 2)
         intermediary_mode = self.ba_mosi[5] # lr11xx_radio_intermediary_mode_t
-        timeout = int.from_bytes(bytearray(self.ba_mosi[6:9]), 'big')
+        timeout = u24(self.ba_mosi, 6)
         return 'AutoTxRx delay ' + str(delay) + ', intermediary ' + im.get(intermediary_mode, hex(intermediary_mode)+'?') + ', timeout ' + str(timeout)
 
     def SetSleep(self):
@@ -437,28 +438,28 @@ class Hla(HighLevelAnalyzer):
         return 'GetStatus'
 
     def GetVersion(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'GetVersion (request)'
 
     def WriteRegMem32(self):
-        addr = int.from_bytes(bytearray(self.ba_mosi[2:6]), 'big')
+        addr = u32(self.ba_mosi, 2)
         _len = len(self.ba_mosi) - 6 # two byte command, four byte address
         return 'WriteRegMem32 '+ hex(addr)+', ' + str(_len) + ' data bytes'
 
     def WriteRegMem8(self):
-        addr = int.from_bytes(bytearray(self.ba_mosi[2:6]), 'big')
+        addr = u32(self.ba_mosi, 2)
         _len = len(self.ba_mosi) - 6 # two byte command, four byte address
         return 'WriteRegMem8 '+ hex(addr)+', ' + str(_len) + ' data bytes'
 
     def ReadRegMem32(self):
-        self.next_transfer_response = 1
-        addr = int.from_bytes(bytearray(self.ba_mosi[2:6]), 'big')
+        self.state.next_transfer_response = 1
+        addr = u32(self.ba_mosi, 2)
         l = self.ba_mosi[6]
         return 'ReadRegMem32 ' + hex(addr) + ', ' + str(l);
 
     def ReadRegMem8(self):
-        self.next_transfer_response = 1
-        addr = int.from_bytes(bytearray(self.ba_mosi[2:6]), 'big')
+        self.state.next_transfer_response = 1
+        addr = u32(self.ba_mosi, 2)
         l = self.ba_mosi[6]
         return 'ReadRegMem8 ' + hex(addr) + ', ' + str(l);
 
@@ -466,7 +467,7 @@ class Hla(HighLevelAnalyzer):
         return 'ClearRxBuffer'
 
     def ReadBuffer8(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         offset = self.ba_mosi[2]
         Len = self.ba_mosi[3]
         return 'ReadBuffer8 ' + str(Len) + 'bytes at ' + hex(offset)
@@ -475,13 +476,13 @@ class Hla(HighLevelAnalyzer):
         return 'WriteBuffer8 ' + str(len(self.ba_mosi)-2)
 
     def WriteRegMemMask32(self):
-        addr = int.from_bytes(bytearray(self.ba_mosi[2:6]), 'big')
-        mask = int.from_bytes(bytearray(self.ba_mosi[6:10]), 'big')
-        data = int.from_bytes(bytearray(self.ba_mosi[10:14]), 'big')
+        addr = u32(self.ba_mosi, 2)
+        mask = u32(self.ba_mosi, 6)
+        data = u32(self.ba_mosi, 10)
         return 'WriteRegMemMask32 ' + hex(addr) + ', ' + hex(mask) + ', ' + hex(data)
 
     def GetErrors(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'GetErrors (request)'
 
     def ClearErrors(self):
@@ -516,18 +517,18 @@ class Hla(HighLevelAnalyzer):
         return 'SetRegMode ' + my_str
 
     def ClearIrq(self):
-        return 'ClearIrq ' + self.parseIrqs(int.from_bytes(bytearray(self.ba_mosi[2:6]), 'big'))
+        return 'ClearIrq ' + self.parseIrqs(u32(self.ba_mosi, 2))
 
     def GetIrqStatus(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'GetIrqStatus (request)'
 
     def ResponseGetIrqStatus(self):
         # MODEM_E_SYSTEM_GET_IRQ_OC response is modem-e framed: [RC, irq31..0, CRC]
-        if self.ba_miso[0] != 0 and modem_e_rc_crc_ok(self.ba_miso):
+        if self.ba_miso[0] != 0 and self.modem_e_rc_crc_ok(self.ba_miso):
             # error frame: only [RC, CRC] are valid, no IRQ data follows
             return 'GetIrqStatus RC=' + modem_e_rc_dict.get(self.ba_miso[0], hex(self.ba_miso[0]) + '?')
-        return 'GetIrqStatus ' + self.parseIrqs(int.from_bytes(bytearray(self.ba_miso[1:5]), 'big'))
+        return 'GetIrqStatus ' + self.parseIrqs(u32(self.ba_miso, 1))
 
     def CalibImage(self):
         freq1 = self.ba_mosi[2]
@@ -570,8 +571,7 @@ class Hla(HighLevelAnalyzer):
         return f'SetDioAsRfSwitch enable=0x{enable:02x} standby=0x{standby:02x} rx=0x{rx:02x} tx=0x{tx:02x} tx_hp=0x{tx_hp:02x} tx_hf=0x{tx_hf:02x} gnss=0x{gnss:02x} wifi=0x{wifi:02x}'
 
     def SetDioIrqParams(self):
-        irq1 = int.from_bytes(bytearray(self.ba_mosi[2:6]), 'big')
-        irq2 = int.from_bytes(bytearray(self.ba_mosi[6:10]), 'big')
+        irq1, irq2 = setDioIrqParamsFields(self.ba_mosi)
         return 'SetDioIrqParams ' + hex(irq1) + ', ' + hex(irq2)
 
     def ConfigLfClock(self):
@@ -593,7 +593,7 @@ class Hla(HighLevelAnalyzer):
 
     def SetTcxoMode(self):
         tune = self.ba_mosi[2]
-        delay = int.from_bytes(bytearray(self.ba_mosi[3:6]), 'big')
+        delay = u24(self.ba_mosi, 3)
         volts = self.tuneDict[tune]
         return 'SetTcxoMode ' + str(volts) + 'v %.3f' % (delay * 0.03052) + 'ms'
 
@@ -613,11 +613,11 @@ class Hla(HighLevelAnalyzer):
         return self._reboot_str('BootloaderReboot')
 
     def GetVbat(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'GetVbat (request)'
 
     def GetTemp(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'GetTemp (request)'
 
     def SetSleep(self):
@@ -628,7 +628,7 @@ class Hla(HighLevelAnalyzer):
             my_str = my_str + 'retention '
         if cfg.wakeup == 1:
             my_str = my_str + 'wakeup '
-        sleepTime = int.from_bytes(bytearray(self.ba_mosi[3:7]), 'big')
+        sleepTime = u32(self.ba_mosi, 3)
         my_str = my_str + ' %.3f' % (sleepTime * .03052) + 'ms'
         return my_str
 
@@ -646,32 +646,32 @@ class Hla(HighLevelAnalyzer):
         return 'SetFs'
 
     def GetRandomNumber(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'GetRandomNumber (request)'
 
     def EraseFlash(self):
         return 'EraseFlash'
 
     def WriteFlashEncrypted(self):
-        offset = int.from_bytes(bytearray(self.ba_mosi[2:6]), 'big')
+        offset = u32(self.ba_mosi, 2)
         length_bytes = len(self.ba_mosi) - 6
         length_words = length_bytes // 4
         return f'WriteFlashEncrypted offset=0x{offset:08x} length={length_words} words ({length_bytes} bytes)'
 
     def GetHash(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'GetHash (request)'
 
     def GetPin(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'GetPin (request)'
 
     def ReadChipEui(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'ReadChipEui (request)'
 
     def ReadJoinEui(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'ReadJoinEui (request)'
 
     def EraseInfoPage(self):
@@ -682,32 +682,32 @@ class Hla(HighLevelAnalyzer):
     def WriteInfoPage(self):
         ipDict = { 0: 'INFOPAGE_0', 1: 'INFOPAGE_1' }
         infopage_id = self.ba_mosi[2]
-        address = int.from_bytes(bytearray(self.ba_mosi[3:5]), 'big')
+        address = u16(self.ba_mosi, 3)
         length_bytes = len(self.ba_mosi) - 5
         length_words = length_bytes // 4
         return f'WriteInfoPage {ipDict.get(infopage_id, hex(infopage_id)+"?")} address=0x{address:04x} length={length_words} words ({length_bytes} bytes)'
 
     def ReadInfoPage(self):
         ipDict = { 0: 'INFOPAGE_0', 1: 'INFOPAGE_1' }
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         infopage_id = self.ba_mosi[2] # lr11xx_system_infopage_id_t
-        address = int.from_bytes(bytearray(self.ba_mosi[3:5]), 'big')
+        address = u16(self.ba_mosi, 3)
         length = self.ba_mosi[5]
         return 'ReadInfoPage infopage_id ' + ipDict.get(infopage_id, hex(infopage_id)+'?') + ', address ' + hex(address) + ', length ' + str(length)
 
     def GetChipEui(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'GetChipEui (request)'
 
     def GetSemtechJoinEui(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'GetSemtechJoinEui (request)'
 
     def DeriveRootKeysAndGetPin(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         if len(self.ba_mosi) > 2:
-            dev_eui = int.from_bytes(bytearray(self.ba_miso[2:10]), 'big')
-            join_eui = int.from_bytes(bytearray(self.ba_miso[10:18]), 'big')
+            dev_eui = int.from_bytes(self.ba_miso[2:10], 'big')
+            join_eui = int.from_bytes(self.ba_miso[10:18], 'big')
             _str = 'dev_eui ' + hex(dev_eui) + ', join_eui ' + hex(join_eui)
         else:
             _str = '(request)'
@@ -731,11 +731,11 @@ class Hla(HighLevelAnalyzer):
         return 'ResetStats'
 
     def GetStats(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'GetStats (request)'
 
     def GetPacketType(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'GetPacketType (request)'
 
     def SetCadParams(self):
@@ -752,7 +752,7 @@ class Hla(HighLevelAnalyzer):
         else:
             cadStr = '?' + hex(ce) + '?'
         my_str = my_str + ' exit:' + cadStr
-        cadTimeout = int.from_bytes(bytearray(self.ba_mosi[6:8]), 'big')
+        cadTimeout = u16(self.ba_mosi, 6)
         my_str = my_str + ' ' + hex(cadTimeout)
         return 'SetCadParams ' + my_str
 
@@ -776,17 +776,13 @@ class Hla(HighLevelAnalyzer):
     }
 
     def SetPacketType(self):
-        self.pt = PacketType(self.ba_mosi[2])
-        return 'SetPacketType ' + self.pt.name
+        self.state.pt = PacketType(self.ba_mosi[2])
+        return 'SetPacketType ' + self.state.pt.name
 
     def SetModulationParams(self):
-        if self.pt == PacketType.FSK:
-            _len = len(self.ba_mosi)
-            if _len < 12:
-                return 'SetModulationParams error, need 12 mosi bytes, have ' + str(_len)
-            br = int.from_bytes(bytearray(self.ba_mosi[2:6]), 'big')
+        if self.state.pt == PacketType.FSK:
+            br, bt, bw, fdev = modulationFskFields(self.ba_mosi)
             my_str = str(br) + 'bps '
-            bt = self.ba_mosi[6]
             if bt == 0:
                 my_str = my_str + 'BT-OFF'
             elif bt == 8:
@@ -799,42 +795,35 @@ class Hla(HighLevelAnalyzer):
                 my_str = my_str + 'BT1.0'
             else:
                 my_str = my_str + '?' + hex(bt) + '?'
-            bw = self.fsk_bwDict.get(self.ba_mosi[7], self.ba_mosi[7])
-            my_str = my_str + ' rxbw:' + str(bw) + 'Hz '
-            fdev = int.from_bytes(bytearray(self.ba_mosi[8:12]), 'big')
+            my_str = my_str + ' rxbw:' + str(self.fsk_bwDict.get(bw, bw)) + 'Hz '
             my_str = my_str + 'fdev:' + str(fdev) + 'Hz'
-        elif self.pt == PacketType.LORA or self.pt == PacketType.RTTOF:
-            sf = self.ba_mosi[2]
+        elif self.state.pt == PacketType.LORA or self.state.pt == PacketType.RTTOF:
+            sf, bw, cr, ldro = modulationLoraFields(self.ba_mosi)
             my_str = 'SF' + str(sf)
-            bw = self.ba_mosi[3]
             my_str = my_str + ' bw ' + self.lora_bws.get(bw, hex(bw)+'?') + 'KHz'
-            cr = self.ba_mosi[4]
             my_str = my_str + ' ' + self.crs.get(cr, hex(cr)+'?') + ' '
-            ldro = self.ba_mosi[5]
             if ldro == 0:
                 my_str = my_str + 'LDRO_OFF'
             elif ldro == 1:
                 my_str = my_str + 'LDRO_ON'
             else:
                 my_str = my_str + '?' + hex(ldro) + '?'
-        elif self.pt == PacketType.BPSK:
+        elif self.state.pt == PacketType.BPSK:
             # lr11xx_radio_mod_params_bpsk_t
-            br_in_bps = int.from_bytes(bytearray(self.ba_mosi[2:6]), 'big')
-            pulse_shape = self.ba_mosi[6] #  lr11xx_radio_bpsk_pulse_shape_t
+            br_in_bps, pulse_shape = modulationBpskFields(self.ba_mosi) # pulse_shape: lr11xx_radio_bpsk_pulse_shape_t
             my_str = str(br_in_bps) + ' bps '
             if pulse_shape == 0x16: # LR11XX_RADIO_DBPSK_PULSE_SHAPE
                 my_str = my_str + ' Double OSR / RRC / BT 0.7'
             else:
                 my_str = my_str + hex(pulse_shape) + '?'
         else:
-            my_str = 'TODO pktType ' + self.pt.name
+            my_str = 'TODO pktType ' + self.state.pt.name
         return 'SetModulationParams ' + my_str
 
     def SetPacketParams(self):
-        if self.pt == PacketType.FSK:
-            preambleLength = int.from_bytes(bytearray(self.ba_mosi[2:4]), 'big')
+        if self.state.pt == PacketType.FSK:
+            preambleLength, detect, syncWordBits, addrComp, pktType, payLen, crcType, dcFree = packetFskFields(self.ba_mosi)
             my_str = 'preamble TX ' + str(preambleLength)
-            detect = self.ba_mosi[4]
             if detect == 0:
                 n_bits = 'OFF'
             elif detect == 4:
@@ -848,9 +837,7 @@ class Hla(HighLevelAnalyzer):
             else:
                 n_bits = '?' + hex(detect) + '?'
             my_str = my_str + ' detect ' + n_bits + 'bits '
-            syncWordBits = self.ba_mosi[5]
             my_str = my_str + ' syncWord ' + str(syncWordBits) + 'bits '
-            addrComp = self.ba_mosi[6]
             if addrComp == 0:
                 addrFilt = 'OFF'
             elif addrComp == 1:
@@ -860,7 +847,6 @@ class Hla(HighLevelAnalyzer):
             else:
                 addrFilt = '?'
             my_str = my_str + ' addrFilt ' + addrFilt
-            pktType = self.ba_mosi[7]
             if pktType == 0:
                 my_str = my_str + ' fixLen'
             elif pktType == 1:
@@ -869,9 +855,7 @@ class Hla(HighLevelAnalyzer):
                 my_str = my_str + ' varLen-9bit'
             else:
                 my_str = my_str + '?' + hex(pktType) + '?'
-            payLen = self.ba_mosi[8]
             my_str = my_str + ' payLen ' + str(payLen)
-            crcType = self.ba_mosi[9]
             if crcType == 1:
                 crc = 'OFF'
             elif crcType == 0:
@@ -885,31 +869,26 @@ class Hla(HighLevelAnalyzer):
             else:
                 crc = hex(crcType)
             my_str = my_str + ' CRC ' + str(crc)
-            dcFree = self.ba_mosi[10]
             if dcFree == 1:
                 my_str = my_str + ' dcFree'
-        elif self.pt == PacketType.LORA or self.pt == PacketType.RTTOF:
-            preambleLength = int.from_bytes(bytearray(self.ba_mosi[2:4]), 'big')
+        elif self.state.pt == PacketType.LORA or self.state.pt == PacketType.RTTOF:
+            preambleLength, headerType, payLen, crcOn, iqInv = packetLoraFields(self.ba_mosi)
             my_str = 'preamble ' + str(preambleLength)
-            headerType = self.ba_mosi[4]
             if headerType == 0:
                 hdrStr = 'varLen'
             elif headerType == 1:
-                hdrStr = 'fixrLen'
+                hdrStr = 'fixLen'
             else:
                 hdrStr = hex(headerType)
             my_str = my_str + ' header ' + hdrStr
-            payLen = self.ba_mosi[5]
             my_str = my_str + ' payLen' + str(payLen)
-            crcOn = self.ba_mosi[6]
             if crcOn == 0:
-                crcStr = 'ON'
-            elif crcOn == 1:
                 crcStr = 'OFF'
+            elif crcOn == 1:
+                crcStr = 'ON'
             else:
                 crcStr = hex(crcOn)
             my_str = my_str + ' CRC_' + crcStr
-            iqInv= self.ba_mosi[7]
             if iqInv == 0:
                 iqStr = 'STD'
             elif iqInv == 1:
@@ -917,16 +896,13 @@ class Hla(HighLevelAnalyzer):
             else:
                 iqStr = hex(iqInv)
             my_str = my_str + ' IQ ' + iqStr
-        elif self.pt == PacketType.BPSK:
+        elif self.state.pt == PacketType.BPSK:
             # lr11xx_radio_pkt_params_bpsk_t
-            pld_len_in_bytes = self.ba_mosi[2]
-            ramp_up_delay = int.from_bytes(bytearray(self.ba_mosi[3:5]), 'big')
-            ramp_down_delay = int.from_bytes(bytearray(self.ba_mosi[5:7]), 'big')
-            pld_len_in_bits = int.from_bytes(bytearray(self.ba_mosi[7:9]), 'big')
+            pld_len_in_bytes, ramp_up_delay, ramp_down_delay, pld_len_in_bits = packetBpskFields(self.ba_mosi)
             my_str = 'payload length ' + str(pld_len_in_bytes) + ' bytes ' +str(pld_len_in_bits)+ ' bits, '
             my_str = my_str + 'ramp_up_delay ' +str(ramp_up_delay)+', ramp_down_delay '+str(ramp_down_delay)
         else:
-            my_str = 'TODO pktType ' + self.pt.name
+            my_str = 'TODO pktType ' + self.state.pt.name
         return 'SetPacketParams ' + my_str
 
     def SetTxParams(self):
@@ -956,8 +932,8 @@ class Hla(HighLevelAnalyzer):
 
     def SetRxDutyCycle(self):
         dcModeDict = { 0: 'RX', 1: 'CAD' } # lr11xx_radio_rx_duty_cycle_mode_t
-        rx_period_in_rtc_step = int.from_bytes(bytearray(self.ba_mosi[2:5]), 'big')
-        sleep_period_in_rtc_step = int.from_bytes(bytearray(self.ba_mosi[5:8]), 'big')
+        rx_period_in_rtc_step = u24(self.ba_mosi, 2)
+        sleep_period_in_rtc_step = u24(self.ba_mosi, 5)
         mode = self.ba_mosi[8]
         return 'SetRxDutyCycle rx_period ' + str(rx_period_in_rtc_step) + ', sleep_period ' + str(sleep_period_in_rtc_step) + ', mode ' + dcModeDict.get(mode, hex(mode)+'?')
 
@@ -965,16 +941,18 @@ class Hla(HighLevelAnalyzer):
         paSel = self.ba_mosi[2]
         paSupply = self.ba_mosi[3]
         paDuty= self.ba_mosi[4]
-        hpSel = self.ba_mosi[4]
+        hpSel = self.ba_mosi[5]
         if paSel == 0:
             my_str = 'low-power '
-        if paSel == 1:
+        elif paSel == 1:
             my_str = 'hi-power '
+        elif paSel == 2:
+            my_str = 'hi-freq '
         else:
             my_str = '?' + hex(paSel) + '? '
         if paSupply == 0:
             my_str = my_str + 'int-reg'
-        if paSupply == 1:
+        elif paSupply == 1:
             my_str = my_str + 'VBAT'
         else:
             my_str = my_str + '?' + hex(paSupply) + '?'
@@ -1005,35 +983,35 @@ class Hla(HighLevelAnalyzer):
         return 'SetLoRaSynchTimeout ' + str(self.ba_mosi[2]) + ' symbols'
 
     def SetRangingAddr(self):
-        address = int.from_bytes(bytearray(self.ba_mosi[2:6]), 'big')
+        address = u32(self.ba_mosi, 2)
         return 'SetRangingAddr address ' + hex(address) + ', check_length ' + str(self.ba_mosi[6])
 
     def SetRangingReqAddr(self):
-        request_address = int.from_bytes(bytearray(self.ba_mosi[2:6]), 'big')
+        request_address = u32(self.ba_mosi, 2)
         return 'SetRangingReqAddr request_address ' + hex(request_address)
 
     def GetRangingResult(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         rt = { 0: 'RAW', 1: 'RSSI' } # lr11xx_rttof_result_type_t
-        self.ranging_result_type = self.ba_mosi[2]
+        self.state.ranging_result_type = self.ba_mosi[2]
         return 'GetRangingResult ' + rt.get(self.ba_mosi[2], hex(self.ba_mosi[2])+'?')
 
     def SetRangingTxRxDelay(self):
-        delay_indicator = int.from_bytes(bytearray(self.ba_mosi[2:6]), 'big')
+        delay_indicator = u32(self.ba_mosi, 2)
         return 'SetRangingTxRxDelay ' + str(delay_indicator)
 
     def GnssReadRssiTest(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         path = self.ba_mosi[2]
         return f'GnssReadRssiTest path=0x{path:02x}'
 
     def SetGfskCrcParams(self):
-        seed = int.from_bytes(bytearray(self.ba_mosi[2:6]), 'big')
-        polynomial = int.from_bytes(bytearray(self.ba_mosi[6:10]), 'big')
+        seed = u32(self.ba_mosi, 2)
+        polynomial = u32(self.ba_mosi, 6)
         return f'SetGfskCrcParams seed=0x{seed:08x} polynomial=0x{polynomial:08x}'
 
     def SetGfskWhiteningParams(self):
-        seed = int.from_bytes(bytearray(self.ba_mosi[2:4]), 'big')
+        seed = u16(self.ba_mosi, 2)
         return f'SetGfskWhiteningParams seed=0x{seed:04x}'
 
     def SetRxBoosted(self):
@@ -1051,40 +1029,14 @@ class Hla(HighLevelAnalyzer):
         return 'SetRangingParameter nb_symbols ' + str(nb_symbols)
 
     def SetRssiCalibration(self):
-        print('SetRssiCalibration:')
-        g5 = self.ba_mosi[2] >> 4
-        g4 = self.ba_mosi[2] & 0x0f
-        g7 = self.ba_mosi[3] >> 4
-        g6 = self.ba_mosi[3] & 0x0f
-        print(f'g4: {g4}, g5: {g5}, g6: {g6}, g7: {g7}')
-
-        g9 = self.ba_mosi[4] >> 4
-        g8 = self.ba_mosi[4] & 0x0f
-
-        g11 = self.ba_mosi[5] >> 4
-        g10 = self.ba_mosi[5] & 0x0f
-        print(f'g8: {g8}, g9: {g9}, g10: {g10}, g11: {g11}')
-
-        g13 = self.ba_mosi[6] >> 4
-        g12 = self.ba_mosi[6] & 0x0f
-        print(f'g12: {g12}, g13: {g13}')
-
-        g13hp2 = self.ba_mosi[7] >> 4
-        g13hp1 = self.ba_mosi[7] & 0x0f
-        print(f'g13hp1: {g13hp1}, g13hp2: {g13hp2}')
-
-        g13hp4 = self.ba_mosi[8] >> 4
-        g13hp3 = self.ba_mosi[8] & 0x0f
-        print(f'g13hp3: {g13hp3}, g13hp4: {g13hp4}')
-
-        g13hp6 = self.ba_mosi[9] >> 4
-        g13hp5 = self.ba_mosi[9] & 0x0f
-        print(f'g13hp5: {g13hp5}, g13hp6: {g13hp6}')
-
-        g13hp7 = self.ba_mosi[10] & 0x0f #( uint8_t ) ( rssi_cal_table->gain_tune.g13hp7 & 0x0F ),
-        gain_offset = int.from_bytes(bytearray(self.ba_mosi[11:13]), 'big')
-        print(f'g13hp7: {g13hp7}, gain_offset: {gain_offset}')
-        return 'SetRssiCalibration (see terminal)'
+        # gain tune nibbles, low nibble first: g4..g13, g13hp1..g13hp7, then the gain offset
+        names = ('g4', 'g5', 'g6', 'g7', 'g8', 'g9', 'g10', 'g11', 'g12', 'g13',
+                 'g13hp1', 'g13hp2', 'g13hp3', 'g13hp4', 'g13hp5', 'g13hp6', 'g13hp7')
+        tune = []
+        for b in self.ba_mosi[2:11]:
+            tune += (b & 0x0f, b >> 4)
+        gain_offset = u16(self.ba_mosi, 11)
+        return 'SetRssiCalibration ' + ', '.join(f'{n} {g}' for n, g in zip(names, tune)) + ', gain_offset ' + str(gain_offset)
 
     def SetLoraSyncWord(self):
         return 'SetLoraSyncWord ' + hex(self.ba_mosi[2])
@@ -1113,7 +1065,7 @@ class Hla(HighLevelAnalyzer):
         grid = self.ba_mosi[5] # lr_fhss_v1_grid_t
         enable_hopping = self.ba_mosi[6] # 
         bw = self.ba_mosi[7] # lr_fhss_v1_bw_t
-        hop_sequence_id = int.from_bytes(bytearray(self.ba_mosi[8:10]), 'big')
+        hop_sequence_id = u16(self.ba_mosi, 8)
         device_offset = self.ba_mosi[10]
         return 'LrFhssBuildFrame header_count ' + str(header_count) + ', CR_' + crDict.get(cr, hex(cr)+'?') + ', moulation '+modDict.get(modulation_type, hex(modulation_type)+'?')+ ', hopping ' + enDict.get(enable_hopping, hex(enable_hopping)+'?') + ', bw '+bwDict.get(bw, hex(bw)+'?')+'Hz, hop_sequence_id '+str(hop_sequence_id)+', device_offset ' + str(device_offset)
 
@@ -1126,7 +1078,7 @@ class Hla(HighLevelAnalyzer):
         return 'ConfigBleBeacon channel_id '+str(channel_id)
 
     def GetLoRaRxHeaderInfos(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'GetLoRaRxHeaderInfos (request) '
 
     def BleBeaconSend(self):
@@ -1241,6 +1193,66 @@ class Hla(HighLevelAnalyzer):
         0x800d: ReadJoinEui, # LR11XX_BL_READ_JOIN_EUI_OC
     }
 
+    # bytes a command decoder reads, opcode included; a shorter frame is reported as
+    # truncated without running the decoder.  opcodes not listed need only the opcode
+    cmdMinLen = {
+        0x0105: 6, # WriteRegMem32
+        0x0106: 7, # ReadRegMem32
+        0x0107: 6, # WriteRegMem8
+        0x0108: 7, # ReadRegMem8
+        0x010a: 4, # ReadBuffer8
+        0x010c: 14, # WriteRegMemMask32
+        0x010f: 3, # Calibrate
+        0x0110: 3, # SetRegMode
+        0x0111: 4, # CalibImage
+        0x0112: 10, # SetDioAsRfSwitch
+        0x0113: 10, # SetDioIrqParams
+        0x0114: 6, # ClearIrq
+        0x0116: 3, # ConfigLfClock
+        0x0117: 6, # SetTcxoMode
+        0x0118: 3, # Reboot
+        0x011b: 7, # SetSleep
+        0x011c: 3, # SetStandby
+        0x0121: 3, # EraseInfoPage
+        0x0122: 5, # WriteInfoPage
+        0x0123: 6, # ReadInfoPage
+        0x0128: 3, # EnableSpiCrc
+        0x012a: 3, # DriveDiosInSleepMode
+        0x0206: 10, # SetGfskSyncWord
+        0x0208: 3, # SetLoRaPublicNetwork
+        0x0209: 5, # SetRx
+        0x020a: 5, # SetTx
+        0x020b: 6, # SetRfFrequency
+        0x020c: 9, # AutoTxRx
+        0x020d: 8, # SetCadParams
+        0x020e: 3, # SetPacketType
+        0x020f: {PacketType.FSK: 12, PacketType.LORA: 6, PacketType.RTTOF: 6, PacketType.BPSK: 7}, # SetModulationParams
+        0x0210: {PacketType.FSK: 11, PacketType.LORA: 8, PacketType.RTTOF: 8, PacketType.BPSK: 9}, # SetPacketParams
+        0x0211: 4, # SetTxParams
+        0x0212: 4, # SetPacketAdrs
+        0x0213: 3, # SetRxTxFallbackMode
+        0x0214: 9, # SetRxDutyCycle
+        0x0215: 6, # SetPaConfig
+        0x0217: 3, # StopTimeoutOnPreamble
+        0x021b: 3, # SetLoRaSynchTimeout
+        0x021c: 7, # SetRangingAddr
+        0x021d: 6, # SetRangingReqAddr
+        0x021e: 3, # GetRangingResult
+        0x021f: 6, # SetRangingTxRxDelay
+        0x0222: 3, # GnssReadRssiTest
+        0x0224: 10, # SetGfskCrcParams
+        0x0225: 4, # SetGfskWhiteningParams
+        0x0227: 3, # SetRxBoosted
+        0x0228: 4, # SetRangingParameter
+        0x0229: 13, # SetRssiCalibration
+        0x022b: 3, # SetLoraSyncWord
+        0x022c: 11, # LrFhssBuildFrame
+        0x022e: 3, # ConfigBleBeacon
+        0x0231: 3, # BleBeaconSend
+        0x8003: 6, # WriteFlashEncrypted
+        0x8005: 3, # BootloaderReboot
+    }
+
     def ResponseGetVersion(self):
         hwVer = self.ba_miso[1]
         useCase = self.ba_miso[2]
@@ -1264,7 +1276,7 @@ class Hla(HighLevelAnalyzer):
         return 'ReadBuffer8 ' + str(len(self.ba_miso)-1) + 'bytes'
 
     def ResponseGetErrors(self):
-        errorStat = int.from_bytes(bytearray(self.ba_miso[1:2]), 'big')
+        errorStat = self.ba_miso[1]
         _str = 'GetErrors '
         if errorStat == 0:
             return _str + ' no errors'
@@ -1295,35 +1307,32 @@ class Hla(HighLevelAnalyzer):
         return 'GetVbat ' + _str + ' volts'
 
     def ResponseGetTemp(self):
-        temp = int.from_bytes(bytearray(self.ba_miso[0:2]), 'big')
+        temp = u16(self.ba_miso, 0)
         return 'GetTemp ' + hex(temp)
 
     def ResponseGetRandomNumber(self):
-        rnd = int.from_bytes(bytearray(self.ba_miso[1:5]), 'big')
+        rnd = u32(self.ba_miso, 1)
         return 'GetRandomNumber ' + str(rnd)
 
     def ResponseReadInfoPage(self):
         _len = len(self.ba_miso)
-        print('ReadInfoPage:')
-        for i in range(1, _len, 4):
-            val = int.from_bytes(bytearray(self.ba_miso[i:i+4]), 'big')
-            print(hex(val))
-        return 'ReadInfoPage (see terminal)'
+        words = [hex(int.from_bytes(self.ba_miso[i:i+4], 'big')) for i in range(1, _len, 4)]
+        return 'ReadInfoPage ' + ' '.join(words)
 
     def ResponseGetChipEui(self):
-        uid = int.from_bytes(bytearray(self.ba_miso[1:]), 'big')
+        uid = int.from_bytes(self.ba_miso[1:], 'big')
         _len = len(self.ba_miso)-1
         _str = f'{uid:0{_len}x}'
         return 'GetChipEui ' + _str
 
     def ResponseGetSemtechJoinEui(self):
-        join_eui = int.from_bytes(bytearray(self.ba_miso[1:]), 'big')
+        join_eui = int.from_bytes(self.ba_miso[1:], 'big')
         _len = len(self.ba_miso)-1
         _str = f'{join_eui:0{_len}x}'
         return 'GetSemtechJoinEui ' + _str
 
     def ResponseDeriveRootKeysAndGetPin(self):
-        pin = int.from_bytes(bytearray(self.ba_miso[1:5]), 'big')
+        pin = u32(self.ba_miso, 1)
         return 'DeriveRootKeysAndGetPin pin ' + hex(pin)
 
     def ResponseGetHash(self):
@@ -1332,52 +1341,46 @@ class Hla(HighLevelAnalyzer):
         return 'GetHash ' + hash_bytes.hex()
 
     def ResponseGetPin(self):
-        pin = int.from_bytes(bytearray(self.ba_miso[1:5]), 'big')
+        pin = u32(self.ba_miso, 1)
         return 'GetPin pin ' + hex(pin)
 
     def ResponseReadChipEui(self):
-        chip_eui = int.from_bytes(bytearray(self.ba_miso[1:9]), 'big')
+        chip_eui = u64(self.ba_miso, 1)
         _len = len(self.ba_miso)-1
         _str = f'{chip_eui:0{_len*2}x}'
         return 'ReadChipEui ' + _str
 
     def ResponseReadJoinEui(self):
-        join_eui = int.from_bytes(bytearray(self.ba_miso[1:9]), 'big')
+        join_eui = u64(self.ba_miso, 1)
         _len = len(self.ba_miso)-1
         _str = f'{join_eui:0{_len*2}x}'
         return 'ReadJoinEui ' + _str
 
     def ResponseGetStats(self):
         # TODO need to disable parseIrqs?
-        if self.pt == PacketType.FSK:
-            nb_pkt_received = int.from_bytes(bytearray(self.ba_miso[1:3]), 'big')
-            nb_pkt_crc_error = int.from_bytes(bytearray(self.ba_miso[3:5]), 'big')
-            nb_pkt_len_error = int.from_bytes(bytearray(self.ba_miso[5:7]), 'big')
+        if self.state.pt == PacketType.FSK:
+            nb_pkt_received, nb_pkt_crc_error, nb_pkt_len_error = statsFskFields(self.ba_miso)
             _str = f'FSK nb_pkt_received={nb_pkt_received} nb_pkt_crc_error={nb_pkt_crc_error} nb_pkt_len_error={nb_pkt_len_error}'
-        elif self.pt == PacketType.LORA:
-            nb_pkt_received = int.from_bytes(bytearray(self.ba_miso[1:3]), 'big')
-            nb_pkt_crc_error = int.from_bytes(bytearray(self.ba_miso[3:5]), 'big')
-            nb_pkt_header_error = int.from_bytes(bytearray(self.ba_miso[5:7]), 'big')
-            nb_pkt_falsesync = int.from_bytes(bytearray(self.ba_miso[7:9]), 'big')
+        elif self.state.pt == PacketType.LORA:
+            nb_pkt_received, nb_pkt_crc_error, nb_pkt_header_error, nb_pkt_falsesync = statsLoraFields(self.ba_miso)
             _str = f'LORA nb_pkt_received={nb_pkt_received} nb_pkt_crc_error={nb_pkt_crc_error} nb_pkt_header_error={nb_pkt_header_error} nb_pkt_falsesync={nb_pkt_falsesync}'
         else:
-            _str = 'for unknown pktType:' + self.pt.name
+            _str = 'for unknown pktType:' + self.state.pt.name
         return 'GetStats ' + _str
 
     def ResponseGetPacketType(self):
-        self.pt = PacketType(self.ba_miso[1])
-        return 'GetPacketType ' + self.pt.name
+        self.state.pt = PacketType(self.ba_miso[1])
+        return 'GetPacketType ' + self.state.pt.name
 
     def ResponseGetRxBufferStatus(self):
-        payLen = self.ba_miso[1]
-        bufPtr = self.ba_miso[2]
+        payLen, bufPtr = rxBufferStatusFields(self.ba_miso)
         return 'GetRxBufferStatus ' + str(payLen) + 'bytes at ' + hex(bufPtr)
 
     def ResponseGetPacketStatus(self):
-        if self.pt == PacketType.FSK:
+        if self.state.pt == PacketType.FSK:
             # GFSK packet status: 4 bytes [rssi_sync, rssi_avg, rx_len, status]
             rxStatus = RxStatus()
-            rxStatus.asWord = int.from_bytes(bytearray(self.ba_miso[1:5]), 'little')
+            rxStatus.asWord = u32le(self.ba_miso, 1)
             my_str = str(rxStatus.RxLen) + 'bytes '
             rssiAvg = rxStatus.RssiAvg >> 1
             rssiSync = rxStatus.RssiSync >> 1
@@ -1397,20 +1400,18 @@ class Hla(HighLevelAnalyzer):
                 my_str = my_str + 'Adrserr '
             if rxStatus.rfu != 0:
                 my_str = my_str + 'rfu '
-        elif self.pt == PacketType.LORA:
+        elif self.state.pt == PacketType.LORA:
             # LoRa packet status: 3 bytes [rssi_pkt, snr_pkt, signal_rssi_pkt]
+            rssi_raw, snr_raw, signal_raw = packetStatusLoraFields(self.ba_miso)
             # rssi_pkt_in_dbm = -(rbuffer[0] >> 1)
-            RssiPkt = -(self.ba_miso[1] >> 1)
+            RssiPkt = -(rssi_raw >> 1)
             # snr_pkt_in_db = ((rbuffer[1] + 2) >> 2) - signed 8-bit
-            snr_raw = self.ba_miso[2]
-            if snr_raw > 127:
-                snr_raw -= 256
             SnrPkt = (snr_raw + 2) >> 2
             # signal_rssi_pkt_in_dbm = -(rbuffer[2] >> 1)
-            SignalRssiPkt = -(self.ba_miso[3] >> 1)
+            SignalRssiPkt = -(signal_raw >> 1)
             my_str = str(RssiPkt) + 'dBm ' + str(SnrPkt) + 'dB ' + str(SignalRssiPkt) + 'dBm'
         else:  # only existing is get_get_lora_pkt_status() and get_gfsk_pkt_status()
-            my_str = 'pktType ' + str(self.pt)
+            my_str = 'pktType ' + str(self.state.pt)
         return 'GetPacketStatus ' + my_str
 
     def ResponseGetRssiInst(self):
@@ -1418,10 +1419,10 @@ class Hla(HighLevelAnalyzer):
 
     def ResponseGetRangingResult(self):
         # LR11XX_RTTOF_RESULT_LENGTH = 4 bytes
-        result_type = getattr(self, 'ranging_result_type', None)
+        result_type = self.state.ranging_result_type
         if result_type == 0:  # LR11XX_RTTOF_RESULT_TYPE_RAW
             # Extract raw distance as 32-bit little-endian value
-            raw_distance = int.from_bytes(bytearray(self.ba_miso[1:5]), 'little')
+            raw_distance = u32le(self.ba_miso, 1)
             return f'GetRangingResult RAW raw_distance=0x{raw_distance:08x}'
         elif result_type == 1:  # LR11XX_RTTOF_RESULT_TYPE_RSSI
             # Only byte 4 (index 4) is meaningful, shift right by 1 and negate
@@ -1443,7 +1444,7 @@ class Hla(HighLevelAnalyzer):
         return 'GetLoRaRxHeaderInfos ' + my_str
 
     def ResponseGnssReadRssiTest(self):
-        rssi_gnss_dbm = int.from_bytes(bytearray(self.ba_miso[1:2]), 'big', signed=True)
+        rssi_gnss_dbm = s8(self.ba_miso, 1)
         return f'GnssReadRssiTest rssi={rssi_gnss_dbm} dBm'
 
     cmdResponseDict = {
@@ -1474,25 +1475,154 @@ class Hla(HighLevelAnalyzer):
         0x0230: ResponseGetLoRaRxHeaderInfos,
     }
 
+    # bytes a response decoder reads, status/RC byte included
+    cmdResponseMinLen = {
+        0x0101: 5, # GetVersion
+        0x010d: 2, # GetErrors
+        0x0115: 5, # GetIrqStatus
+        0x0119: 2, # GetVbat
+        0x011a: 2, # GetTemp
+        0x0120: 5, # GetRandomNumber
+        0x0125: 2, # GetChipEui
+        0x0126: 2, # GetSemtechJoinEui
+        0x0127: 5, # DeriveRootKeysAndGetPin
+        0x0201: {PacketType.FSK: 7, PacketType.LORA: 9}, # GetStats
+        0x0202: 2, # GetPacketType
+        0x0203: 3, # GetRxBufferStatus
+        0x0204: {PacketType.FSK: 5, PacketType.LORA: 4}, # GetPacketStatus
+        0x0205: 2, # GetRssiInst
+        0x021e: 5, # GetRangingResult
+        0x0222: 2, # GnssReadRssiTest
+        0x0230: 2, # GetLoRaRxHeaderInfos
+        0x8004: 17, # GetHash
+        0x800b: 5, # GetPin
+        0x800c: 9, # ReadChipEui
+        0x800d: 9, # ReadJoinEui
+    }
+
+    # decoders that keep state outside the decode cache key, or print
+    cmdUncacheable = (
+        0x0202,  # GetPacketType: response sets the packet type
+        0x020e,  # SetPacketType
+        0x021e,  # GetRangingResult: result type selects the response decoder
+    )
+
+    # typed output mode: these decoders return (result type, data) with raw numbers
+    # instead of text, and Logic 2 renders them through result_types.  they run only
+    # with transceiver framing; the status bytes are added as stat1/stat2
+    def TypedGetStatus(self):
+        if len(self.ba_miso) < 6:
+            return 'status', {}
+        return 'status_irq', {'irq_mask': u32(self.ba_miso, 2) & irqFlagsMask}
+
+    def TypedSetRx(self):
+        hi, lo = setRxTxFields(self.ba_mosi)
+        return 'rx_tx', {'name': 'SetRx', 'timeout': hi << 16 | lo}
+
+    def TypedSetTx(self):
+        hi, lo = setRxTxFields(self.ba_mosi)
+        return 'rx_tx', {'name': 'SetTx', 'timeout': hi << 16 | lo}
+
+    def TypedSetRfFrequency(self):
+        return 'rf_frequency', {'freq_hz': setRfFrequencyFields(self.ba_mosi)[0]}
+
+    def TypedClearIrq(self):
+        return 'irq', {'name': 'ClearIrq', 'irq_mask': u32(self.ba_mosi, 2) & irqFlagsMask}
+
+    def TypedResponseGetRxBufferStatus(self):
+        payload_len, offset = rxBufferStatusFields(self.ba_miso)
+        return 'rx_buffer_status', {'payload_len': payload_len, 'offset': offset}
+
+    def TypedResponseGetPacketStatus(self):
+        if self.state.pt == PacketType.LORA:
+            rssi_raw, snr_raw, signal_raw = packetStatusLoraFields(self.ba_miso)
+            return 'packet_status_lora', {
+                'rssi': -(rssi_raw >> 1),
+                'snr': (snr_raw + 2) >> 2,
+                'signal_rssi': -(signal_raw >> 1),
+            }
+        if self.state.pt == PacketType.FSK:
+            # the RxStatus word, low byte first: status, rx_len, rssi_avg, rssi_sync
+            return 'packet_status_fsk', {
+                'rx_status': self.ba_miso[1],
+                'rx_len': self.ba_miso[2],
+                'rssi_avg': -(self.ba_miso[3] >> 1),
+                'rssi_sync': -(self.ba_miso[4] >> 1),
+            }
+        return self.ResponseGetPacketStatus()
+
+    def TypedResponseGetRssiInst(self):
+        return 'rssi_inst', {'rssi': -self.ba_miso[1] / 2}
+
+    cmdTypedDict = {
+        0x0100: TypedGetStatus,
+        0x0114: TypedClearIrq,
+        0x0209: TypedSetRx,
+        0x020a: TypedSetTx,
+        0x020b: TypedSetRfFrequency,
+    }
+
+    cmdResponseTypedDict = {
+        0x0203: TypedResponseGetRxBufferStatus,
+        0x0204: TypedResponseGetPacketStatus,
+        0x0205: TypedResponseGetRssiInst,
+    }
+
     # which firmware the LR11xx is running: transceiver responses lead with stat1,
     # modem-e responses lead with an RC byte and end with a CRC (Modem-E RM Table 2-4).
     # 'auto' assumes transceiver until modem-e traffic (0x06xx command or a valid
     # RC read-back) is seen on the wire.
     firmware = ChoicesSetting(choices=('auto', 'modem-e', 'transceiver'))
 
+    # 'text' renders every transaction as a string; 'typed' emits raw numbers for the
+    # opcodes in cmdTypedDict / cmdResponseTypedDict, so the data table can sort and
+    # search on them, and Logic 2 formats the bubble text
+    output = ChoicesSetting(choices=('text', 'typed'))
+
+    # 'on' times every dispatch per opcode (lr_profile) and prints the table at exit
+    profile = ChoicesSetting(choices=('off', 'on'))
+
+    # 'on' merges runs of transactions with identical results (status / irq / event
+    # polling loops) into one frame spanning the run, labeled with its repeat count
+    coalesce = ChoicesSetting(choices=('off', 'on'))
+
+    # 'on' serves transactions that repeat byte for byte from an LRU cache of their
+    # decoded results (lr_cache); it only pays on captures made mostly of repeats
+    cache = ChoicesSetting(choices=('off', 'on'))
+
+    # a run is emitted once it reaches either bound, even if it goes on: Logic 2 never
+    # says the capture has ended, so this is as long as a run can stay hidden
+    coalesceMaxRepeat = 256
+    coalesceMaxSpan = 1.0  # seconds
+    # ... and as soon as the bus has been idle this long after it, when the next
+    # transaction starts: a polling loop that stopped is over, whatever follows
+    coalesceMaxGap = 0.1  # seconds
+
     result_types = {
         'mytype': {
             'format': 'Output type: {{type}}, Input type: {{data.input_type}}'
         },
-        'match': { 'format': '{{data.string}}'}
+        'match': { 'format': '{{data.string}}'},
+        'status': { 'format': 'GetStatus'},
+        'status_irq': { 'format': 'GetStatus irq_mask={{data.irq_mask}}'},
+        'irq': { 'format': '{{data.name}} irq_mask={{data.irq_mask}}'},
+        'rx_tx': { 'format': '{{data.name}} timeout={{data.timeout}}'},
+        'rf_frequency': { 'format': 'SetRfFrequency {{data.freq_hz}}Hz'},
+        'rx_buffer_status': { 'format': 'GetRxBufferStatus {{data.payload_len}}bytes at {{data.offset}}'},
+        'packet_status_lora': { 'format': 'GetPacketStatus {{data.rssi}}dBm {{data.snr}}dB {{data.signal_rssi}}dBm'},
+        'packet_status_fsk': { 'format': 'GetPacketStatus {{data.rx_len}}bytes {{data.rssi_avg}}dBm {{data.rssi_sync}}dBm'},
+        'rssi_inst': { 'format': 'GetRssiInst {{data.rssi}}dBm'},
     }
 
     def __new__(cls, settings=None, *args, **kwargs):
-        # analyzer instances saved before the 'firmware' setting existed have no value
-        # for it, and Saleae's validation rejects any missing setting -- supply the
-        # default so those instances keep loading
-        if isinstance(settings, dict) and 'firmware' not in settings:
-            settings = dict(settings, firmware='auto')
+        # analyzer instances saved before the 'firmware', 'output', 'profile', 'coalesce' or
+        # 'cache' setting existed have no value for it, and Saleae's validation rejects any
+        # missing setting -- supply the default so those instances keep loading
+        if isinstance(settings, dict):
+            for name, default in (('firmware', 'auto'), ('output', 'text'), ('profile', 'off'), ('coalesce', 'off'),
+                                  ('cache', 'off')):
+                if name not in settings:
+                    settings = dict(settings, **{name: default})
         try:
             return super().__new__(cls, settings, *args, **kwargs)
         except TypeError:
@@ -1501,11 +1631,41 @@ class Hla(HighLevelAnalyzer):
 
     def __init__(self):
         self.idx = 0
-        self.pt = PacketType.NONE
-        self.cmd_direct_read = 0
-        self.next_transfer_response = 0
-        self.modem_e_rc_pending = 0  # a modem-e write command was sent; expect a 2-byte RC read-back
-        self.modem_e_seen = 0        # any modem-e traffic decoded yet in this capture
+        self.state = DecodeState(PacketType.NONE)  # all the state decoders carry between transactions
+        # transaction bytes: each 'result' frame appends in place
+        self.mosi_buf = bytearray()
+        self.miso_buf = bytearray()
+        self.ba_mosi = b''
+        self.ba_miso = b''
+        size = cache_size(getattr(self, 'cache', None))
+        self.decode_cache = DecodeCache(size) if size > 0 else None
+        self.cacheable = True
+        self.crc_check = None  # Modem-E CRC verdict of the last transaction: True ok, False bad, None unchecked
+        self.dispatch = None  # what decodeTransfer routed the last transaction to (lr_profile)
+        self.held = None  # coalesce: the first frame of the current run, not emitted yet
+        self.held_end = 0
+        self.held_count = 0
+        if lr_profile.profile_enabled(getattr(self, 'profile', None)):
+            lr_profile.install(self)
+
+    def snapshot(self):
+        # the decoder state a transaction can change
+        state = self.state
+        return tuple(getattr(state, name) for name in stateAttrs)
+
+    def get_state(self):
+        # every piece of state the next transactions decode with, as plain ints (or
+        # None), so a checkpoint pickles or goes to JSON as is
+        state = [getattr(self.state, name) for name in checkpointAttrs]
+        state[0] = self.state.pt.value
+        return tuple(state)
+
+    def set_state(self, values):
+        # resume from a get_state() checkpoint
+        state = DecodeState(PacketType(values[0]))
+        for name, value in zip(checkpointAttrs[1:], values[1:]):
+            setattr(state, name, value)
+        self.state = state
 
     def firmware_mode(self):
         fw = getattr(self, 'firmware', None)
@@ -1514,117 +1674,273 @@ class Hla(HighLevelAnalyzer):
             fw = os.environ.get('LR11XX_FIRMWARE', 'auto')
         return fw
 
+    def output_mode(self):
+        out = getattr(self, 'output', None)
+        if not isinstance(out, str):
+            # standalone harness: no Saleae settings dialog, allow env override
+            out = os.environ.get('LR11XX_OUTPUT', 'text')
+        return out
+
+    def coalesce_mode(self):
+        co = getattr(self, 'coalesce', None)
+        if not isinstance(co, str):
+            # standalone harness: no Saleae settings dialog, allow env override
+            co = os.environ.get('LR11XX_COALESCE', 'off')
+        return co
+
+    def coalesce_frame(self, frame):
+        # hold frame while it repeats the held one; on a different result return the
+        # finished run and hold the new frame
+        held = self.held
+        if (held is not None and frame.type == held.type and frame.data == held.data
+                and frame.start_time - self.held_end < self.coalesceMaxGap):
+            self.held_end = frame.end_time
+            self.held_count += 1
+            if (self.held_count >= self.coalesceMaxRepeat
+                    or frame.end_time - held.start_time >= self.coalesceMaxSpan):
+                # long run: emit it now, the repeats after it start a new one
+                return self.flush()
+            return None
+        out = self.flush()
+        self.held = frame
+        self.held_end = frame.end_time
+        self.held_count = 1
+        return out
+
+    def flush(self):
+        # the held run as one frame, None if nothing is held; call at the end of a capture
+        held = self.held
+        if held is None:
+            return None
+        self.held = None
+        if self.held_count == 1:
+            return held
+        if held.type == 'match':
+            data = {'string': held.data['string'] + ' [x' + str(self.held_count) + ']'}
+        else:
+            data = dict(held.data, repeat=self.held_count)
+        return AnalyzerFrame(held.type, held.start_time, self.held_end, data)
+
     def modem_e_active(self):
         fw = self.firmware_mode()
         if fw == 'modem-e':
             return True
         if fw == 'transceiver':
             return False
-        return self.modem_e_seen != 0
+        return self.state.modem_e_seen != 0
+
+    # Modem-E frame helpers, looked up on the instance so lr_profile can time them for
+    # the profiled analyzer only
+    modem_e_rc_readback = modem_e_rc_readback
+    modem_e_resp_crc_note = modem_e_resp_crc_note
+    modem_e_orphan_read = modem_e_orphan_read
+    modem_e_rc_crc_ok = staticmethod(modem_e_rc_crc_ok)
+    modem_e_crc_ok = staticmethod(modem_e_crc_ok)
+
+    def decodeTransfer(self, end_time):
+        # one transaction, MOSI/MISO already in ba_mosi/ba_miso; self.dispatch records
+        # the OpEntry (command), response decoder or FALLBACK_* path it takes
+        self.cacheable = True
+        state = self.state
+        modem_e_frame = False  # modem-e MISO[0] is an RC byte, not stat1
+        # typed decoders assume transceiver framing
+        typed = self.output_mode() == 'typed' and not self.modem_e_active()
+        rc_pending = state.modem_e_rc_pending
+        state.modem_e_rc_pending = 0
+        if (state.cmd_direct_read >> 16) == 0x06 and self.ba_mosi[0] == 0x06:
+            # expected a modem-e response but this is a command frame (retry); decode it as a command
+            state.end_response()
+        if (self.firmware_mode() != 'transceiver'
+                and len(self.ba_mosi) == 2 and self.ba_mosi[0] == 0 and self.ba_mosi[1] == 0
+                and state.cmd_direct_read == 0
+                and (rc_pending or self.modem_e_active() or self.modem_e_rc_crc_ok(self.ba_miso))):
+            # 2 dummy bytes clocked after a modem-e write command: MISO = [RC, CRC]
+            self.dispatch = FALLBACK_RC_READBACK
+            my_str = self.modem_e_rc_readback()
+            state.modem_e_seen = 1
+            modem_e_frame = True
+        elif state.cmd_direct_read == 0:
+            cmd = opcode_key(self.ba_mosi)
+            if self.ba_mosi[0] == 0x06:
+                state.modem_e_seen = 1
+            entry = opTable.get(cmd)
+            if entry is None and self.ba_mosi[0] in pendingGroups:
+                # first command of the wifi, gnss or modem-e group: load its decoders
+                load_group(opTable, self.ba_mosi[0], pendingGroups)
+                entry = opTable.get(cmd)
+            if entry is None:
+                xferLen = len(self.ba_mosi)
+                fallback = fallbackTable[(self.ba_mosi[0] == 0, xferLen > 2, self.modem_e_active())]
+                self.dispatch = fallback
+                if fallback == FALLBACK_ORPHAN_READ:
+                    # modem-e response framing, but its command wasn't decoded
+                    modem_e_frame = True
+                    my_str = self.modem_e_orphan_read()
+                elif fallback == FALLBACK_IRQ_READ:
+                    # 3 to 5 byte transfers carry a partial irq word
+                    word = int.from_bytes(self.ba_miso[2:6], 'big')
+                    if typed:
+                        my_str = ('irq', {'name': 'irq', 'irq_mask': word & irqFlagsMask})
+                    else:
+                        my_str = self.parseIrqs(word)
+                elif fallback == FALLBACK_SHORT_READ:
+                    self.cacheable = False  # carries the transfer duration
+                    my_str = 'bytes xferLen' + str(xferLen) + ', ' + str(end_time - self.nss_fall_time)
+                else:
+                    my_str = hex(cmd) + ', dict-error:' + str(cmd)
+            else:
+                self.dispatch = entry
+                if not entry.cacheable:
+                    self.cacheable = False
+                need = need_len(entry.min_len, state.pt)
+                try:
+                    if len(self.ba_mosi) < need:
+                        # truncated frame: don't run the decoder, and don't expect a response
+                        my_str = short_frame(entry.name, len(self.ba_mosi), need)
+                    elif typed and entry.typed is not None:
+                        my_str = entry.typed(self)
+                    else:
+                        my_str = entry.handler(self)
+                    if (entry.group == GROUP_MODEM_E and state.next_transfer_response == 0
+                            and entry.kind != KIND_WRITE_NO_RC):
+                        # modem-e write commands get a 2-byte RC read-back
+                        state.modem_e_rc_pending = 1
+                    if self.modem_e_active():
+                        # modem-e commands (all groups) carry a trailing CRC; MISO during a command isn't stat1
+                        modem_e_frame = True
+                        if len(self.ba_mosi) >= 3:
+                            self.crc_check = self.modem_e_crc_ok(self.ba_mosi)
+                            if not self.crc_check:
+                                my_str = my_str + ' [cmd crc BAD]'
+                    if state.next_transfer_response == 1:
+                        state.cmd_direct_read = cmd  # save it for later
+                    state.len = len(self.ba_mosi) # save this length
+                except Exception as error:
+                    # decoder bug
+                    my_str = hex(cmd) + ', dict-error:' + str(error)
+                state.next_transfer_response = 0
+            half_status = 0
+        else:
+            entry = opTable.get(state.cmd_direct_read)
+            if entry is None and pendingGroups:
+                # restored from a checkpoint (set_state) before the command's group was loaded
+                first = state.cmd_direct_read >> (16 if state.cmd_direct_read > 0xffff else 8)
+                if load_group(opTable, first, pendingGroups):
+                    entry = opTable.get(state.cmd_direct_read)
+            handler = entry.response if entry is not None else None
+            if handler is None:
+                self.dispatch = FALLBACK_UNKNOWN_RESPONSE
+                my_str = hex(state.cmd_direct_read) + ', response-dict-error:' + str(state.cmd_direct_read)
+            else:
+                self.dispatch = handler
+                if not entry.cacheable:
+                    self.cacheable = False
+                xferLen = len(self.ba_miso)
+                need = need_len(entry.resp_min_len, state.pt)
+                try:
+                    if entry.group == GROUP_MODEM_E or (entry.group == GROUP_SYSTEM and self.modem_e_active()):
+                        # modem-e firmware: system/radio responses are [RC, payload, CRC] too, not [stat1, data]
+                        modem_e_frame = True
+                        if ((entry.group == GROUP_SYSTEM or xferLen < need)
+                                and self.ba_miso[0] != 0 and self.modem_e_rc_crc_ok(self.ba_miso)):
+                            # error frame: [RC, CRC] only, no payload follows
+                            self.crc_check = True
+                            my_str = handler.__name__.replace('Response', '', 1) + ' RC=' + modem_e_rc_dict.get(self.ba_miso[0], hex(self.ba_miso[0]) + '?')
+                        elif xferLen < need:
+                            my_str = short_response(handler.__name__.replace('Response', '', 1), xferLen, need)
+                        else:
+                            my_str = handler(self) + self.modem_e_resp_crc_note()
+                    elif xferLen < need:
+                        my_str = short_response(handler.__name__.replace('Response', '', 1), xferLen, need)
+                    elif typed and entry.typed_response is not None:
+                        my_str = entry.typed_response(self)
+                    else:
+                        my_str = handler(self)
+                except Exception as error:
+                    # decoder bug
+                    my_str = hex(state.cmd_direct_read) + ', response-dict-error:' + str(error)
+
+            half_status = 1
+            state.end_response()
+
+        if len(self.ba_mosi) > 1 and not modem_e_frame:
+            if my_str.__class__ is tuple:
+                my_str[1]['stat1'] = self.ba_miso[0]
+                if half_status == 0:
+                    my_str[1]['stat2'] = self.ba_miso[1]
+            else:
+                my_str = my_str + ' (' + self.parseStatus(half_status) + ')'
+        return my_str
+
+    def decode_transaction(self, mosi, miso, start_time, end_time):
+        # one whole transaction (nSS low from start_time to end_time) at once, for
+        # sources that already have the bytes; returns the AnalyzerFrame decode() would
+        self.ba_mosi = b''  # drop the previous transaction's views
+        self.ba_miso = b''
+        self.mosi_buf = mosi
+        self.miso_buf = miso
+        self.nss_fall_time = start_time
+        return self.decode_buffered(end_time)
+
+    def decode_buffered(self, end_time):
+        # the transaction accumulated in mosi_buf / miso_buf since nss_fall_time
+        # handlers index and slice the transaction through zero-copy views
+        self.ba_mosi = memoryview(self.mosi_buf)
+        self.ba_miso = memoryview(self.miso_buf)
+        self.crc_check = None
+        if len(self.ba_mosi) > 0:
+            cache = self.decode_cache
+            if cache is not None and len(self.ba_mosi) <= CACHE_MAX_XFER:
+                # MOSI and MISO are the same length, so one joined copy keys both
+                key = (b''.join((self.mosi_buf, self.miso_buf)), self.state.pt, self.firmware_mode(),
+                       self.output_mode(), self.state.modem_e_seen, self.state.cmd_direct_read, self.state.modem_e_rc_pending)
+                hit = cache.get(key)
+                if hit is None:
+                    before = self.snapshot()
+                    my_str = self.decodeTransfer(end_time)
+                    if self.cacheable:
+                        cache.put(key, my_str, before, self.snapshot(), self.crc_check)
+                else:
+                    my_str = hit[0]
+                    self.crc_check = hit[2]
+                    state = self.state
+                    for name, value in hit[1]:
+                        setattr(state, name, value)
+            else:
+                my_str = self.decodeTransfer(end_time)
+        else:
+            my_str = 'wakeup ' + str(end_time - self.nss_fall_time)
+        if my_str.__class__ is tuple:
+            # typed output: (result type, data)
+            return AnalyzerFrame(my_str[0], self.nss_fall_time, end_time, my_str[1])
+        return AnalyzerFrame('match', self.nss_fall_time, end_time, {'string':my_str})
 
     def decode(self, frame: AnalyzerFrame):
         if frame.type == 'result':
-            if self.idx == 0:
-                self.ba_mosi = frame.data['mosi']
-                self.ba_miso = frame.data['miso']
-            else:
-                self.ba_mosi += frame.data['mosi']
-                self.ba_miso += frame.data['miso']
+            self.mosi_buf += frame.data['mosi']
+            self.miso_buf += frame.data['miso']
             self.idx += 1
         elif frame.type == 'enable':   # falling edge of nSS
-            self.ba_mosi = b''
+            self.ba_mosi = b''  # drop the previous transaction's views
             self.ba_miso = b''
+            # a fresh pair: a view still held on the old ones would block resizing them
+            self.mosi_buf = bytearray()
+            self.miso_buf = bytearray()
             self.nss_fall_time = frame.start_time
             self.idx = 0
+            if self.held is not None and frame.start_time - self.held_end >= self.coalesceMaxGap:
+                return self.flush()  # coalesce: the run ended before this transaction
         elif frame.type == 'disable':   # rising edge of nSS
             self.idx = -1
-            if len(self.ba_mosi) > 0:
-                modem_e_frame = False  # modem-e MISO[0] is an RC byte, not stat1
-                rc_pending = self.modem_e_rc_pending
-                self.modem_e_rc_pending = 0
-                if (self.cmd_direct_read >> 16) == 0x06 and self.ba_mosi[0] == 0x06:
-                    # expected a modem-e response but this is a command frame (retry); decode it as a command
-                    self.cmd_direct_read = 0
-                if (self.firmware_mode() != 'transceiver'
-                        and len(self.ba_mosi) == 2 and self.ba_mosi[0] == 0 and self.ba_mosi[1] == 0
-                        and self.cmd_direct_read == 0
-                        and (rc_pending or self.modem_e_active() or modem_e_rc_crc_ok(self.ba_miso))):
-                    # 2 dummy bytes clocked after a modem-e write command: MISO = [RC, CRC]
-                    my_str = modem_e_rc_readback(self)
-                    self.modem_e_seen = 1
-                    modem_e_frame = True
-                elif self.cmd_direct_read == 0:
-                    try:
-                        cmd = int.from_bytes(bytearray(self.ba_mosi[0:2]), 'big')
-                        if self.ba_mosi[0] == 0x04:
-                            my_str = lr_gnss.cmdDict[cmd](self)
-                        elif self.ba_mosi[0] == 0x03:
-                            my_str = lr_wifi.cmdDict[cmd](self)
-                        elif self.ba_mosi[0] == 0x06:
-                            # modem-e group commands have a 3-byte header: group(2) + cmd(1)
-                            cmd = int.from_bytes(bytearray(self.ba_mosi[0:3]), 'big')
-                            self.modem_e_seen = 1
-                            my_str = lr_modem_e.cmdDict[cmd](self)
-                            if self.next_transfer_response == 0 and cmd != 0x060100:
-                                # write commands get a 2-byte RC read-back (FactoryReset is write_without_rc)
-                                self.modem_e_rc_pending = 1
-                        else:
-                            my_str = self.cmdDict[cmd](self)
-                        if self.modem_e_active():
-                            # modem-e commands (all groups) carry a trailing CRC; MISO during a command isn't stat1
-                            modem_e_frame = True
-                            if len(self.ba_mosi) >= 3 and self.ba_mosi[-1] != modem_e_crc8(0xFF, self.ba_mosi[0:-1]):
-                                my_str = my_str + ' [cmd crc BAD]'
-                        if self.next_transfer_response == 1:
-                            self.cmd_direct_read = cmd  # save it for later
-                            self.next_transfer_response = 0
-                        self.len = len(self.ba_mosi) # save this length
-                    except Exception as error:
-                        if self.ba_mosi[0] == 0:
-                            xferLen = len(self.ba_mosi)
-                            if self.modem_e_active() and xferLen > 2:
-                                # modem-e response framing, but its command wasn't decoded
-                                modem_e_frame = True
-                                my_str = modem_e_orphan_read(self)
-                            elif xferLen > 2:
-                                my_str = self.parseIrqs(int.from_bytes(bytearray(self.ba_miso[2:6]), 'big'))
-                            else:
-                                my_str = type(self.ba_mosi).__name__ + ' xferLen' + str(len(self.ba_mosi)) + ', ' + str(frame.end_time - self.nss_fall_time)
-                        else:
-                            my_str = hex(cmd) + ', dict-error:' + str(error)
-                    half_status = 0
-                else:
-                    try:
-                        if (self.cmd_direct_read >> 16) == 0x06:
-                            modem_e_frame = True
-                            my_str = lr_modem_e.cmdResponseDict[self.cmd_direct_read](self) + modem_e_resp_crc_note(self)
-                        elif (self.cmd_direct_read >> 8) == 0x04:
-                            my_str = lr_gnss.cmdResponseDict[self.cmd_direct_read](self)
-                        elif (self.cmd_direct_read >> 8) == 0x03:
-                            my_str = lr_wifi.cmdResponseDict[self.cmd_direct_read](self)
-                        elif self.modem_e_active():
-                            # modem-e firmware: system/radio responses are [RC, payload, CRC] too, not [stat1, data]
-                            modem_e_frame = True
-                            handler = self.cmdResponseDict[self.cmd_direct_read]
-                            if self.ba_miso[0] != 0 and modem_e_rc_crc_ok(self.ba_miso):
-                                # error frame: [RC, CRC] only, no payload follows
-                                my_str = handler.__name__.replace('Response', '', 1) + ' RC=' + modem_e_rc_dict.get(self.ba_miso[0], hex(self.ba_miso[0]) + '?')
-                            else:
-                                my_str = handler(self) + modem_e_resp_crc_note(self)
-                        else:
-                            my_str = self.cmdResponseDict[self.cmd_direct_read](self)
-                    except Exception as error:
-                        my_str = hex(self.cmd_direct_read) + ', response-dict-error:' + str(error)
-
-                    half_status = 1
-                    self.cmd_direct_read = 0
-
-                if len(self.ba_mosi) > 1 and not modem_e_frame:
-                    my_str = my_str + ' (' + self.parseStatus(half_status) + ')'
-                #print('--> ', my_str)
-            else:
-                my_str = 'wakeup ' + str(frame.end_time - self.nss_fall_time)
-            return AnalyzerFrame('match', self.nss_fall_time, frame.end_time, {'string':my_str})
+            if self.coalesce_mode() == 'on':
+                return self.coalesce_frame(self.decode_buffered(frame.end_time))
+            return self.decode_buffered(frame.end_time)
         elif frame.type == 'error':
-            print('error');
-
+            print('SPI error frame at', frame.start_time, file=sys.stderr)  # stdout is the decoded output
+            return self.flush()  # coalesce: an error breaks the run
+
+# every decoder group's command and response tables, flattened into one registry;
+# the other groups are added by load_group on first use
+opTable = {}
+compile_group(opTable, Hla, GROUP_SYSTEM)
+pendingGroups = dict(lazyGroups)
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+# analyzer benchmarks, run outside Logic 2
+#
+#   python3 lr_bench.py startup [--runs 10]
+#   python3 lr_bench.py throughput [--rounds 4] [--repeat 3] [--json out.json] [--baseline old.json]
+#   python3 lr_bench.py bsp [--number 20000] [--repeat 5]
+#
+# startup: what Logic 2 waits for when the extension is added to a capture -- module
+# import, Hla() construction and the first decoded frame -- plus the one-time cost of
+# the first frame of each lazily loaded decoder group.  every run is a fresh
+# interpreter, so nothing is already imported; the median of the runs is reported.
+#
+# throughput: decodes the lr_traffic synthetic capture (every opcode, transceiver
+# and Modem-E framing) and reports frames/s and transactions/s per opcode family and
+# overall, best of --repeat runs, and the peak memory traced while decoding.  --json
+# saves the results; --baseline compares against a saved run.
+#
+# bsp: the Modem-E BSP handlers compiled from lr_modem_e.bspSchema against the
+# handwritten handlers they replaced (kept below), called on the same command and
+# response frames.  both must give the same text; reports ns per call, best of
+# --repeat runs of --number calls, and the compiled/handwritten ratio.
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from lr_modem_e import _i8, _u32, _rc, paSelDict
+
+# runs in the fresh interpreter; prints one JSON object of milliseconds
+_startupScript = r'''
+import argparse, csv, json, time, types  # spi_hla's own imports, outside the measurement
+t0 = time.perf_counter()
+import spi_hla  # installs the saleae stand-in when needed, imports HighLevelAnalyzer
+t1 = time.perf_counter()
+hla = spi_hla.new_hla()
+t2 = time.perf_counter()
+
+def transaction(mosi, t):
+    hla.decode(spi_hla.AnalyzerFrame('enable', t, t))
+    for b in mosi:
+        hla.decode(spi_hla.AnalyzerFrame('result', t, t, {'mosi': bytes((b,)), 'miso': b'\x00'}))
+    hla.decode(spi_hla.AnalyzerFrame('disable', t, t + 0.001))
+
+def timed(mosi, t):
+    t0 = time.perf_counter()
+    transaction(mosi, t)
+    return (time.perf_counter() - t0) * 1e3
+
+out = {'import': (t1 - t0) * 1e3, 'init': (t2 - t1) * 1e3}
+out['first_frame'] = timed(b'\x01\x00\x00\x00\x00\x00', 1.0)  # GetStatus
+out['first_wifi'] = timed(b'\x03\x00' + bytes(9), 2.0)         # WifiScan
+out['first_gnss'] = timed(b'\x04\x00\x03', 3.0)                # GnssSetConstellationToUse
+out['first_modem_e'] = timed(b'\x06\x01\x01\x00', 4.0)         # ModemGetVersion
+out['next_frame'] = timed(b'\x01\x00\x00\x00\x00\x00', 5.0)
+print(json.dumps(out))
+'''
+
+startupRows = (
+    ('import', 'import HighLevelAnalyzer'),
+    ('init', 'Hla()'),
+    ('first_frame', 'first frame (GetStatus)'),
+    ('first_wifi', 'first wifi frame'),
+    ('first_gnss', 'first gnss frame'),
+    ('first_modem_e', 'first modem-e frame'),
+    ('next_frame', 'GetStatus again'),
+)
+
+def startup(runs):
+    here = os.path.dirname(os.path.abspath(__file__))
+    samples = []
+    for _ in range(runs):
+        res = subprocess.run([sys.executable, '-c', _startupScript], cwd=here,
+                             capture_output=True, text=True, check=True)
+        samples.append(json.loads(res.stdout.splitlines()[-1]))
+    return {key: statistics.median(s[key] for s in samples) for key, _ in startupRows}
+
+framings = (('transceiver', False), ('modem-e', True))
+
+def _decode_all(hla, frames):
+    decode = hla.decode
+    for frame in frames:
+        decode(frame)
+
+def throughput(rounds, repeat, seed=1):
+    import spi_hla  # installs the saleae stand-in when needed
+    import lr_traffic
+    results = {}
+    for name, modem_e in framings:
+        txns = lr_traffic.transactions(seed, modem_e, rounds)
+        # one frame list per transaction, built before the clock starts
+        per_txn = [(fam, list(lr_traffic.frames([(fam, mosi, miso)], i * 0.001)))
+                   for i, (fam, mosi, miso) in enumerate(txns)]
+        frames = [frame for _, txn_frames in per_txn for frame in txn_frames]
+        families = {}
+        for fam, txn_frames in per_txn:
+            counts = families.setdefault(fam, [0, 0])
+            counts[0] += 1
+            counts[1] += len(txn_frames)
+
+        # warm-up: the first decode of each group imports and compiles its decoders
+        _decode_all(spi_hla.new_hla(name), frames)
+
+        # each run times every transaction into its family; the overall time and the
+        # family times reported are those of the fastest run
+        best = None
+        fam_best = None
+        clock = time.perf_counter
+        for _ in range(repeat):
+            hla = spi_hla.new_hla(name)
+            decode = hla.decode
+            fam_time = dict.fromkeys(families, 0.0)
+            start = clock()
+            for fam, txn_frames in per_txn:
+                t0 = clock()
+                for frame in txn_frames:
+                    decode(frame)
+                fam_time[fam] += clock() - t0
+            elapsed = clock() - start
+            if best is None or elapsed < best:
+                best = elapsed
+                fam_best = fam_time
+
+        tracemalloc.start()
+        _decode_all(spi_hla.new_hla(name), frames)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        results[name] = {
+            'transactions': len(per_txn),
+            'frames': len(frames),
+            'seconds': best,
+            'transactions_per_sec': len(per_txn) / best,
+            'frames_per_sec': len(frames) / best,
+            'peak_kib': peak / 1024,
+            'families': {fam: {
+                'transactions': n_txn,
+                'frames': n_frames,
+                'seconds': fam_best[fam],
+                'transactions_per_sec': n_txn / fam_best[fam],
+                'frames_per_sec': n_frames / fam_best[fam],
+            } for fam, (n_txn, n_frames) in sorted(families.items())},
+        }
+    return {
+        'bench': 'throughput',
+        'time': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': seed,
+        'rounds': rounds,
+        'repeat': repeat,
+        'results': results,
+    }
+
+def print_throughput(run, baseline=None):
+    for name, res in run['results'].items():
+        print('%s: %d transactions, %d frames, peak %.0f KiB' % (
+            name, res['transactions'], res['frames'], res['peak_kib']))
+        rows = list(res['families'].items()) + [('overall', res)]
+        for fam, r in rows:
+            line = '  %-18s %10.0f frames/s %10.0f transactions/s' % (
+                fam, r['frames_per_sec'], r['transactions_per_sec'])
+            if baseline is not None:
+                old = baseline['results'].get(name, {})
+                old = old if fam == 'overall' else old.get('families', {}).get(fam)
+                if old:
+                    line += '  %+6.1f%%' % ((r['transactions_per_sec'] / old['transactions_per_sec'] - 1) * 100)
+            print(line)
+
+# the handwritten BSP handlers lr_schema replaced, as the bsp benchmark's reference
+class HandwrittenBsp:
+    def BspGetTxPowerOffset(self):
+        self.state.next_transfer_response = 1
+        return 'BspGetTxPowerOffset (request)'
+
+    def ResponseBspGetTxPowerOffset(self):
+        return 'BspGetTxPowerOffset ' + str(_i8(self.ba_miso[1])) + 'dB (' + _rc(self.ba_miso) + ')'
+
+    def BspSetTxPowerOffset(self):
+        return 'BspSetTxPowerOffset ' + str(_i8(self.ba_mosi[3])) + 'dB'
+
+    def BspGetOutputPowerConfig(self):
+        self.state.next_transfer_response = 1
+        return 'BspGetOutputPowerConfig (request)'
+
+    def ResponseBspGetOutputPowerConfig(self):
+        return 'BspGetOutputPowerConfig ' + str(max(0, len(self.ba_miso)-2)) + ' bytes (' + _rc(self.ba_miso) + ')'
+
+    def BspSetOutputPowerConfig(self):
+        return 'BspSetOutputPowerConfig ' + str(len(self.ba_mosi)-3) + ' bytes'
+
+    def BspGetRfOutput(self):
+        self.state.next_transfer_response = 1
+        return 'BspGetRfOutput (request)'
+
+    def ResponseBspGetRfOutput(self):
+        pa = self.ba_miso[1]
+        return 'BspGetRfOutput ' + paSelDict.get(pa, hex(pa)+'?') + ' (' + _rc(self.ba_miso) + ')'
+
+    def BspSetRfOutput(self):
+        pa = self.ba_mosi[3]
+        return 'BspSetRfOutput ' + paSelDict.get(pa, hex(pa)+'?')
+
+    def BspGetCrystalError(self):
+        self.state.next_transfer_response = 1
+        return 'BspGetCrystalError (request)'
+
+    def ResponseBspGetCrystalError(self):
+        return 'BspGetCrystalError ' + str(_u32(self.ba_miso, 1)) + 'ppm (' + _rc(self.ba_miso) + ')'
+
+    def BspSetCrystalError(self):
+        return 'BspSetCrystalError ' + str(_u32(self.ba_mosi, 3)) + 'ppm'
+
+    def BspGetXoscCapaTrimAB(self):
+        self.state.next_transfer_response = 1
+        return 'BspGetXoscCapaTrimAB (request)'
+
+    def ResponseBspGetXoscCapaTrimAB(self):
+        return 'BspGetXoscCapaTrimAB A=' + hex(self.ba_miso[1]) + ' B=' + hex(self.ba_miso[2]) + ' (' + _rc(self.ba_miso) + ')'
+
+    def BspSetXoscCapaTrimAB(self):
+        return 'BspSetXoscCapaTrimAB A=' + hex(self.ba_mosi[3]) + ' B=' + hex(self.ba_mosi[4])
+
+    def BspGetTxPowerConsumption(self):
+        self.state.next_transfer_response = 1
+        return 'BspGetTxPowerConsumption (request)'
+
+    def ResponseBspGetTxPowerConsumption(self):
+        return 'BspGetTxPowerConsumption ' + str(max(0, len(self.ba_miso)-2)) + ' bytes (' + _rc(self.ba_miso) + ')'
+
+    def BspSetTxPowerConsumption(self):
+        return 'BspSetTxPowerConsumption ' + str(len(self.ba_mosi)-3) + ' bytes'
+
+    def _rx_consumption_str(self, name):
+        # 8 bytes: consumption_rx_boosted_off_ua u32, consumption_rx_boosted_on_ua u32
+        if len(self.ba_miso) >= 9:
+            off_ua = _u32(self.ba_miso, 1)
+            on_ua = _u32(self.ba_miso, 5)
+            return name + ' boostedOff=' + str(off_ua) + 'uA boostedOn=' + str(on_ua) + 'uA (' + _rc(self.ba_miso) + ')'
+        return name + ' (' + _rc(self.ba_miso) + ')'
+
+    def BspGetLoraRxPowerConsumption(self):
+        self.state.next_transfer_response = 1
+        return 'BspGetLoraRxPowerConsumption (request)'
+
+    def ResponseBspGetLoraRxPowerConsumption(self):
+        return HandwrittenBsp._rx_consumption_str(self, 'BspGetLoraRxPowerConsumption')
+
+    def BspSetLoraRxPowerConsumption(self):
+        return 'BspSetLoraRxPowerConsumption boostedOff=' + str(_u32(self.ba_mosi, 3)) + 'uA boostedOn=' + str(_u32(self.ba_mosi, 7)) + 'uA'
+
+    def BspGetGfskRxPowerConsumption(self):
+        self.state.next_transfer_response = 1
+        return 'BspGetGfskRxPowerConsumption (request)'
+
+    def ResponseBspGetGfskRxPowerConsumption(self):
+        return HandwrittenBsp._rx_consumption_str(self, 'BspGetGfskRxPowerConsumption')
+
+    def BspSetGfskRxPowerConsumption(self):
+        return 'BspSetGfskRxPowerConsumption boostedOff=' + str(_u32(self.ba_mosi, 3)) + 'uA boostedOn=' + str(_u32(self.ba_mosi, 7)) + 'uA'
+
+def _best(call, variants, number, repeat):
+    # best ns per call of call(handler, mosi, miso) over each variant's frames; the
+    # variants take turns within each run so drift in the machine hits them alike
+    best = [None] * len(variants)
+    for _ in range(repeat):
+        for i, frames in enumerate(variants):
+            t0 = time.perf_counter()
+            for _ in range(number):
+                for handler, mosi, miso in frames:
+                    call(handler, mosi, miso)
+            elapsed = time.perf_counter() - t0
+            best[i] = elapsed if best[i] is None else min(best[i], elapsed)
+    return [b / (number * len(frames)) * 1e9 for b, frames in zip(best, variants)]
+
+def bsp(number, repeat):
+    import spi_hla  # installs the saleae stand-in when needed
+    from lr_modem_e import bsp as compiled, bspSchema, crc8
+    hla = spi_hla.new_hla('modem-e')
+
+    def call(handler, mosi, miso):
+        hla.ba_mosi = mosi
+        hla.ba_miso = miso
+        return handler(hla)
+
+    # every field of every frame in range: 8 payload bytes after the opcode / RC
+    payload = bytes((0x81, 0x02, 0x00, 0x00, 0x01, 0x2c, 0x00, 0x00))
+    rows = []
+    for op in bspSchema['ops']:
+        mosi = op['opcode'].to_bytes(3, 'big') + payload
+        mosi = memoryview(mosi + bytes((crc8(0xFF, mosi),)))
+        miso = memoryview(bytes(len(mosi)))
+        rows.append((op['name'], 'command', compiled.cmdDict[op['opcode']],
+                     getattr(HandwrittenBsp, op['name']), mosi, miso))
+        if op['kind'] == 'read':
+            miso = b'\x00' + payload
+            miso = memoryview(miso + bytes((crc8(0xFF, miso),)))
+            mosi = memoryview(bytes(len(miso)))
+            rows.append((op['name'], 'response', compiled.cmdResponseDict[op['opcode']],
+                         getattr(HandwrittenBsp, 'Response' + op['name']), mosi, miso))
+
+    results = []
+    for name, frame, gen, hand, mosi, miso in rows:
+        if call(gen, mosi, miso) != call(hand, mosi, miso):
+            raise SystemExit(f'{name} {frame}: compiled and handwritten text differ')
+        results.append((name, frame) + tuple(_best(call, ([(gen, mosi, miso)], [(hand, mosi, miso)]),
+                                                   number, repeat)))
+    every_gen = [(gen, mosi, miso) for _, _, gen, _, mosi, miso in rows]
+    every_hand = [(hand, mosi, miso) for _, _, _, hand, mosi, miso in rows]
+    return results, _best(call, (every_gen, every_hand), number, repeat)
+
+def print_bsp(results, overall):
+    print('%-30s %-8s %10s %12s %7s' % ('handler', 'frame', 'compiled', 'handwritten', 'ratio'))
+    for name, frame, gen, hand in results:
+        print('%-30s %-8s %7.0f ns %9.0f ns %6.2fx' % (name, frame, gen, hand, gen / hand))
+    gen, hand = overall
+    print('%-30s %-8s %7.0f ns %9.0f ns %6.2fx' % ('all frames', '', gen, hand, gen / hand))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='LR11xx analyzer benchmarks')
+    sub = parser.add_subparsers(dest='bench', required=True)
+    p = sub.add_parser('startup', help='extension load and first-frame latency')
+    p.add_argument('--runs', type=int, default=10, help='fresh interpreters to run, default 10')
+    p = sub.add_parser('throughput', help='decode rate per opcode family on synthetic traffic')
+    p.add_argument('--rounds', type=int, default=4, help='times every opcode is sent, default 4')
+    p.add_argument('--repeat', type=int, default=3, help='runs to take the best of, default 3')
+    p.add_argument('--json', help='save the results here')
+    p.add_argument('--baseline', help='results saved by an earlier run, to compare against')
+    p = sub.add_parser('bsp', help='schema-compiled against handwritten BSP handlers')
+    p.add_argument('--number', type=int, default=20000, help='calls of each frame per run, default 20000')
+    p.add_argument('--repeat', type=int, default=5, help='runs to take the best of, default 5')
+    args = parser.parse_args(argv)
+
+    if args.bench == 'startup':
+        result = startup(args.runs)
+        for key, label in startupRows:
+            print('%-26s %8.3f ms' % (label, result[key]))
+    elif args.bench == 'throughput':
+        run = throughput(args.rounds, args.repeat)
+        baseline = None
+        if args.baseline:
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        print_throughput(run, baseline)
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(run, f, indent=1)
+    elif args.bench == 'bsp':
+        print_bsp(*bsp(args.number, args.repeat))
+
+if __name__ == '__main__':
+    main()
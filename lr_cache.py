@@ -0,0 +1,63 @@
+# decode-result cache for Hla.decode
+# production firmware repeats the same transactions byte for byte (status and irq
+# polls, ClearIrq, SetRx, modem-e event polls and RC read-backs), so a bounded LRU
+# keyed by the raw MOSI/MISO bytes plus the decoder state that affects the output
+# lets a repeat skip dispatch and the handler entirely.  a hit replays the state
+# changes the original decode made.  opcodes whose decoders keep other state are
+# listed in cmdUncacheable and always decode.
+
+import os
+from collections import OrderedDict
+
+from lr_state import DecodeState
+
+CACHE_MAX_XFER = 64  # longer transactions are rarely repeated; don't spend memory on them
+CACHE_DEFAULT_SIZE = 4096  # entries, with the 'cache' setting on
+
+# DecodeState slots a cacheable transaction can change; a hit replays the changes
+stateAttrs = ('pt', 'cmd_direct_read', 'next_transfer_response', 'modem_e_rc_pending', 'modem_e_seen', 'len')
+
+# all the decoder state that carries from one transaction to the next, for checkpoints
+checkpointAttrs = DecodeState.__slots__
+
+def cache_size(value=None):
+    # value: the 'cache' setting, or None outside Logic 2, where LR11XX_DECODE_CACHE
+    # gives on, off or the maximum entries.  off (0) unless set, since building the
+    # key costs about as much as decoding a short transaction does
+    if not isinstance(value, str):
+        value = os.environ.get('LR11XX_DECODE_CACHE', 'off')
+    if value == 'on':
+        return CACHE_DEFAULT_SIZE
+    try:
+        return int(value)
+    except ValueError:
+        return 0
+
+class DecodeCache:
+    __slots__ = ('entries', 'size', 'hits', 'misses')
+
+    def __init__(self, size):
+        self.entries = OrderedDict()
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        # (text, state changes, crc verdict) or None
+        hit = self.entries.get(key)
+        if hit is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return hit
+
+    def put(self, key, text, before, after, crc_check=None):
+        # before/after: stateAttrs values around the decode; crc_check: Hla.crc_check
+        changes = tuple((name, new) for name, old, new in zip(stateAttrs, before, after) if new != old)
+        self.entries[key] = (text, changes, crc_check)
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
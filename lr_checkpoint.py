@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# decoder-state checkpoints for random access into long captures
+# 'build' decodes a CSV export once and saves, every --every transactions, the
+# decoder state (Hla.get_state), the end time of the last transaction and the byte
+# offset in the CSV where the next one starts.  'window' then decodes only the
+# transactions starting in [--start, --end): it seeks to the last checkpoint before
+# --start, restores its state and decodes from there, so the cost follows the window
+# and not its position in the capture.  the output is the spi_hla.py lines of those
+# transactions.
+# the state depends on the firmware and output settings, so a checkpoint file holds
+# one of each; build another to decode with others.
+#
+#   python3 lr_checkpoint.py build capture.csv [--every 10000] [--firmware modem-e] [--typed]
+#   python3 lr_checkpoint.py window capture.csv --start 12.5 --end 13 [-o decoded.txt]
+
+import argparse
+import bisect
+import itertools
+import json
+import os
+import sys
+
+import spi_hla
+
+class LineReader:
+    # the text lines of a CSV opened in binary, keeping the byte offset after the last
+    # line read; csv.reader pulls one line per row, so after a row is parsed .offset is
+    # where the next row starts
+    __slots__ = ('f', 'offset')
+
+    def __init__(self, f):
+        self.f = f
+        self.offset = f.tell()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = self.f.readline()
+        if not line:
+            raise StopIteration
+        self.offset += len(line)
+        return line.decode()
+
+def capture_id(path):
+    st = os.stat(path)
+    return {'size': st.st_size, 'mtime': st.st_mtime}
+
+def checkpoint_path(path):
+    return path + '.ckpt'
+
+def build(path, firmware=None, typed=False, every=10000):
+    # decode the whole capture once; the checkpoint index
+    hla = spi_hla.new_hla(firmware, typed)
+    with open(path, 'rb') as f:
+        lines = LineReader(f)
+        header = next(lines)
+        checkpoints = [[0, float('-inf'), lines.offset, hla.get_state()]]
+        txns = spi_hla.read_csv_transactions(itertools.chain((header,), lines))
+        for n, (start, end, mosi, miso) in enumerate(txns, 1):
+            hla.decode_transaction(mosi, miso, start, end)
+            if n % every == 0:
+                checkpoints.append([n, end, lines.offset, hla.get_state()])
+    return {'capture': capture_id(path), 'firmware': hla.firmware_mode(), 'output': hla.output_mode(),
+            'every': every, 'header': header, 'checkpoints': checkpoints}
+
+def save(index, path):
+    with open(path, 'w') as f:
+        json.dump(index, f)
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+def resume(index, f, t):
+    # (analyzer, transactions of the capture open as f) from the last checkpoint before time t on
+    checkpoints = index['checkpoints']
+    i = bisect.bisect_right([c[1] for c in checkpoints], t) - 1
+    n, _, offset, state = checkpoints[max(i, 0)]
+    hla = spi_hla.new_hla(index['firmware'], index['output'] == 'typed')
+    hla.set_state(state)
+    f.seek(offset)
+    return hla, spi_hla.read_csv_transactions(itertools.chain((index['header'],), LineReader(f)))
+
+def window(index, path, start, end):
+    # yield the decoded lines of the transactions starting in [start, end)
+    with open(path, 'rb') as f:
+        hla, txns = resume(index, f, start)
+        for t0, t1, mosi, miso in txns:
+            if t0 >= end:
+                break
+            frame = hla.decode_transaction(mosi, miso, t0, t1)
+            if t0 >= start:
+                yield spi_hla.format_frame(frame)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='decoder-state checkpoints for LR11xx CSV captures')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    p = sub.add_parser('build', help='decode the capture once and save checkpoints')
+    p.add_argument('csv', help='SPI analyzer table export')
+    p.add_argument('--every', type=int, default=10000, help='transactions between checkpoints')
+    p.add_argument('--firmware', choices=('auto', 'modem-e', 'transceiver'),
+                   help='LR11xx firmware, default $LR11XX_FIRMWARE or auto')
+    p.add_argument('--typed', action='store_true', help='checkpoints for typed output')
+    p.add_argument('--checkpoints', help='checkpoint file, default <csv>.ckpt')
+    p = sub.add_parser('window', help='decode the transactions starting in a time window')
+    p.add_argument('csv', help='SPI analyzer table export')
+    p.add_argument('--start', type=float, required=True, help='window start, seconds')
+    p.add_argument('--end', type=float, default=float('inf'), help='window end, seconds')
+    p.add_argument('--checkpoints', help='checkpoint file, default <csv>.ckpt')
+    p.add_argument('-o', '--output', help='write decoded transactions here instead of stdout')
+    args = parser.parse_args(argv)
+
+    ckpt = args.checkpoints or checkpoint_path(args.csv)
+    if args.cmd == 'build':
+        index = build(args.csv, args.firmware, args.typed, args.every)
+        save(index, ckpt)
+        print(f"{len(index['checkpoints'])} checkpoints saved to {ckpt}", file=sys.stderr)
+        return 0
+    index = load(ckpt)
+    if index['capture'] != capture_id(args.csv):
+        parser.error(f'{ckpt} was built for another version of {args.csv}; rebuild it')
+    dst = sys.stdout if args.output is None else open(args.output, 'w')
+    try:
+        dst.writelines(window(index, args.csv, args.start, args.end))
+    finally:
+        if dst is not sys.stdout:
+            dst.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# golden-output regression corpus
+# corpus/<stream>.csv is a Logic 2 SPI analyzer table export; corpus/<stream>.expected
+# is its decoded output in spi_hla.py format (start <tab> end <tab> text).  the
+# runner replays every stream through Hla offline, reports any line that differs
+# from the expected output, and times the decode of each stream, so a refactor of
+# decode, parseStatus or a group decoder is checked for identical output and for
+# speed in one run.
+#
+#   python3 lr_corpus.py [stream ...] [--repeat 3] [--json times.json] [--baseline old.json]
+#   python3 lr_corpus.py --update        # rewrite the .expected files after an intended change
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import spi_hla
+
+corpusDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+
+# stream -> firmware setting it is decoded with
+corpusStreams = {
+    'transceiver_lora': 'transceiver',  # LoRa init, TX, RX with buffer/packet status reads, sleep
+    'transceiver_fsk': 'transceiver',   # GFSK init and continuous RX
+    'modem_e': 'modem-e',               # Modem-E join and uplinks, RC read-backs, error RCs
+    'auto_switch': 'auto',              # transceiver framing until the first 0x06xx command
+    'gnss_scan': 'transceiver',         # GNSS scan and result reads
+    'wifi_scan': 'transceiver',         # WiFi scan, results, country code search
+    'bootloader': 'transceiver',        # bootloader: EUIs, erase, encrypted flash writes, hash
+}
+
+def decode_stream(name, frames):
+    hla = spi_hla.new_hla(corpusStreams[name])
+    return [spi_hla.format_frame(fr) for fr in spi_hla.decode_frames(hla, frames)]
+
+def run(names, repeat, update=False):
+    results = {}
+    failed = 0
+    for name in names:
+        with open(os.path.join(corpusDir, name + '.csv'), newline='') as f:
+            frames = list(spi_hla.read_csv(f))
+        best = None
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            lines = decode_stream(name, frames)
+            elapsed = time.perf_counter() - t0
+            best = elapsed if best is None else min(best, elapsed)
+        path = os.path.join(corpusDir, name + '.expected')
+        if update:
+            with open(path, 'w') as f:
+                f.writelines(lines)
+            status = 'updated'
+        else:
+            with open(path) as f:
+                expected = f.readlines()
+            status = 'ok'
+            for i, (got, want) in enumerate(zip(lines, expected)):
+                if got != want:
+                    status = 'FAIL'
+                    print(f'{name}:{i + 1}: expected {want.rstrip()!r}', file=sys.stderr)
+                    print(f'{name}:{i + 1}:      got {got.rstrip()!r}', file=sys.stderr)
+                    break
+            else:
+                if len(lines) != len(expected):
+                    status = 'FAIL'
+                    print(f'{name}: {len(lines)} lines, expected {len(expected)}', file=sys.stderr)
+            if status == 'FAIL':
+                failed += 1
+        results[name] = {'status': status, 'frames': len(frames), 'transactions': len(lines),
+                         'seconds': best}
+    return results, failed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='replay the LR11xx corpus and check the decoded output')
+    parser.add_argument('streams', nargs='*', help='streams to run, default all')
+    parser.add_argument('--update', action='store_true', help='rewrite the expected output')
+    parser.add_argument('--repeat', type=int, default=3, help='decodes per stream to take the best time of')
+    parser.add_argument('--json', help='save the per-stream results here')
+    parser.add_argument('--baseline', help='results saved by an earlier run, to compare times against')
+    args = parser.parse_args(argv)
+
+    names = args.streams or list(corpusStreams)
+    for name in names:
+        if name not in corpusStreams:
+            parser.error(f'unknown stream {name}')
+    results, failed = run(names, args.repeat, args.update)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    for name, r in results.items():
+        line = '%-18s %-7s %6d transactions %9.3f ms' % (name, r['status'], r['transactions'], r['seconds'] * 1e3)
+        if name in baseline:
+            line += '  %+6.1f%%' % ((r['seconds'] / baseline[name]['seconds'] - 1) * 100)
+        print(line)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=1)
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,133 @@
+# flat opcode registry for Hla.decode
+# the per-group cmdDict / cmdResponseDict tables (Hla, LrWifi, LrGnss, LrModemE) are
+# compiled into a single dict keyed by opcode, so routing a transaction is one lookup.
+# the system group is compiled at import; the wifi, gnss and modem-e groups (see
+# lazyGroups) are imported and compiled the first time their opcode group is seen.
+# keys are the 16-bit opcode for the system, radio, wifi, gnss and bootloader groups,
+# and the 24-bit (group << 8) | cmd header for the modem-e 0x06xx groups; the two
+# ranges can't collide.
+
+import threading
+
+# which decoder group an opcode belongs to; selects the response framing
+GROUP_SYSTEM = 0   # system, radio, bootloader: [stat1, data], or [RC, data, CRC] under modem-e
+GROUP_WIFI = 3
+GROUP_GNSS = 4
+GROUP_MODEM_E = 6  # always [RC, data, CRC]
+
+# what the host does after the command frame
+KIND_WRITE = 0        # nothing more, or (modem-e) a 2-byte RC read-back
+KIND_READ = 1         # the response is clocked out in the next transfer
+KIND_WRITE_NO_RC = 2  # modem-e write_without_rc: no RC read-back follows
+
+# how to decode a transaction whose opcode isn't in the registry
+FALLBACK_UNKNOWN = 0      # unknown command
+FALLBACK_IRQ_READ = 1     # MOSI 00 00 ...: GetStatus-style read, MISO[2:6] is the irq word
+FALLBACK_ORPHAN_READ = 2  # MOSI 00 00 ... under modem-e: response of an undecoded command
+FALLBACK_SHORT_READ = 3   # MOSI 00 00 (or shorter): nothing past the status bytes
+# the other paths of Hla.dispatch that don't run a decoder
+FALLBACK_RC_READBACK = 4       # MOSI 00 00 after a modem-e write: MISO [RC, CRC]
+FALLBACK_UNKNOWN_RESPONSE = 5  # the response of a command without a response decoder
+
+# (MOSI[0] == 0, more than 2 bytes, modem-e framing active) -> FALLBACK_*
+fallbackTable = {
+    (False, False, False): FALLBACK_UNKNOWN,
+    (False, False, True): FALLBACK_UNKNOWN,
+    (False, True, False): FALLBACK_UNKNOWN,
+    (False, True, True): FALLBACK_UNKNOWN,
+    (True, False, False): FALLBACK_SHORT_READ,
+    (True, False, True): FALLBACK_SHORT_READ,
+    (True, True, False): FALLBACK_IRQ_READ,
+    (True, True, True): FALLBACK_ORPHAN_READ,
+}
+
+# decoder groups loaded on first use: MOSI[0] -> (module, class, group)
+lazyGroups = {
+    0x03: ('lr_wifi', 'LrWifi', GROUP_WIFI),
+    0x04: ('lr_gnss', 'LrGnss', GROUP_GNSS),
+    0x06: ('lr_modem_e', 'LrModemE', GROUP_MODEM_E),
+}
+
+class OpEntry:
+    __slots__ = ('opcode', 'name', 'handler', 'response', 'kind', 'group', 'min_len', 'resp_min_len', 'cacheable',
+                 'typed', 'typed_response')
+
+    def __init__(self, opcode, handler, response, kind, group, min_len=0, resp_min_len=0, cacheable=True,
+                 typed=None, typed_response=None):
+        self.opcode = opcode
+        self.name = handler.__name__
+        self.handler = handler    # called with the Hla as self on the command frame
+        self.response = response  # called with the Hla as self on the response frame, or None
+        self.kind = kind
+        self.group = group
+        # bytes each decoder reads: an int, or a dict keyed by PacketType when the
+        # layout follows the packet type
+        self.min_len = min_len
+        self.resp_min_len = resp_min_len
+        self.cacheable = cacheable  # output depends only on the bytes and the cache key state
+        # typed output mode: decoders returning (result type, data of raw numbers), or None
+        self.typed = typed
+        self.typed_response = typed_response
+
+    def __repr__(self):
+        return f'OpEntry({self.opcode:#x} {self.name})'
+
+def compile_group(table, cls, group):
+    # add one decoder group (cmdDict, cmdResponseDict and the optional cmdMinLen,
+    # cmdResponseMinLen, cmdWithoutRc, cmdUncacheable, cmdTypedDict and
+    # cmdResponseTypedDict tables of cls) to the registry.  kind is the
+    # static classification; a command whose direction depends on its parameters
+    # (ModemTest sub-commands) still reports the actual direction through
+    # next_transfer_response
+    no_rc = getattr(cls, 'cmdWithoutRc', ())
+    min_lens = getattr(cls, 'cmdMinLen', {})
+    resp_min_lens = getattr(cls, 'cmdResponseMinLen', {})
+    uncacheable = getattr(cls, 'cmdUncacheable', ())
+    typed = getattr(cls, 'cmdTypedDict', {})
+    typed_responses = getattr(cls, 'cmdResponseTypedDict', {})
+    for opcode, handler in cls.cmdDict.items():
+        response = cls.cmdResponseDict.get(opcode)
+        if opcode in no_rc:
+            kind = KIND_WRITE_NO_RC
+        elif response is not None:
+            kind = KIND_READ
+        else:
+            kind = KIND_WRITE
+        table[opcode] = OpEntry(opcode, handler, response, kind, group,
+                                min_lens.get(opcode, 0), resp_min_lens.get(opcode, 0),
+                                opcode not in uncacheable, typed.get(opcode), typed_responses.get(opcode))
+    return table
+
+groupLock = threading.Lock()
+
+def load_group(table, first_byte, pending):
+    # import the decoder group of MOSI[0] and add it to the registry; pending holds
+    # the lazyGroups entries not loaded yet.  analyzers in other threads may ask for
+    # the same group: one loads it while the rest wait, and it leaves pending only
+    # once all its opcodes are in the registry
+    with groupLock:
+        spec = pending.get(first_byte)
+        if spec is None:
+            return False
+        module, cls, group = spec
+        compile_group(table, getattr(__import__(module), cls), group)
+        del pending[first_byte]
+    return True
+
+def opcode_key(ba_mosi):
+    # registry key of a command frame: 3-byte header for modem-e groups, else 2 bytes
+    if ba_mosi[0] == 0x06:
+        return int.from_bytes(ba_mosi[0:3], 'big')
+    return int.from_bytes(ba_mosi[0:2], 'big')
+
+def need_len(need, pt):
+    # resolve a min_len / resp_min_len for the current packet type
+    if need.__class__ is dict:
+        return need.get(pt, 0)
+    return need
+
+def short_frame(name, have, need):
+    return f'{name} short frame, {have} of {need} bytes'
+
+def short_response(name, have, need):
+    return f'{name} short response, {have} of {need} bytes'
@@ -0,0 +1,54 @@
+# field extraction from the transaction views
+# every layout is a struct.Struct compiled once at import and read with
+# unpack_from straight out of the memoryview: no slice or bytearray copy.  the
+# per-opcode cmdMinLen / cmdResponseMinLen tables guarantee the bytes are there
+# before a decoder runs.
+
+import struct
+
+_u16 = struct.Struct('>H').unpack_from
+_u24 = struct.Struct('>BH').unpack_from
+_u32 = struct.Struct('>I').unpack_from
+_u64 = struct.Struct('>Q').unpack_from
+_s8 = struct.Struct('>b').unpack_from
+_s16 = struct.Struct('>h').unpack_from
+_u32le = struct.Struct('<I').unpack_from
+
+def u16(buf, offset):
+    return _u16(buf, offset)[0]
+
+def u24(buf, offset):
+    hi, lo = _u24(buf, offset)
+    return (hi << 16) | lo
+
+def u32(buf, offset):
+    return _u32(buf, offset)[0]
+
+def u64(buf, offset):
+    return _u64(buf, offset)[0]
+
+def s8(buf, offset):
+    return _s8(buf, offset)[0]
+
+def s16(buf, offset):
+    return _s16(buf, offset)[0]
+
+def u32le(buf, offset):
+    return _u32le(buf, offset)[0]
+
+# per-command layouts: every field a hot decoder reads, in one unpack_from call.
+# offsets count from the start of the frame: MOSI leads with the 2 opcode bytes,
+# a response's MISO with stat1
+setRxTxFields = struct.Struct('>2xBH').unpack_from              # timeout: high byte, low 16 bits
+setRfFrequencyFields = struct.Struct('>2xI').unpack_from        # freq_hz
+setDioIrqParamsFields = struct.Struct('>2xII').unpack_from      # irq1, irq2
+modulationFskFields = struct.Struct('>2xIBBI').unpack_from      # br, bt, bw, fdev
+modulationLoraFields = struct.Struct('>2x4B').unpack_from       # sf, bw, cr, ldro
+modulationBpskFields = struct.Struct('>2xIB').unpack_from       # br, pulse_shape
+packetFskFields = struct.Struct('>2xH7B').unpack_from           # preamble, detect, sync word bits, addr comp, pkt type, pay len, crc, dc free
+packetLoraFields = struct.Struct('>2xH4B').unpack_from          # preamble, header, pay len, crc, iq
+packetBpskFields = struct.Struct('>2xBHHH').unpack_from         # pld len bytes, ramp up, ramp down, pld len bits
+statsFskFields = struct.Struct('>x3H').unpack_from              # received, crc error, len error
+statsLoraFields = struct.Struct('>x4H').unpack_from             # received, crc error, header error, false sync
+rxBufferStatusFields = struct.Struct('>xBB').unpack_from        # pay len, buffer offset
+packetStatusLoraFields = struct.Struct('>xBbB').unpack_from     # rssi_pkt, snr_pkt, signal_rssi_pkt
@@ -1,21 +1,30 @@
+import struct
+from lr_fields import u16, u24, u32, u32le, s16
+
+# lr11xx_gnss_cumulative_timing_t: 31 u32 after stat1
+cumulTimingLayout = struct.Struct('>31I')
+# lr11xx_gnss_doppler_solver_result_t, after stat1: error_code, nb_sv_used,
+# one_shot lat/lon/accuracy/xtal, filtered lat/lon/accuracy/xtal
+dopplerSolverLayout = struct.Struct('>BBhhHhhhHh')
+
+def gnss_scan(hla, label):
+    # GnssAutonomous / GnssAssisted: gps time, effort mode, result mask, nb_sv_max
+    time = u32(hla.ba_mosi, 2)
+    effort = hla.ba_mosi[6]
+    if effort == 0:
+        estr = 'lowPower'
+    elif effort == 1:
+        estr = 'bestEffort'
+    else:
+        estr = '?' + hex(effort) + '?'
+    resultMask = hla.ba_mosi[7]
+    nbSvMax = hla.ba_mosi[8]
+    return label + ' ' + str(time) + ' ' + estr + ' resultMask=' + hex(resultMask) + ' nbSvMax=' + str(nbSvMax)
 
 class LrGnss:
     def __init__(self):
         self.foo = 'bar'
 
-    def gnss_scan(self, label):
-        time = int.from_bytes(bytearray(self.ba_mosi[2:6]), 'big')
-        effort = self.ba_mosi[6]
-        if effort == 0:
-            estr = 'lowPower'
-        elif effort == 1:
-            estr = 'bestEffort'
-        else:
-            estr = '?' + hex(effort) + '?'
-        resultMask = self.ba_mosi[7]
-        nbSvMax = self.ba_mosi[8]
-        return label + ' ' + str(time) + ' ' + estr + ' resultMask=' + hex(resultMask) + ' nbSvMax=' + str(nbSvMax)
-
     def GnssSetConstellationToUse(self):
         bit_mask = self.ba_mosi[2]
         _str = 'GnssSetConstellationToUse '
@@ -37,7 +46,7 @@ class LrGnss:
         return _str.rstrip()
 
     def GnssReadConstellationToUse(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'GnssReadConstellationToUse (request)'
 
     def GnssSetAlmanacUpdate(self):
@@ -63,7 +72,7 @@ class LrGnss:
         return _str.rstrip()
 
     def GnssReadAlmanacUpdate(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'GnssReadAlmanacUpdate (request)'
 
     def GnssSetFreqSearchSpace(self):
@@ -78,7 +87,7 @@ class LrGnss:
         return f'GnssReadVersion firmware=0x{gnss_firmware:02x} almanac=0x{gnss_almanac:02x}'
 
     def GnssReadVersion(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'GnssReadVersion (request)'
 
     def GnssReadSupportedConstellations(self):
@@ -94,10 +103,10 @@ class LrGnss:
         return f'GnssSetMode {scan_mode_str}'
 
     def GnssAutonomous(self):
-        return self.gnss_scan('GnssAutonomous')
+        return gnss_scan(self, 'GnssAutonomous')
 
     def GnssAssisted(self):
-        return self.gnss_scan('GnssAssisted')
+        return gnss_scan(self, 'GnssAssisted')
 
     def GnssScan(self):
         effort = self.ba_mosi[2]
@@ -115,17 +124,26 @@ class LrGnss:
         return 'GnssScan ' + _str
 
     def ResponseGnssGetResultSize(self):
-        return 'GetResultSize ' + str(int.from_bytes(bytearray(self.ba_miso[1:3]), 'big'))
+        return 'GetResultSize ' + str(u16(self.ba_miso, 1))
 
     def GnssGetResultSize(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'GnssGetResultSize'
 
     def ResponseGnssReadResults(self):
-        return 'GnssReadResults TODO'
+        # the first byte is the destination of the result message (lr11xx_gnss_destination_t)
+        destination_dict = {
+            0x00: 'HOST',
+            0x01: 'SOLVER',
+            0x02: 'DMC'
+        }
+        destination = self.ba_miso[1]
+        dest_str = destination_dict.get(destination, f'?0x{destination:02x}?')
+        data = bytes(self.ba_miso[2:]).hex()
+        return f'GnssReadResults {len(self.ba_miso) - 1} bytes to {dest_str}: {data}'
 
     def GnssReadResults(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'GnssReadResults'
 
     def GnssAlmanacFullUpdate(self):
@@ -134,34 +152,34 @@ class LrGnss:
         return 'GnssAlmanacFullUpdate _len ' + str(_len) + ', blocks ' + str(_len/block_size)
 
     def ResponseGnssAlmanacRead(self):
-        address = int.from_bytes(bytearray(self.ba_miso[1:5]), 'big')
-        size = int.from_bytes(bytearray(self.ba_miso[5:7]), 'big')
+        address = u32(self.ba_miso, 1)
+        size = u16(self.ba_miso, 5)
         return 'GnssAlmanacRead address ' + hex(address) + ', size ' + hex(size)
 
     def GnssAlmanacRead(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'GnssAlmanacRead (request)'
 
     def GnssSetAssistancePosition(self):
-        _lat = int.from_bytes(bytearray(self.ba_mosi[2:4]), 'big')
+        _lat = u16(self.ba_mosi, 2)
         lat = _lat / (2048/90)
-        _lon = int.from_bytes(bytearray(self.ba_mosi[4:6]), 'big')
+        _lon = u16(self.ba_mosi, 4)
         if _lon > 0x7fff:
             _lon -= 0x10000
         lon = _lon / (2048/180)
         return 'GnssSetAssistancePosition ' + str(lat) + ', ' + str(lon)
 
     def ResponseGnssReadAssistancePosition(self):
-        _lat = int.from_bytes(bytearray(self.ba_miso[1:3]), 'big')
+        _lat = u16(self.ba_miso, 1)
         lat = _lat / (2048/90)
-        _lon = int.from_bytes(bytearray(self.ba_miso[3:5]), 'big')
+        _lon = u16(self.ba_miso, 3)
         if _lon > 0x7fff:
             _lon -= 0x10000
         lon = _lon / (2048/180)
         return 'assistance position ' + str(lat) + ', ' + str(lon)
 
     def GnssReadAssistancePosition(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'GnssReadAssistancePosition'
 
     def GnssPushSolverMsg(self):
@@ -180,7 +198,7 @@ class LrGnss:
         firmware_version = self.ba_miso[3]
 
         # Global almanac CRC (32-bit little-endian)
-        global_almanac_crc = int.from_bytes(bytearray(self.ba_miso[4:8]), 'little')
+        global_almanac_crc = u32le(self.ba_miso, 4)
 
         # Byte 8 contains error code and flags
         byte_8 = self.ba_miso[8]
@@ -231,14 +249,14 @@ class LrGnss:
         return _str
 
     def GnssGetContextStatus(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'GnssGetContextStatus'
 
     def ResponseGnssGetNbSvDetected(self):
         return 'GnssGetNbSvDetected ' + str(self.ba_miso[1])
 
     def GnssGetNbSvDetected(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'GnssGetNbSvDetected'
 
     def ResponseGnssGetSvDetected(self):
@@ -259,12 +277,7 @@ class LrGnss:
             satellite_id = self.ba_miso[offset]
             cnr_raw = self.ba_miso[offset + 1]
             cnr = cnr_raw + 31  # LR11XX_GNSS_SNR_TO_CNR_OFFSET
-            doppler_raw = int.from_bytes(bytearray(self.ba_miso[offset + 2:offset + 4]), 'big')
-            # Convert to signed 16-bit
-            if doppler_raw > 0x7fff:
-                doppler = doppler_raw - 0x10000
-            else:
-                doppler = doppler_raw
+            doppler = s16(self.ba_miso, offset + 2)
 
             _str += f'[SV{satellite_id} CNR={cnr}dB dop={doppler}Hz] '
             offset += sv_length
@@ -272,7 +285,7 @@ class LrGnss:
         return _str.rstrip()
 
     def GnssGetSvDetected(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'GnssGetSvDetected'
 
     def ResponseGnssReadAlmanacPerSatellite(self):
@@ -288,7 +301,7 @@ class LrGnss:
     def GnssReadAlmanacPerSatellite(self):
         sv_id_init = self.ba_mosi[2]
         n_sv = self.ba_mosi[3]
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return f'GnssReadAlmanacPerSatellite sv_id={sv_id_init} n_sv={n_sv}'
 
     def GnssGetSvVisible(self):
@@ -321,7 +334,7 @@ class LrGnss:
         return _str
 
     def GnssReadLastScanModeLaunched(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'GnssReadLastScanModeLaunched'
 
     def GnssFetchTime(self):
@@ -348,16 +361,16 @@ class LrGnss:
             2: 'WN_TOW_NOT_SET'
         }
         error_code = self.ba_miso[1]
-        gps_time_s = int.from_bytes(bytearray(self.ba_miso[2:6]), 'big')
-        nb_us_in_s_raw = int.from_bytes(bytearray(self.ba_miso[6:9]), 'big')
+        gps_time_s = u32(self.ba_miso, 2)
+        nb_us_in_s_raw = u24(self.ba_miso, 6)
         nb_us_in_s = nb_us_in_s_raw // 16
-        time_accuracy_raw = int.from_bytes(bytearray(self.ba_miso[9:13]), 'big')
+        time_accuracy_raw = u32(self.ba_miso, 9)
         time_accuracy = time_accuracy_raw // 16
         error_str = error_code_dict.get(error_code, f'UNKNOWN_0x{error_code:02x}')
         return f'GnssReadTime error={error_str} gps_time_s={gps_time_s} nb_us_in_s={nb_us_in_s} time_accuracy={time_accuracy}'
 
     def GnssReadTime(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'GnssReadTime'
 
     def GnssResetTime(self):
@@ -378,7 +391,7 @@ class LrGnss:
         return f'GnssReadWeekNumberRollover status={status_str} wn={wn_number_rollover}'
 
     def GnssReadWeekNumberRollover(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'GnssReadWeekNumberRollover (request)'
 
     def ResponseGnssReadDemodStatus(self):
@@ -454,27 +467,25 @@ class LrGnss:
         return f'GnssReadDemodStatus: {status_str} flags=[{flags_str}]'
 
     def GnssReadDemodStatus(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'GnssReadDemodStatus'
 
     def ResponseGnssReadCumulTiming(self):
         if len(self.ba_miso) < 125:  # Need stat1 + 124 bytes of data
             return 'GnssReadCumulTiming response (insufficient data)'
 
-        # Helper to read 32-bit values (big-endian)
-        def read_u32(offset):
-            return int.from_bytes(bytearray(self.ba_miso[offset:offset+4]), 'big')
+        timing = cumulTimingLayout.unpack_from(self.ba_miso, 1)
 
         # Read key timing values (all in microseconds)
-        total_capture = read_u32(101)
-        total_process = read_u32(105)
-        total_sleep_32k = read_u32(109)
-        total_sleep_32m = read_u32(113)
-        total = read_u32(117)
+        total_capture = timing[25]
+        total_process = timing[26]
+        total_sleep_32k = timing[27]
+        total_sleep_32m = timing[28]
+        total = timing[29]
 
         # Optional: read GPS/BeiDou breakdown
-        total_gps = read_u32(77)
-        total_beidou = read_u32(97)
+        total_gps = timing[19]
+        total_beidou = timing[24]
 
         _str = 'GnssReadCumulTiming: '
         _str += f'capt={total_capture}us '
@@ -489,16 +500,16 @@ class LrGnss:
         return _str
 
     def GnssReadCumulTiming(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'GnssReadCumulTiming'
 
     def GnssSetTime(self):
-        gps_time_s = int.from_bytes(bytearray(self.ba_mosi[2:6]), 'big')
-        time_accuracy = int.from_bytes(bytearray(self.ba_mosi[6:8]), 'big')
+        gps_time_s = u32(self.ba_mosi, 2)
+        time_accuracy = u16(self.ba_mosi, 6)
         return f'GnssSetTime gps_time={gps_time_s}s accuracy={time_accuracy}'
 
     def GnssConfigDelayResetAP(self):
-        delay = int.from_bytes(bytearray(self.ba_mosi[2:5]), 'big')
+        delay = u24(self.ba_mosi, 2)
         return f'GnssConfigDelayResetAP delay={delay}'
 
     def ResponseGnssReadDelayResetAP(self):
@@ -511,7 +522,7 @@ class LrGnss:
         return f'GnssReadDelayResetAP: delay={delay}'
 
     def GnssReadDelayResetAP(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'GnssReadDelayResetAP'
 
     def GnssAlmanacUpdateFromSat(self):
@@ -551,22 +562,14 @@ class LrGnss:
             8: 'ALL_ALMANAC_TOO_OLD',
         }
 
-        def s16(hi, lo):
-            v = (self.ba_miso[hi] << 8) | self.ba_miso[lo]
-            return v - 0x10000 if v > 0x7fff else v
-
-        error_code = self.ba_miso[1]
+        (error_code, nb_sv_used, one_shot_lat, one_shot_lon, one_shot_accuracy, one_shot_xtal_ppb,
+         filtered_lat, filtered_lon, filtered_accuracy, filtered_xtal_ppb) = dopplerSolverLayout.unpack_from(self.ba_miso, 1)
         error_str = error_dict.get(error_code, f'UNKNOWN_0x{error_code:02x}')
-        nb_sv_used = self.ba_miso[2]
 
-        one_shot_lat = s16(3, 4) / (2048 / 90)
-        one_shot_lon = s16(5, 6) / (2048 / 180)
-        one_shot_accuracy = int.from_bytes(bytearray(self.ba_miso[7:9]), 'big')
-        one_shot_xtal_ppb = s16(9, 10)
-        filtered_lat = s16(11, 12) / (2048 / 90)
-        filtered_lon = s16(13, 14) / (2048 / 180)
-        filtered_accuracy = int.from_bytes(bytearray(self.ba_miso[15:17]), 'big')
-        filtered_xtal_ppb = s16(17, 18)
+        one_shot_lat = one_shot_lat / (2048 / 90)
+        one_shot_lon = one_shot_lon / (2048 / 180)
+        filtered_lat = filtered_lat / (2048 / 90)
+        filtered_lon = filtered_lon / (2048 / 180)
 
         _str = f'GnssReadDopplerSolverResult: error={error_str} nb_sv_used={nb_sv_used} '
         _str += f'one_shot[lat={one_shot_lat:.4f} lon={one_shot_lon:.4f} acc={one_shot_accuracy} xtal={one_shot_xtal_ppb}ppb] '
@@ -574,7 +577,7 @@ class LrGnss:
         return _str
 
     def GnssReadDopplerSolverResult(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'GnssReadDopplerSolverResult'
 
     def ResponseGnssReadKeepSyncStatus(self):
@@ -582,7 +585,7 @@ class LrGnss:
             return 'GnssReadKeepSyncStatus (insufficient data)'
 
         nb_visible_sat = self.ba_miso[1]
-        time_elapsed = int.from_bytes(bytearray(self.ba_miso[2:6]), 'big')
+        time_elapsed = u32(self.ba_miso, 2)
 
         return f'GnssReadKeepSyncStatus: nb_visible_sat={nb_visible_sat} time_elapsed={time_elapsed}s'
 
@@ -597,7 +600,7 @@ class LrGnss:
             constellation_strs.append('BeiDou')
         constellation_str = ','.join(constellation_strs) if constellation_strs else f'0x{constellation_mask:02x}'
 
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return f'GnssReadKeepSyncStatus constellation={constellation_str}'
 
     def ResponseGnssReadAlmanacStatus(self):
@@ -637,13 +640,13 @@ class LrGnss:
         return _str
 
     def GnssReadAlmanacStatus(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'GnssReadAlmanacStatus '
 
     def GnssConfigAlmanacUpdatePeriod(self):
         constellation_mask = self.ba_mosi[2]
         sv_type = self.ba_mosi[3]
-        period = int.from_bytes(bytearray(self.ba_mosi[4:6]), 'big')
+        period = u16(self.ba_mosi, 4)
 
         # Parse constellation mask
         constellation_strs = []
@@ -663,11 +666,11 @@ class LrGnss:
         return f'GnssConfigAlmanacUpdatePeriod constellation={constellation_str} sv_type={sv_type_str} period={period} days'
 
     def ResponseGnssReadAlmanacUpdatePeriod(self):
-        period = int.from_bytes(bytearray(self.ba_miso[1:3]), 'big')
+        period = u16(self.ba_miso, 1)
         return f'GnssReadAlmanacUpdatePeriod period={period} days'
 
     def GnssReadAlmanacUpdatePeriod(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         constellation_mask = self.ba_mosi[2]
         sv_type = self.ba_mosi[3]
 
@@ -693,7 +696,7 @@ class LrGnss:
         return 'GnssGetSvWarmStart ' + str(n_SVs) + ' SVs'
 
     def GnssGetSvWarmStart(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         constellation_mask = self.ba_mosi[2]
         return 'GnssGetSvWarmStart constellation_mask ' + str(constellation_mask)
 
@@ -722,6 +725,22 @@ class LrGnss:
         0x0466: ResponseGnssGetSvWarmStart,
     }
 
+    # bytes a response decoder reads, status/RC byte included
+    cmdResponseMinLen = {
+        0x0401: 2, # GnssReadConstellationToUse
+        0x0403: 2, # GnssReadAlmanacUpdate
+        0x0406: 3, # GnssReadVersion
+        0x040c: 3, # GnssGetResultSize
+        0x040d: 2, # GnssReadResults
+        0x040f: 7, # GnssAlmanacRead
+        0x0411: 5, # GnssReadAssistancePosition
+        0x0417: 2, # GnssGetNbSvDetected
+        0x0426: 2, # GnssReadLastScanModeLaunched
+        0x0434: 13, # GnssReadTime
+        0x0438: 3, # GnssReadWeekNumberRollover
+        0x0464: 3, # GnssReadAlmanacUpdatePeriod
+    }
+
     cmdDict = {
         0x0400: GnssSetConstellationToUse, # LR11XX_GNSS_SET_CONSTELLATION_OC
         0x0401: GnssReadConstellationToUse, # LR11XX_GNSS_READ_CONSTELLATION_OC
@@ -769,3 +788,24 @@ class LrGnss:
         0x0466: GnssGetSvWarmStart, # LR11XX_GNSS_GET_SV_SYNC_OC
     }
 
+    # bytes a command decoder reads, opcode included; a shorter frame is reported as
+    # truncated without running the decoder.  opcodes not listed need only the opcode
+    cmdMinLen = {
+        0x0400: 3, # GnssSetConstellationToUse
+        0x0402: 3, # GnssSetAlmanacUpdate
+        0x0408: 3, # GnssSetMode
+        0x0409: 9, # GnssAutonomous
+        0x040a: 9, # GnssAssisted
+        0x040b: 5, # GnssScan
+        0x0410: 6, # GnssSetAssistancePosition
+        0x041a: 4, # GnssReadAlmanacPerSatellite
+        0x0432: 4, # GnssFetchTime
+        0x044b: 8, # GnssSetTime
+        0x044d: 5, # GnssConfigDelayResetAP
+        0x0454: 4, # GnssAlmanacUpdateFromSat
+        0x0456: 3, # GnssReadKeepSyncStatus
+        0x0463: 6, # GnssConfigAlmanacUpdatePeriod
+        0x0464: 4, # GnssReadAlmanacUpdatePeriod
+        0x0466: 3, # GnssGetSvWarmStart
+    }
+
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# opcode / time index and query CLI over a transaction store (lr_store.py)
+# the index is one posting list per opcode: the store indices of the commands with
+# that opcode and of the responses answering them, in capture order.  the store's
+# start column is already sorted, so a time range is two bisections, on the column or
+# on a posting list; the remaining filters (kind, status, Modem-E RC, CRC, text) only
+# look at the transactions those leave.  saved next to the store and memory-mapped,
+# like the store itself.
+#
+#   python3 lr_index.py build capture.lrs
+#   python3 lr_index.py query capture.lrs --op SetRfFrequency --start 10 --end 20
+#   python3 lr_index.py query capture.lrs --op GetErrors --kind response --text _ERR
+#   python3 lr_index.py query capture.lrs --crc bad --count
+
+import argparse
+import bisect
+import heapq
+import mmap
+import re
+import struct
+import sys
+import time
+from array import array
+
+from lr_store import (TransactionStore, TXN_COMMAND, TXN_RESPONSE, TXN_READ, TXN_WAKEUP, FLAG_MODEM_E,
+                      FLAG_CRC_CHECKED, FLAG_CRC_BAD)
+from lr_modem_e_frame import rcDict
+
+indexMagic = b'LR11INDX'
+INDEX_VERSION = 1
+indexHeader = struct.Struct('<8sIIQ')  # magic, version, opcodes, store transactions
+indexEntry = struct.Struct('<I4xQQ')   # opcode, offset, count
+
+kindNames = {'command': TXN_COMMAND, 'response': TXN_RESPONSE, 'read': TXN_READ, 'wakeup': TXN_WAKEUP}
+
+def index_path(store_path):
+    return store_path + '.idx'
+
+def build(store):
+    # opcode -> array of store indices
+    postings = {}
+    for i, op in enumerate(store.opcode):
+        post = postings.get(op)
+        if post is None:
+            post = postings[op] = array('I')
+        post.append(i)
+    return postings
+
+def save(postings, count, path):
+    offset = indexHeader.size + indexEntry.size * len(postings)
+    entries = []
+    for op, post in sorted(postings.items()):
+        entries.append(indexEntry.pack(op, offset, len(post)))
+        offset += len(post) * post.itemsize
+    with open(path, 'wb') as f:
+        f.write(indexHeader.pack(indexMagic, INDEX_VERSION, len(postings), count))
+        f.writelines(entries)
+        for _, post in sorted(postings.items()):
+            f.write(post)
+
+def load(path, count):
+    # the posting lists of a saved index, as memoryviews over the mapped file
+    with open(path, 'rb') as f:
+        m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, nops, stored = indexHeader.unpack_from(m, 0)
+    if magic != indexMagic or version != INDEX_VERSION:
+        raise ValueError(f'{path}: not an LR11xx transaction index')
+    if stored != count:
+        raise ValueError(f'{path} was built for another version of the store; rebuild it')
+    view = memoryview(m)
+    postings = {}
+    for k in range(nops):
+        op, offset, n = indexEntry.unpack_from(m, indexHeader.size + k * indexEntry.size)
+        postings[op] = view[offset:offset + 4 * n].cast('I')
+    return postings
+
+def registry():
+    # opcode -> OpEntry of every group, lazily loaded ones included
+    from HighLevelAnalyzer import Hla
+    from lr_dispatch import compile_group, lazyGroups, GROUP_SYSTEM
+    table = {}
+    compile_group(table, Hla, GROUP_SYSTEM)
+    for module, cls, group in lazyGroups.values():
+        compile_group(table, getattr(__import__(module), cls), group)
+    return table
+
+def opcode_names():
+    # decoder name -> opcodes, from the cmdDict tables of every group
+    names = {}
+    for op, entry in registry().items():
+        names.setdefault(entry.name.lower(), []).append(op)
+    return names
+
+def resolve_ops(specs):
+    # opcodes of --op names or numbers
+    names = None
+    ops = []
+    for spec in specs:
+        try:
+            ops.append(int(spec, 0))
+            continue
+        except ValueError:
+            pass
+        if names is None:
+            names = opcode_names()
+        if spec.lower() not in names:
+            raise ValueError(f'unknown opcode {spec}')
+        ops.extend(names[spec.lower()])
+    return ops
+
+def status_codes(name):
+    # stat1 bytes parseStatus reports with command status name
+    from HighLevelAnalyzer import stat1Strings
+    return bytes(b for b in range(256) if stat1Strings[b].split()[-1] == name)
+
+def candidates(store, postings, ops, start, end):
+    # store indices starting in [start, end), of the given opcodes or all
+    if ops is None:
+        lo, hi = store.span(start, end)
+        return range(lo, hi)
+    key = store.start.__getitem__
+    runs = []
+    for op in ops:
+        post = postings.get(op)
+        if post is not None:
+            lo = bisect.bisect_left(post, start, key=key)
+            hi = bisect.bisect_left(post, end, key=key)
+            runs.append(post[lo:hi])
+    return heapq.merge(*runs)
+
+def query(store, postings, ops=None, start=float('-inf'), end=float('inf'), kind=None,
+          status=None, rc=None, crc=None, text=None):
+    # yield the store indices matching every given filter
+    kinds = store.kind
+    # crc: the decoder's verdict, stored at build time; unchecked frames match neither
+    crc_flags = None if crc is None else (FLAG_CRC_CHECKED if crc else FLAG_CRC_CHECKED | FLAG_CRC_BAD)
+    flags = store.flags
+    stat1 = store.stat1
+    for i in candidates(store, postings, ops, start, end):
+        if kind is not None and kinds[i] != kind:
+            continue
+        if kinds[i] == TXN_WAKEUP and (status is not None or rc is not None or crc is not None):
+            continue
+        modem_e = flags[i] & FLAG_MODEM_E
+        if status is not None and (modem_e or stat1[i] not in status):
+            continue
+        if rc is not None and (not modem_e or kinds[i] == TXN_COMMAND or stat1[i] != rc):
+            continue
+        if crc_flags is not None and flags[i] & (FLAG_CRC_CHECKED | FLAG_CRC_BAD) != crc_flags:
+            continue
+        if text is not None and not text.search(store.text_at(i)):
+            continue
+        yield i
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='index and query a store of decoded LR11xx transactions')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    p = sub.add_parser('build', help='build the opcode index of a store')
+    p.add_argument('store', help='store file from lr_store.py')
+    p = sub.add_parser('query', help='print the transactions matching every filter')
+    p.add_argument('store', help='store file from lr_store.py')
+    p.add_argument('--op', action='append', default=[],
+                   help='decoder name (SetRfFrequency, ModemGetEvent) or opcode; repeat for any of several')
+    p.add_argument('--start', type=float, default=float('-inf'), help='window start, seconds')
+    p.add_argument('--end', type=float, default=float('inf'), help='window end, seconds')
+    p.add_argument('--kind', choices=tuple(kindNames), help='command frames, response reads, other reads, wakeups')
+    p.add_argument('--status', choices=('CMD_FAIL', 'CMD_PERR', 'CMD_OK', 'CMD_DAT'), help='stat1 command status')
+    p.add_argument('--rc', choices=tuple(rcDict.values()), help='Modem-E response RC')
+    p.add_argument('--crc', choices=('ok', 'bad'), help="the decoder's Modem-E CRC verdict")
+    p.add_argument('--text', help='regular expression the decoded text must contain')
+    p.add_argument('--count', action='store_true', help='print the number of matches only')
+    p.add_argument('--time', action='store_true', help='print the query time to stderr')
+    args = parser.parse_args(argv)
+
+    store = TransactionStore.open(args.store)
+    if args.cmd == 'build':
+        postings = build(store)
+        save(postings, len(store), index_path(args.store))
+        print(f'{len(postings)} opcodes indexed', file=sys.stderr)
+        return 0
+    t0 = time.perf_counter()
+    try:
+        postings = load(index_path(args.store), len(store))
+    except FileNotFoundError:
+        postings = build(store)
+    try:
+        ops = resolve_ops(args.op) if args.op else None
+    except ValueError as error:
+        parser.error(str(error))
+    rc = None
+    if args.rc is not None:
+        rc = next(code for code, name in rcDict.items() if name == args.rc)
+    matches = query(store, postings, ops, args.start, args.end,
+                    kindNames.get(args.kind), status_codes(args.status) if args.status else None, rc,
+                    None if args.crc is None else args.crc == 'ok',
+                    re.compile(args.text) if args.text else None)
+    if args.count:
+        print(sum(1 for _ in matches))
+    else:
+        sys.stdout.writelines(store.line(i) for i in matches)
+    if args.time:
+        print('%.3f ms' % ((time.perf_counter() - t0) * 1e3), file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
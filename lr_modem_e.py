@@ -8,20 +8,10 @@
 #   read responses: MOSI all-zero, MISO [RC, data..., CRC(0xFF, RC+data)]
 # cmdDict keys are the full 3-byte header: (group << 8) | cmd
 
-rcDict = {
-    0x00: 'OK',
-    0x01: 'UNKNOWN',
-    0x02: 'NOT_IMPLEMENTED',
-    0x03: 'NOT_INITIALIZED',
-    0x04: 'INVALID',
-    0x05: 'BUSY',
-    0x06: 'FAIL',
-    0x08: 'BAD_CRC',
-    0x0A: 'BAD_SIZE',
-    0x0F: 'FRAME_ERROR',
-    0x10: 'NO_TIME',
-    0x12: 'NO_EVENT',
-}
+from lr_dispatch import short_frame, short_response
+from lr_fields import u16 as _u16, u32 as _u32, u64 as _u64
+from lr_schema import compile_schema
+from lr_modem_e_frame import rcDict, _rc, crcTable, crc8, modem_e_rc_crc_ok, modem_e_rc_readback, modem_e_resp_crc_note, modem_e_orphan_read
 
 eventDict = {  # modem_e_lorawan_event_type_t
     0x00: 'RESET',
@@ -113,57 +103,6 @@ tstFhssCrDict = {0x01: '2/3', 0x03: '1/3'}
 
 paSelDict = {0x00: 'LP', 0x01: 'HP', 0x02: 'HF'}
 
-def _rc(ba_miso):
-    return 'RC=' + rcDict.get(ba_miso[0], hex(ba_miso[0]) + '?')
-
-def crc8(init, data):
-    # modem_e_modem_compute_crc from modem_e_modem_hal.h (poly 0x65 reflected)
-    crc = init
-    for b in data:
-        extract = b
-        for _ in range(8):
-            s = (crc ^ extract) & 0x01
-            crc >>= 1
-            if s:
-                crc ^= 0x65
-            extract >>= 1
-    return crc
-
-def modem_e_rc_crc_ok(ba_miso):
-    return len(ba_miso) >= 2 and ba_miso[1] == crc8(0xFF, [ba_miso[0]])
-
-def modem_e_rc_readback(hla):
-    # 2 dummy MOSI bytes after a write command; MISO = [RC, CRC(0xFF,[RC])]
-    rc = hla.ba_miso[0]
-    crc_expected = crc8(0xFF, [rc])
-    if rc == 0x00 and hla.ba_miso[1] == 0x00:
-        return 'ModemE RC read-back: no response'
-    if hla.ba_miso[1] == crc_expected:
-        return 'ModemE ' + _rc(hla.ba_miso)
-    return 'ModemE ' + _rc(hla.ba_miso) + f' [crc BAD: got 0x{hla.ba_miso[1]:02x} expected 0x{crc_expected:02x}]'
-
-def modem_e_resp_crc_note(hla):
-    # read responses end with CRC(0xFF, RC+data); flag when it doesn't validate
-    if len(hla.ba_miso) < 2:
-        return ''
-    if hla.ba_miso[-1] == crc8(0xFF, hla.ba_miso[0:-1]):
-        return ''
-    return ' [crc BAD]'
-
-def modem_e_orphan_read(hla):
-    # all-zero-MOSI read that isn't paired with a decoded command: [RC, payload..., CRC]
-    return ('ModemE response (unpaired command) ' + _rc(hla.ba_miso) + ', '
-            + str(max(0, len(hla.ba_miso) - 2)) + ' payload bytes' + modem_e_resp_crc_note(hla))
-
-def _u16(ba, o):
-    return int.from_bytes(bytearray(ba[o:o+2]), 'big')
-
-def _u32(ba, o):
-    return int.from_bytes(bytearray(ba[o:o+4]), 'big')
-
-def _u64(ba, o):
-    return int.from_bytes(bytearray(ba[o:o+8]), 'big')
-
 def _i8(v):
     return v - 256 if v > 127 else v
 
@@ -171,103 +110,57 @@ def _hexstr(ba, o, n):
     return ''.join(f'{b:02x}' for b in ba[o:o+n])
 
 
-class LrModemE:
-    def __init__(self):
-        pass
-
-    ####################################################################
-    # group 0x0600 BSP
-    ####################################################################
-
-    def BspGetTxPowerOffset(self):
-        self.next_transfer_response = 1
-        return 'BspGetTxPowerOffset (request)'
-
-    def ResponseBspGetTxPowerOffset(self):
-        return 'BspGetTxPowerOffset ' + str(_i8(self.ba_miso[1])) + 'dB (' + _rc(self.ba_miso) + ')'
-
-    def BspSetTxPowerOffset(self):
-        return 'BspSetTxPowerOffset ' + str(_i8(self.ba_mosi[3])) + 'dB'
-
-    def BspGetOutputPowerConfig(self):
-        self.next_transfer_response = 1
-        return 'BspGetOutputPowerConfig (request)'
-
-    def ResponseBspGetOutputPowerConfig(self):
-        return 'BspGetOutputPowerConfig ' + str(max(0, len(self.ba_miso)-2)) + ' bytes (' + _rc(self.ba_miso) + ')'
-
-    def BspSetOutputPowerConfig(self):
-        return 'BspSetOutputPowerConfig ' + str(len(self.ba_mosi)-3) + ' bytes'
-
-    def BspGetRfOutput(self):
-        self.next_transfer_response = 1
-        return 'BspGetRfOutput (request)'
-
-    def ResponseBspGetRfOutput(self):
-        pa = self.ba_miso[1]
-        return 'BspGetRfOutput ' + paSelDict.get(pa, hex(pa)+'?') + ' (' + _rc(self.ba_miso) + ')'
-
-    def BspSetRfOutput(self):
-        pa = self.ba_mosi[3]
-        return 'BspSetRfOutput ' + paSelDict.get(pa, hex(pa)+'?')
-
-    def BspGetCrystalError(self):
-        self.next_transfer_response = 1
-        return 'BspGetCrystalError (request)'
-
-    def ResponseBspGetCrystalError(self):
-        return 'BspGetCrystalError ' + str(_u32(self.ba_miso, 1)) + 'ppm (' + _rc(self.ba_miso) + ')'
-
-    def BspSetCrystalError(self):
-        return 'BspSetCrystalError ' + str(_u32(self.ba_mosi, 3)) + 'ppm'
-
-    def BspGetXoscCapaTrimAB(self):
-        self.next_transfer_response = 1
-        return 'BspGetXoscCapaTrimAB (request)'
-
-    def ResponseBspGetXoscCapaTrimAB(self):
-        return 'BspGetXoscCapaTrimAB A=' + hex(self.ba_miso[1]) + ' B=' + hex(self.ba_miso[2]) + ' (' + _rc(self.ba_miso) + ')'
 
-    def BspSetXoscCapaTrimAB(self):
-        return 'BspSetXoscCapaTrimAB A=' + hex(self.ba_mosi[3]) + ' B=' + hex(self.ba_mosi[4])
-
-    def BspGetTxPowerConsumption(self):
-        self.next_transfer_response = 1
-        return 'BspGetTxPowerConsumption (request)'
-
-    def ResponseBspGetTxPowerConsumption(self):
-        return 'BspGetTxPowerConsumption ' + str(max(0, len(self.ba_miso)-2)) + ' bytes (' + _rc(self.ba_miso) + ')'
-
-    def BspSetTxPowerConsumption(self):
-        return 'BspSetTxPowerConsumption ' + str(len(self.ba_mosi)-3) + ' bytes'
-
-    def _rx_consumption_str(self, name):
+# group 0x0600 BSP, compiled into the LrModemE handlers by lr_schema
+bspSchema = {
+    'name': 'modem_e_bsp',
+    'rc': '_rc',
+    'request': ' (request)',
+    'env': ('_rc', 'paSelDict'),
+    'ops': (
+        {'opcode': 0x060000, 'name': 'BspGetTxPowerOffset', 'kind': 'read',
+         'response': (('s8', 1, ' ', 'dB'),)},
+        {'opcode': 0x060001, 'name': 'BspSetTxPowerOffset', 'kind': 'write',
+         'fields': (('s8', 3, ' ', 'dB'),)},
+        {'opcode': 0x060002, 'name': 'BspGetOutputPowerConfig', 'kind': 'read',
+         'response': (('len', 2, ' ', ' bytes'),)},
+        {'opcode': 0x060003, 'name': 'BspSetOutputPowerConfig', 'kind': 'write',
+         'fields': (('len', 3, ' ', ' bytes'),)},
+        {'opcode': 0x060004, 'name': 'BspGetRfOutput', 'kind': 'read',
+         'response': (('enum', 1, ' ', '', 'paSelDict'),)},
+        {'opcode': 0x060005, 'name': 'BspSetRfOutput', 'kind': 'write',
+         'fields': (('enum', 3, ' ', '', 'paSelDict'),)},
+        {'opcode': 0x060006, 'name': 'BspGetCrystalError', 'kind': 'read',
+         'response': (('u32', 1, ' ', 'ppm'),)},
+        {'opcode': 0x060007, 'name': 'BspSetCrystalError', 'kind': 'write',
+         'fields': (('u32', 3, ' ', 'ppm'),)},
+        {'opcode': 0x060008, 'name': 'BspGetXoscCapaTrimAB', 'kind': 'read',
+         'response': (('hex8', 1, ' A=', ''), ('hex8', 2, ' B=', ''))},
+        {'opcode': 0x060009, 'name': 'BspSetXoscCapaTrimAB', 'kind': 'write',
+         'fields': (('hex8', 3, ' A=', ''), ('hex8', 4, ' B=', ''))},
+        {'opcode': 0x06000A, 'name': 'BspGetTxPowerConsumption', 'kind': 'read',
+         'response': (('len', 2, ' ', ' bytes'),)},
+        {'opcode': 0x06000B, 'name': 'BspSetTxPowerConsumption', 'kind': 'write',
+         'fields': (('len', 3, ' ', ' bytes'),)},
         # 8 bytes: consumption_rx_boosted_off_ua u32, consumption_rx_boosted_on_ua u32
-        if len(self.ba_miso) >= 9:
-            off_ua = _u32(self.ba_miso, 1)
-            on_ua = _u32(self.ba_miso, 5)
-            return name + ' boostedOff=' + str(off_ua) + 'uA boostedOn=' + str(on_ua) + 'uA (' + _rc(self.ba_miso) + ')'
-        return name + ' (' + _rc(self.ba_miso) + ')'
-
-    def BspGetLoraRxPowerConsumption(self):
-        self.next_transfer_response = 1
-        return 'BspGetLoraRxPowerConsumption (request)'
-
-    def ResponseBspGetLoraRxPowerConsumption(self):
-        return LrModemE._rx_consumption_str(self, 'BspGetLoraRxPowerConsumption')
-
-    def BspSetLoraRxPowerConsumption(self):
-        return 'BspSetLoraRxPowerConsumption boostedOff=' + str(_u32(self.ba_mosi, 3)) + 'uA boostedOn=' + str(_u32(self.ba_mosi, 7)) + 'uA'
+        {'opcode': 0x06000C, 'name': 'BspGetLoraRxPowerConsumption', 'kind': 'read', 'response_min': 9,
+         'response': (('u32', 1, ' boostedOff=', 'uA'), ('u32', 5, ' boostedOn=', 'uA'))},
+        {'opcode': 0x06000D, 'name': 'BspSetLoraRxPowerConsumption', 'kind': 'write',
+         'fields': (('u32', 3, ' boostedOff=', 'uA'), ('u32', 7, ' boostedOn=', 'uA'))},
+        {'opcode': 0x06000E, 'name': 'BspGetGfskRxPowerConsumption', 'kind': 'read', 'response_min': 9,
+         'response': (('u32', 1, ' boostedOff=', 'uA'), ('u32', 5, ' boostedOn=', 'uA'))},
+        {'opcode': 0x06000F, 'name': 'BspSetGfskRxPowerConsumption', 'kind': 'write',
+         'fields': (('u32', 3, ' boostedOff=', 'uA'), ('u32', 7, ' boostedOn=', 'uA'))},
+    ),
+}
 
-    def BspGetGfskRxPowerConsumption(self):
-        self.next_transfer_response = 1
-        return 'BspGetGfskRxPowerConsumption (request)'
+bsp = compile_schema(bspSchema, globals())
 
-    def ResponseBspGetGfskRxPowerConsumption(self):
-        return LrModemE._rx_consumption_str(self, 'BspGetGfskRxPowerConsumption')
+class LrModemE:
+    def __init__(self):
+        pass
 
-    def BspSetGfskRxPowerConsumption(self):
-        return 'BspSetGfskRxPowerConsumption boostedOff=' + str(_u32(self.ba_mosi, 3)) + 'uA boostedOn=' + str(_u32(self.ba_mosi, 7)) + 'uA'
+    # group 0x0600 BSP: generated from bspSchema
 
     ####################################################################
     # group 0x0601 MODEM
@@ -277,7 +170,7 @@ class LrModemE:
         return 'ModemFactoryReset'
 
     def ModemGetVersion(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'ModemGetVersion (request)'
 
     def ResponseModemGetVersion(self):
@@ -290,7 +183,7 @@ class LrModemE:
         return 'ModemGetVersion (' + _rc(self.ba_miso) + ')'
 
     def ModemGetStatus(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'ModemGetStatus (request)'
 
     def ResponseModemGetStatus(self):
@@ -309,14 +202,14 @@ class LrModemE:
         return 'ModemGetStatus ' + _str + '(' + _rc(self.ba_miso) + ')'
 
     def ModemGetCharge(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'ModemGetCharge (request)'
 
     def ResponseModemGetCharge(self):
         return 'ModemGetCharge ' + str(max(0, len(self.ba_miso)-2)) + ' bytes (' + _rc(self.ba_miso) + ')'
 
     def ModemGetEvent(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'ModemGetEvent (request)'
 
     def ResponseModemGetEvent(self):
@@ -330,7 +223,7 @@ class LrModemE:
         return 'ModemGetEvent (' + _rc(self.ba_miso) + ')'
 
     def ModemGetSuspend(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'ModemGetSuspend (request)'
 
     def ResponseModemGetSuspend(self):
@@ -346,14 +239,14 @@ class LrModemE:
         return 'ModemClearAlarmTimer'
 
     def ModemGetAlarmRemainingTime(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'ModemGetAlarmRemainingTime (request)'
 
     def ResponseModemGetAlarmRemainingTime(self):
         return 'ModemGetAlarmRemainingTime ' + str(_u32(self.ba_miso, 1)) + 's (' + _rc(self.ba_miso) + ')'
 
     def ModemGetCrashlog(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'ModemGetCrashlog (request)'
 
     def ResponseModemGetCrashlog(self):
@@ -361,7 +254,7 @@ class LrModemE:
         return 'ModemGetCrashlog status=' + status + ' ' + str(max(0, len(self.ba_miso)-3)) + ' bytes (' + _rc(self.ba_miso) + ')'
 
     def ModemStoreStateSnapshotToNvm(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'ModemStoreStateSnapshotToNvm (request)'
 
     def ResponseModemStoreStateSnapshotToNvm(self):
@@ -445,7 +338,7 @@ class LrModemE:
         return 'TestRxFskCont ' + str(_u32(self.ba_mosi, 4)) + 'Hz'
 
     def _TestReadPacketCounterRxCont(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'TestReadPacketCounterRxCont (request)'
 
     def _TestRssiSubghz(self):
@@ -455,7 +348,7 @@ class LrModemE:
         return 'TestRssiSubghz ' + str(freq) + 'Hz ' + str(time_ms) + 'ms bw=' + str(bw_hz) + 'Hz'
 
     def _TestReadRssi(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'TestReadRssi (request)'
 
     def _TestRadioRst(self):
@@ -485,15 +378,38 @@ class LrModemE:
         0x10: _TestWriteRegister,
     }
 
+    # bytes each test sub-command decoder reads, header and sub-command included
+    testMinLen = {
+        0x03: 29, # TxLora
+        0x04: 18, # TxFsk
+        0x05: 22, # TxLrFhss
+        0x06: 9, # TxCw
+        0x07: 11, # RxLoraCont
+        0x08: 8, # RxFskCont
+        0x0A: 14, # RssiSubghz
+    }
+
+    # bytes each test response decoder reads, RC included
+    testResponseMinLen = {
+        0x09: 5, # ReadPacketCounterRxCont
+        0x0B: 2, # ReadRssi
+    }
+
     def ModemTest(self):
         sub = self.ba_mosi[3]
-        self.modem_e_test_sub = sub
+        self.state.modem_e_test_sub = sub
         if sub in LrModemE.testDict:
+            need = LrModemE.testMinLen.get(sub, 4)
+            if len(self.ba_mosi) < need:
+                return short_frame('ModemTest', len(self.ba_mosi), need)
             return LrModemE.testDict[sub](self)
         return 'ModemTest sub-command ' + hex(sub) + '?'
 
     def ResponseModemTest(self):
-        sub = getattr(self, 'modem_e_test_sub', None)
+        sub = self.state.modem_e_test_sub
+        need = LrModemE.testResponseMinLen.get(sub, 0)
+        if len(self.ba_miso) < need:
+            return short_response('ModemTest', len(self.ba_miso), need)
         if sub == 0x09:
             return 'TestReadPacketCounterRxCont ' + str(_u32(self.ba_miso, 1)) + ' packets (' + _rc(self.ba_miso) + ')'
         if sub == 0x0B:
@@ -505,7 +421,7 @@ class LrModemE:
     ####################################################################
 
     def LorawanGetVersion(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'LorawanGetVersion (request)'
 
     def ResponseLorawanGetVersion(self):
@@ -516,7 +432,7 @@ class LrModemE:
         return 'LorawanGetVersion (' + _rc(self.ba_miso) + ')'
 
     def LorawanGetDevEui(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'LorawanGetDevEui (request)'
 
     def ResponseLorawanGetDevEui(self):
@@ -526,7 +442,7 @@ class LrModemE:
         return 'LorawanSetDevEui ' + _hexstr(self.ba_mosi, 3, 8)
 
     def LorawanGetJoinEui(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'LorawanGetJoinEui (request)'
 
     def ResponseLorawanGetJoinEui(self):
@@ -545,7 +461,7 @@ class LrModemE:
         return 'LorawanDeriveKeys'
 
     def LorawanGetClass(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'LorawanGetClass (request)'
 
     def ResponseLorawanGetClass(self):
@@ -557,7 +473,7 @@ class LrModemE:
         return 'LorawanSetClass class ' + classDict.get(c, hex(c)+'?')
 
     def LorawanGetRegion(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'LorawanGetRegion (request)'
 
     def ResponseLorawanGetRegion(self):
@@ -575,7 +491,7 @@ class LrModemE:
         return 'LorawanLeaveNetwork'
 
     def LorawanGetNextTxMaxPayload(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'LorawanGetNextTxMaxPayload (request)'
 
     def ResponseLorawanGetNextTxMaxPayload(self):
@@ -584,7 +500,7 @@ class LrModemE:
     def LorawanRequestTx(self):
         port = self.ba_mosi[3]
         confirmed = self.ba_mosi[4]
-        data_len = len(self.ba_mosi) - 5
+        data_len = max(0, len(self.ba_mosi) - 6)  # after port, mode; before the CRC byte
         return ('LorawanRequestTx port=' + str(port)
                 + (' confirmed' if confirmed else ' unconfirmed')
                 + ' ' + str(data_len) + ' data bytes')
@@ -601,13 +517,13 @@ class LrModemE:
     def LorawanEmergencyTx(self):
         port = self.ba_mosi[3]
         confirmed = self.ba_mosi[4]
-        data_len = len(self.ba_mosi) - 5
+        data_len = max(0, len(self.ba_mosi) - 6)  # after port, mode; before the CRC byte
         return ('LorawanEmergencyTx port=' + str(port)
                 + (' confirmed' if confirmed else ' unconfirmed')
                 + ' ' + str(data_len) + ' data bytes')
 
     def LorawanGetDownlinkDataSize(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'LorawanGetDownlinkDataSize (request)'
 
     def ResponseLorawanGetDownlinkDataSize(self):
@@ -615,7 +531,7 @@ class LrModemE:
                 + ' remaining=' + str(self.ba_miso[2]) + ' (' + _rc(self.ba_miso) + ')')
 
     def LorawanGetDownlinkData(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'LorawanGetDownlinkData (request)'
 
     def ResponseLorawanGetDownlinkData(self):
@@ -623,7 +539,7 @@ class LrModemE:
         return 'LorawanGetDownlinkData ' + str(data_len) + ' bytes: ' + _hexstr(self.ba_miso, 1, data_len) + ' (' + _rc(self.ba_miso) + ')'
 
     def LorawanGetDownlinkMetadata(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'LorawanGetDownlinkMetadata (request)'
 
     def ResponseLorawanGetDownlinkMetadata(self):
@@ -642,7 +558,7 @@ class LrModemE:
         return 'LorawanGetDownlinkMetadata (' + _rc(self.ba_miso) + ')'
 
     def LorawanGetLostConnectionCounter(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'LorawanGetLostConnectionCounter (request)'
 
     def ResponseLorawanGetLostConnectionCounter(self):
@@ -650,7 +566,7 @@ class LrModemE:
                 + ' since=' + str(_u32(self.ba_miso, 3)) + 's (' + _rc(self.ba_miso) + ')')
 
     def LorawanGetNetworkType(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'LorawanGetNetworkType (request)'
 
     def ResponseLorawanGetNetworkType(self):
@@ -660,7 +576,7 @@ class LrModemE:
         return 'LorawanSetNetworkType ' + ('public' if self.ba_mosi[3] else 'private')
 
     def LorawanGetCertificationMode(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'LorawanGetCertificationMode (request)'
 
     def ResponseLorawanGetCertificationMode(self):
@@ -670,7 +586,7 @@ class LrModemE:
         return 'LorawanSetCertificationMode ' + ('enable' if self.ba_mosi[3] else 'disable')
 
     def LorawanGetDutyCycleStatus(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'LorawanGetDutyCycleStatus (request)'
 
     def ResponseLorawanGetDutyCycleStatus(self):
@@ -680,7 +596,7 @@ class LrModemE:
         return 'LorawanGetDutyCycleStatus ' + str(val) + 'ms (' + _rc(self.ba_miso) + ')'
 
     def LorawanGetAvailableDataRate(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'LorawanGetAvailableDataRate (request)'
 
     def ResponseLorawanGetAvailableDataRate(self):
@@ -689,7 +605,7 @@ class LrModemE:
         return 'LorawanGetAvailableDataRate [' + drs + '] (' + _rc(self.ba_miso) + ')'
 
     def LorawanGetAdrProfile(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'LorawanGetAdrProfile (request)'
 
     def ResponseLorawanGetAdrProfile(self):
@@ -707,7 +623,7 @@ class LrModemE:
         return 'LorawanSetJoinDataRateDistribution [' + _hexstr(self.ba_mosi, 3, len(self.ba_mosi)-3) + ']'
 
     def LorawanGetNbTrans(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'LorawanGetNbTrans (request)'
 
     def ResponseLorawanGetNbTrans(self):
@@ -717,7 +633,7 @@ class LrModemE:
         return 'LorawanSetNbTrans ' + str(self.ba_mosi[3])
 
     def LorawanGetAdrAckLimitDelay(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'LorawanGetAdrAckLimitDelay (request)'
 
     def ResponseLorawanGetAdrAckLimitDelay(self):
@@ -727,7 +643,7 @@ class LrModemE:
         return 'LorawanSetAdrAckLimitDelay limit=' + str(self.ba_mosi[3]) + ' delay=' + str(self.ba_mosi[4])
 
     def LorawanGetLbtState(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'LorawanGetLbtState (request)'
 
     def ResponseLorawanGetLbtState(self):
@@ -737,7 +653,7 @@ class LrModemE:
         return 'LorawanSetLbtState ' + ('enable' if self.ba_mosi[3] else 'disable')
 
     def LorawanGetLbtParams(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'LorawanGetLbtParams (request)'
 
     def ResponseLorawanGetLbtParams(self):
@@ -761,7 +677,7 @@ class LrModemE:
                 + 'dBm bw=' + str(bw) + 'Hz')
 
     def LorawanGetCsmaState(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'LorawanGetCsmaState (request)'
 
     def ResponseLorawanGetCsmaState(self):
@@ -771,7 +687,7 @@ class LrModemE:
         return 'LorawanSetCsmaState ' + ('enable' if self.ba_mosi[3] else 'disable')
 
     def LorawanGetCsmaParams(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'LorawanGetCsmaParams (request)'
 
     def ResponseLorawanGetCsmaParams(self):
@@ -796,7 +712,7 @@ class LrModemE:
         return 'LorawanMacRequest ' + _str.rstrip()
 
     def LorawanGetMacTime(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'LorawanGetMacTime (request)'
 
     def ResponseLorawanGetMacTime(self):
@@ -804,7 +720,7 @@ class LrModemE:
                 + str(_u32(self.ba_miso, 5)) + ' (' + _rc(self.ba_miso) + ')')
 
     def LorawanGetLinkCheckData(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'LorawanGetLinkCheckData (request)'
 
     def ResponseLorawanGetLinkCheckData(self):
@@ -817,7 +733,7 @@ class LrModemE:
         return ('LorawanSetBatteryLevel ' + ('user value=' + str(value) if source else 'from modem'))
 
     def LorawanGetClassBPingSlotPeriodicity(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'LorawanGetClassBPingSlotPeriodicity (request)'
 
     def ResponseLorawanGetClassBPingSlotPeriodicity(self):
@@ -829,7 +745,7 @@ class LrModemE:
         return 'LorawanSetClassBPingSlotPeriodicity ' + str(1 << p) + 's'
 
     def LorawanGetMulticastGroupConfig(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'LorawanGetMulticastGroupConfig group=' + str(self.ba_mosi[3])
 
     def ResponseLorawanGetMulticastGroupConfig(self):
@@ -846,7 +762,7 @@ class LrModemE:
                 + ' ' + str(_u32(self.ba_mosi, 4)) + 'Hz DR' + str(self.ba_mosi[8]))
 
     def LorawanGetMulticastClassCSessionStatus(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'LorawanGetMulticastClassCSessionStatus group=' + str(self.ba_mosi[3])
 
     def ResponseLorawanGetMulticastClassCSessionStatus(self):
@@ -867,7 +783,7 @@ class LrModemE:
                 + ' pingSlot=' + str(1 << self.ba_mosi[9]) + 's')
 
     def LorawanGetMulticastClassBSessionStatus(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'LorawanGetMulticastClassBSessionStatus group=' + str(self.ba_mosi[3])
 
     def ResponseLorawanGetMulticastClassBSessionStatus(self):
@@ -893,7 +809,7 @@ class LrModemE:
         return 'LorawanStopAlcSyncService'
 
     def LorawanAlcSyncGetTime(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'LorawanAlcSyncGetTime (request)'
 
     def ResponseLorawanAlcSyncGetTime(self):
@@ -903,7 +819,7 @@ class LrModemE:
         return 'LorawanAlcSyncTrigRequest'
 
     def LorawanFuotaGetFileSizeCrc(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'LorawanFuotaGetFileSizeCrc (request)'
 
     def ResponseLorawanFuotaGetFileSizeCrc(self):
@@ -911,7 +827,7 @@ class LrModemE:
                 + ' crc=' + hex(_u32(self.ba_miso, 5)) + ' (' + _rc(self.ba_miso) + ')')
 
     def LorawanFuotaGetFileFragment(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return ('LorawanFuotaGetFileFragment offset=' + str(_u32(self.ba_mosi, 3))
                 + ' size=' + str(_u32(self.ba_mosi, 7)))
 
@@ -919,7 +835,7 @@ class LrModemE:
         return 'LorawanFuotaGetFileFragment ' + str(max(0, len(self.ba_miso)-2)) + ' bytes (' + _rc(self.ba_miso) + ')'
 
     def LorawanGetUserAdrAckLimit(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'LorawanGetUserAdrAckLimit (request)'
 
     def ResponseLorawanGetUserAdrAckLimit(self):
@@ -934,7 +850,7 @@ class LrModemE:
                 + ' nwkSKey=' + _hexstr(self.ba_mosi, 7, 16) + ' appSKey=' + _hexstr(self.ba_mosi, 23, 16))
 
     def LorawanGetChannelMask(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'LorawanGetChannelMask (request)'
 
     def ResponseLorawanGetChannelMask(self):
@@ -962,7 +878,7 @@ class LrModemE:
                 + ' smartLevel=' + str(smart_level) + ' missedAckThresh=' + str(missed_ack))
 
     def RelayGetTxConfig(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'RelayGetTxConfig (request)'
 
     def ResponseRelayGetTxConfig(self):
@@ -979,22 +895,7 @@ class LrModemE:
 
     cmdDict = {
         # 0x0600 BSP
-        0x060000: BspGetTxPowerOffset,
-        0x060001: BspSetTxPowerOffset,
-        0x060002: BspGetOutputPowerConfig,
-        0x060003: BspSetOutputPowerConfig,
-        0x060004: BspGetRfOutput,
-        0x060005: BspSetRfOutput,
-        0x060006: BspGetCrystalError,
-        0x060007: BspSetCrystalError,
-        0x060008: BspGetXoscCapaTrimAB,
-        0x060009: BspSetXoscCapaTrimAB,
-        0x06000A: BspGetTxPowerConsumption,
-        0x06000B: BspSetTxPowerConsumption,
-        0x06000C: BspGetLoraRxPowerConsumption,
-        0x06000D: BspSetLoraRxPowerConsumption,
-        0x06000E: BspGetGfskRxPowerConsumption,
-        0x06000F: BspSetGfskRxPowerConsumption,
+        **bsp.cmdDict,
         # 0x0601 MODEM
         0x060100: ModemFactoryReset,
         0x060101: ModemGetVersion,
@@ -1086,15 +987,51 @@ class LrModemE:
         0x060301: RelaySetTxConfig,
     }
 
+    # bytes a command decoder reads, opcode included; a shorter frame is reported as
+    # truncated without running the decoder.  opcodes not listed need only the opcode
+    cmdMinLen = {
+        **bsp.cmdMinLen,
+        0x060105: 4, # ModemTest
+        0x060107: 4, # ModemSetSuspend
+        0x060108: 7, # ModemSetAlarmTimer
+        0x06010d: 11, # ModemRestoreStateSnapshotFromNvm
+        0x060202: 11, # LorawanSetDevEui
+        0x060204: 11, # LorawanSetJoinEui
+        0x060205: 19, # LorawanSetNwkKey
+        0x060206: 19, # LorawanSetAppKey
+        0x060209: 4, # LorawanSetClass
+        0x06020c: 4, # LorawanSetRegion
+        0x060212: 5, # LorawanRequestTx
+        0x060213: 6, # LorawanRequestEmptyTx
+        0x060214: 5, # LorawanEmergencyTx
+        0x06021a: 4, # LorawanSetNetworkType
+        0x06021c: 4, # LorawanSetCertificationMode
+        0x060221: 4, # LorawanSetAdrProfile
+        0x060224: 4, # LorawanSetNbTrans
+        0x060226: 5, # LorawanSetAdrAckLimitDelay
+        0x060228: 4, # LorawanSetLbtState
+        0x06022a: 13, # LorawanSetLbtParams
+        0x06022c: 4, # LorawanSetCsmaState
+        0x06022e: 6, # LorawanSetCsmaParams
+        0x06022f: 4, # LorawanMacRequest
+        0x060232: 5, # LorawanSetBatteryLevel
+        0x060235: 4, # LorawanSetClassBPingSlotPeriodicity
+        0x060236: 4, # LorawanGetMulticastGroupConfig
+        0x060237: 40, # LorawanSetMulticastGroupConfig
+        0x060238: 9, # LorawanStartSessionMulticastClassC
+        0x060239: 4, # LorawanGetMulticastClassCSessionStatus
+        0x06023a: 4, # LorawanStopSessionMulticastClassC
+        0x06023c: 10, # LorawanStartSessionMulticastClassB
+        0x06023d: 4, # LorawanGetMulticastClassBSessionStatus
+        0x06023e: 4, # LorawanStopSessionMulticastClassB
+        0x060247: 11, # LorawanFuotaGetFileFragment
+        0x060249: 5, # LorawanSetUserAdrAckLimit
+        0x06024a: 39, # LorawanConnectWithAbp
+        0x060301: 17, # RelaySetTxConfig
+    }
+
     cmdResponseDict = {
-        0x060000: ResponseBspGetTxPowerOffset,
-        0x060002: ResponseBspGetOutputPowerConfig,
-        0x060004: ResponseBspGetRfOutput,
-        0x060006: ResponseBspGetCrystalError,
-        0x060008: ResponseBspGetXoscCapaTrimAB,
-        0x06000A: ResponseBspGetTxPowerConsumption,
-        0x06000C: ResponseBspGetLoraRxPowerConsumption,
-        0x06000E: ResponseBspGetGfskRxPowerConsumption,
+        **bsp.cmdResponseDict,
         0x060101: ResponseModemGetVersion,
         0x060102: ResponseModemGetStatus,
         0x060103: ResponseModemGetCharge,
@@ -1138,3 +1075,49 @@ class LrModemE:
         0x06024B: ResponseLorawanGetChannelMask,
         0x060300: ResponseRelayGetTxConfig,
     }
+
+    # bytes a response decoder reads, status/RC byte included
+    cmdResponseMinLen = {
+        **bsp.cmdResponseMinLen,
+        0x060102: 2, # ModemGetStatus
+        0x060106: 2, # ModemGetSuspend
+        0x06010a: 5, # ModemGetAlarmRemainingTime
+        0x06010b: 2, # ModemGetCrashlog
+        0x06010c: 5, # ModemStoreStateSnapshotToNvm
+        0x060201: 9, # LorawanGetDevEui
+        0x060203: 9, # LorawanGetJoinEui
+        0x060208: 2, # LorawanGetClass
+        0x06020b: 2, # LorawanGetRegion
+        0x060211: 2, # LorawanGetNextTxMaxPayload
+        0x060215: 3, # LorawanGetDownlinkDataSize
+        0x060218: 7, # LorawanGetLostConnectionCounter
+        0x060219: 2, # LorawanGetNetworkType
+        0x06021b: 2, # LorawanGetCertificationMode
+        0x06021d: 5, # LorawanGetDutyCycleStatus
+        0x06021f: 3, # LorawanGetAvailableDataRate
+        0x060220: 2, # LorawanGetAdrProfile
+        0x060223: 2, # LorawanGetNbTrans
+        0x060225: 3, # LorawanGetAdrAckLimitDelay
+        0x060227: 2, # LorawanGetLbtState
+        0x06022b: 2, # LorawanGetCsmaState
+        0x06022d: 4, # LorawanGetCsmaParams
+        0x060230: 9, # LorawanGetMacTime
+        0x060231: 3, # LorawanGetLinkCheckData
+        0x060234: 2, # LorawanGetClassBPingSlotPeriodicity
+        0x060236: 5, # LorawanGetMulticastGroupConfig
+        0x060239: 7, # LorawanGetMulticastClassCSessionStatus
+        0x060244: 5, # LorawanAlcSyncGetTime
+        0x060246: 9, # LorawanFuotaGetFileSizeCrc
+        0x060248: 3, # LorawanGetUserAdrAckLimit
+    }
+
+    # write commands the reference HAL sends with modem_e_hal_write_without_rc:
+    # no 2-byte RC read-back follows them
+    cmdWithoutRc = (
+        0x060100,  # ModemFactoryReset
+    )
+
+    # decoders that keep state outside the decode cache key
+    cmdUncacheable = (
+        0x060105,  # ModemTest: sub-command selects the response decoder
+    )
@@ -0,0 +1,81 @@
+# Modem-E framing: RC status byte and trailing CRC
+# under Modem-E firmware every response is [RC, payload, CRC] and every write command
+# is followed by a 2-byte RC read-back, so the core decoder needs these to detect and
+# check Modem-E framing even before any 0x06xx command (and lr_modem_e) is loaded.
+
+rcDict = {
+    0x00: 'OK',
+    0x01: 'UNKNOWN',
+    0x02: 'NOT_IMPLEMENTED',
+    0x03: 'NOT_INITIALIZED',
+    0x04: 'INVALID',
+    0x05: 'BUSY',
+    0x06: 'FAIL',
+    0x08: 'BAD_CRC',
+    0x0A: 'BAD_SIZE',
+    0x0F: 'FRAME_ERROR',
+    0x10: 'NO_TIME',
+    0x12: 'NO_EVENT',
+}
+
+def _rc(ba_miso):
+    return 'RC=' + rcDict.get(ba_miso[0], hex(ba_miso[0]) + '?')
+
+def _crc8_bitwise(init, data):
+    # modem_e_modem_compute_crc from modem_e_modem_hal.h (poly 0x65 reflected)
+    crc = init
+    for b in data:
+        extract = b
+        for _ in range(8):
+            s = (crc ^ extract) & 0x01
+            crc >>= 1
+            if s:
+                crc ^= 0x65
+            extract >>= 1
+    return crc
+
+# crcTable[crc ^ byte] is the CRC after one more byte
+crcTable = tuple(_crc8_bitwise(i, (0,)) for i in range(256))
+
+def crc8(init, data):
+    crc = init
+    for b in data:
+        crc = crcTable[crc ^ b]
+    return crc
+
+def crc_ok(data):
+    # data ends with its own CRC(0xFF, data[:-1]): one pass over the whole view, where
+    # prev trails crc by a byte, so it ends as the CRC of every byte but the last
+    crc = prev = 0xFF
+    for b in data:
+        prev = crc
+        crc = crcTable[crc ^ b]
+    return prev == data[-1]
+
+def modem_e_rc_crc_ok(ba_miso):
+    return len(ba_miso) >= 2 and ba_miso[1] == crcTable[0xFF ^ ba_miso[0]]
+
+def modem_e_rc_readback(hla):
+    # 2 dummy MOSI bytes after a write command; MISO = [RC, CRC(0xFF,[RC])]
+    rc = hla.ba_miso[0]
+    crc_expected = crcTable[0xFF ^ rc]
+    if rc == 0x00 and hla.ba_miso[1] == 0x00:
+        return 'ModemE RC read-back: no response'
+    hla.crc_check = hla.ba_miso[1] == crc_expected
+    if hla.crc_check:
+        return 'ModemE ' + _rc(hla.ba_miso)
+    return 'ModemE ' + _rc(hla.ba_miso) + f' [crc BAD: got 0x{hla.ba_miso[1]:02x} expected 0x{crc_expected:02x}]'
+
+def modem_e_resp_crc_note(hla):
+    # read responses end with CRC(0xFF, RC+data); flag when it doesn't validate
+    if len(hla.ba_miso) < 2:
+        return ''
+    hla.crc_check = crc_ok(hla.ba_miso)
+    if hla.crc_check:
+        return ''
+    return ' [crc BAD]'
+
+def modem_e_orphan_read(hla):
+    # all-zero-MOSI read that isn't paired with a decoded command: [RC, payload..., CRC]
+    return ('ModemE response (unpaired command) ' + _rc(hla.ba_miso) + ', '
+            + str(max(0, len(hla.ba_miso) - 2)) + ' payload bytes' + hla.modem_e_resp_crc_note())
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# offline decoding of several LR11xx radios sharing one SPI bus, one nSS each
+# a single pass over the capture hands each transaction to the analyzer of its chip
+# select, so every radio keeps its own decoder state and firmware setting, and the
+# output is one time-ordered stream: start <tab> end <tab> radio <tab> text.
+# the capture is either a CSV table export holding one SPI analyzer per chip select
+# (radios named by the analyzer's name column) or a raw binary export directory
+# (radios named by their nSS channel; see lr_raw.py).
+#
+#   python3 lr_multi.py capture.csv --radio 'LR1110=transceiver' --radio 'LR1121=modem-e'
+#   python3 lr_multi.py export_dir --radio 3=transceiver --radio 4=modem-e [--sclk 0 --mosi 1 --miso 2]
+
+import argparse
+import os
+import sys
+
+import spi_hla
+
+def parse_radio(spec):
+    # 'ID' or 'ID=FIRMWARE'
+    radio, _, firmware = spec.partition('=')
+    if firmware and firmware not in ('auto', 'modem-e', 'transceiver'):
+        raise argparse.ArgumentTypeError(f'{spec}: unknown firmware {firmware}')
+    return radio, firmware or None
+
+def raw_transactions(export, radios, sclk, mosi, miso, cpol=0, cpha=0, lsb_first=False):
+    # (radio, start, end, mosi, miso) of every nSS channel of a raw export, in time order.
+    # the radios' nSS windows are merged first, so the shared SCLK/MOSI/MISO channels
+    # are read in one pass
+    import lr_raw  # needs numpy
+    np = lr_raw.np
+    clk, mo, mi = (lr_raw.RawChannel(lr_raw.channel_path(export, n)) for n in (sclk, mosi, miso))
+    windows = [lr_raw.nss_windows(lr_raw.RawChannel(lr_raw.channel_path(export, int(radio))))
+               for radio in radios]
+    starts = np.concatenate([w[0] for w in windows])
+    ends = np.concatenate([w[1] for w in windows])
+    tags = np.repeat(np.arange(len(radios)), [len(w[0]) for w in windows])
+    order = np.argsort(starts, kind='stable')
+    txns = lr_raw.window_transactions(clk, mo, mi, starts[order], ends[order], cpol, cpha, lsb_first)
+    return ((radios[i],) + txn for i, txn in zip(tags[order].tolist(), txns))
+
+def decode(txns, firmwares, default_firmware=None, typed=False):
+    # yield (radio, frame) for each (radio, start, end, mosi, miso); a radio missing
+    # from firmwares is decoded with default_firmware
+    analyzers = {}
+    for radio, start, end, mosi, miso in txns:
+        hla = analyzers.get(radio)
+        if hla is None:
+            hla = analyzers[radio] = spi_hla.new_hla(firmwares.get(radio) or default_firmware, typed)
+        yield radio, hla.decode_transaction(mosi, miso, start, end)
+
+def format_radio_frame(radio, frame):
+    return '%.9f\t%.9f\t%s\t%s\n' % (frame.start_time, frame.end_time, radio, spi_hla.frame_text(frame))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='decode several LR11xx radios on one SPI bus in one pass')
+    parser.add_argument('capture', help='CSV table export, or directory of a raw binary export')
+    parser.add_argument('--radio', action='append', type=parse_radio, default=[], metavar='ID[=FIRMWARE]',
+                        help='a radio: CSV analyzer name or raw nSS channel, and its firmware')
+    parser.add_argument('--firmware', choices=('auto', 'modem-e', 'transceiver'),
+                        help='firmware of radios without one, default $LR11XX_FIRMWARE or auto')
+    parser.add_argument('--typed', action='store_true',
+                        help="typed output: raw fields for the opcodes with typed result types")
+    parser.add_argument('--sclk', type=int, default=0, help='raw export: SCLK channel, default 0')
+    parser.add_argument('--mosi', type=int, default=1, help='raw export: MOSI channel, default 1')
+    parser.add_argument('--miso', type=int, default=2, help='raw export: MISO channel, default 2')
+    parser.add_argument('--cpol', type=int, choices=(0, 1), default=0, help='raw export: clock idle level')
+    parser.add_argument('--cpha', type=int, choices=(0, 1), default=0, help='raw export: clock phase')
+    parser.add_argument('--lsb-first', action='store_true', help='raw export: bytes are sent LSB first')
+    parser.add_argument('-o', '--output', help='write decoded transactions here instead of stdout')
+    args = parser.parse_args(argv)
+
+    firmwares = dict(args.radio)
+    src = None
+    if os.path.isdir(args.capture):
+        import lr_raw
+        if lr_raw.np is None:
+            parser.error('decoding raw exports needs numpy')
+        if not firmwares or not all(radio.isdigit() for radio in firmwares):
+            parser.error('a raw export needs --radio <nSS channel>[=firmware] for each radio')
+        txns = raw_transactions(args.capture, list(firmwares), args.sclk, args.mosi, args.miso,
+                                args.cpol, args.cpha, args.lsb_first)
+    else:
+        src = open(args.capture, newline='')
+        txns = spi_hla.read_csv_radio_transactions(src)
+        if firmwares:
+            txns = (txn for txn in txns if txn[0] in firmwares)
+    dst = sys.stdout if args.output is None else open(args.output, 'w')
+    try:
+        dst.writelines(format_radio_frame(radio, frame)
+                       for radio, frame in decode(txns, firmwares, args.firmware, args.typed))
+    finally:
+        if src is not None:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
+
+if __name__ == '__main__':
+    main()
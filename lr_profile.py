@@ -0,0 +1,111 @@
+# opt-in per-opcode profiling for Hla
+# enabled by the analyzer's 'profile' setting or LR11XX_PROFILE=on.  install()
+# shadows the instance's decodeTransfer, parseStatus and Modem-E frame helpers with
+# timing wrappers, so an analyzer without profiling runs the plain methods, and turns
+# off its decode cache, whose hits would skip the decoders.
+# each dispatch is recorded under the command or response decoder decodeTransfer
+# routed it to (Hla.dispatch), or the fallback path taken: calls, cumulative and max
+# wall time, bytes.
+# report() prints the table sorted by cumulative time; it runs at interpreter exit.
+
+import atexit
+import os
+import sys
+from time import perf_counter
+
+from lr_dispatch import (OpEntry, FALLBACK_UNKNOWN, FALLBACK_IRQ_READ, FALLBACK_ORPHAN_READ, FALLBACK_SHORT_READ,
+                         FALLBACK_RC_READBACK, FALLBACK_UNKNOWN_RESPONSE)
+
+fallbackNames = {
+    FALLBACK_UNKNOWN: 'fallback unknown command',
+    FALLBACK_IRQ_READ: 'fallback irq read',
+    FALLBACK_ORPHAN_READ: 'fallback modem-e orphan read',
+    FALLBACK_SHORT_READ: 'fallback short read',
+    FALLBACK_RC_READBACK: 'modem-e rc read-back',
+    FALLBACK_UNKNOWN_RESPONSE: 'fallback unknown response',
+}
+
+# Hla's lr_modem_e_frame helpers counted while profiling
+helperNames = ('modem_e_rc_crc_ok', 'modem_e_resp_crc_note', 'modem_e_rc_readback', 'modem_e_orphan_read',
+               'modem_e_crc_ok')
+
+profilers = []
+
+def profile_enabled(value):
+    # value: the 'profile' setting, or None outside Logic 2
+    if not isinstance(value, str):
+        value = os.environ.get('LR11XX_PROFILE', 'off')
+    return value.lower() in ('on', '1', 'yes')
+
+class Profiler:
+    __slots__ = ('stats',)
+
+    def __init__(self):
+        self.stats = {}  # name -> [calls, total seconds, max seconds, bytes]
+
+    def add(self, name, elapsed, nbytes):
+        s = self.stats.get(name)
+        if s is None:
+            self.stats[name] = [1, elapsed, elapsed, nbytes]
+            return
+        s[0] += 1
+        s[1] += elapsed
+        if elapsed > s[2]:
+            s[2] = elapsed
+        s[3] += nbytes
+
+    def report(self, file=None):
+        file = file or sys.stderr
+        print('%-44s %9s %11s %9s %9s %10s' % ('decoder', 'calls', 'total ms', 'mean us', 'max us', 'bytes'), file=file)
+        for name, (calls, total, peak, nbytes) in sorted(self.stats.items(), key=lambda kv: -kv[1][1]):
+            print('%-44s %9d %11.3f %9.2f %9.2f %10d' % (
+                name, calls, total * 1e3, total / calls * 1e6, peak * 1e6, nbytes), file=file)
+
+def _dispatch_name(dispatch):
+    # Hla.dispatch: an OpEntry (command), a response decoder, or FALLBACK_*
+    if dispatch is None:
+        return 'decodeTransfer error'  # raised before routing
+    if dispatch.__class__ is int:
+        return fallbackNames[dispatch]
+    if dispatch.__class__ is OpEntry:
+        return 'command ' + dispatch.name
+    return 'response ' + dispatch.__name__
+
+def _timed(profiler, name, func):
+    add = profiler.add
+
+    def wrapper(*args):
+        t0 = perf_counter()
+        try:
+            return func(*args)
+        finally:
+            add(name, perf_counter() - t0, 0)
+    return wrapper
+
+def install(hla):
+    profiler = Profiler()
+    decode_transfer = hla.decodeTransfer
+    add = profiler.add
+
+    def decodeTransfer(end_time):
+        hla.dispatch = None
+        t0 = perf_counter()
+        try:
+            return decode_transfer(end_time)
+        finally:
+            add(_dispatch_name(hla.dispatch), perf_counter() - t0, len(hla.ba_mosi))
+    hla.decodeTransfer = decodeTransfer
+    hla.parseStatus = _timed(profiler, 'parseStatus', hla.parseStatus)
+    for name in helperNames:
+        setattr(hla, name, _timed(profiler, name, getattr(hla, name)))
+    hla.decode_cache = None  # every transaction reaches its decoder
+    if not profilers:
+        atexit.register(report)
+    profilers.append(profiler)
+    return profiler
+
+def report(file=None):
+    # every profiled analyzer's table
+    for i, profiler in enumerate(profilers):
+        print(f'LR11xx decoder profile, analyzer {i}', file=file or sys.stderr)
+        profiler.report(file)
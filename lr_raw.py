@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# offline decoding of Logic 2 raw digital binary exports, without Logic 2 or its SPI
+# analyzer.  each channel of the export (File -> Export Data -> Binary, one
+# digital_<n>.bin per channel) is memory-mapped as its array of transition times;
+# nSS edges bound the transactions, the SCLK sampling edges select the MOSI/MISO
+# bits, and whole bytes are packed with NumPy a block of transactions at a time, each
+# block closed once it holds BLOCK_EDGES SCLK transitions.
+# every transaction then goes through Hla.decode_transaction, so the output matches
+# spi_hla.py's.
+#
+#   python3 lr_raw.py export_dir [--sclk 0 --mosi 1 --miso 2 --nss 3] [--cpol 0 --cpha 0]
+#                     [--lsb-first] [-o decoded.txt] [--firmware modem-e]
+#
+# needs numpy.
+
+import argparse
+import os
+import struct
+import sys
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import spi_hla
+
+# Logic 2 binary export header: identifier, version, type, initial state,
+# begin time, end time, number of transitions; the float64 transition times follow
+rawHeader = struct.Struct('<8siiIddQ')
+RAW_DIGITAL = 0
+
+# SCLK transitions packed per NumPy pass; bounds the working set whatever the transaction
+# length.  a single longer transaction still gets a block of its own
+BLOCK_EDGES = 1 << 21
+
+class RawChannel:
+    __slots__ = ('initial', 'begin', 'end', 'times')
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            header = f.read(rawHeader.size)
+        if len(header) < rawHeader.size:
+            raise ValueError(f'{path}: not a Logic 2 digital binary export')
+        ident, version, kind, initial, begin, end, count = rawHeader.unpack(header)
+        if ident != b'<SALEAE>' or kind != RAW_DIGITAL:
+            raise ValueError(f'{path}: not a Logic 2 digital binary export')
+        self.initial = initial & 1
+        self.begin = begin
+        self.end = end
+        if count:
+            self.times = np.memmap(path, dtype='<f8', mode='r', offset=rawHeader.size, shape=(count,))
+        else:
+            self.times = np.empty(0, dtype='<f8')
+
+    def level(self, t):
+        # state of the channel at each time in t
+        return ((np.searchsorted(self.times, t, side='right') & 1) ^ self.initial).astype(np.uint8)
+
+    def edges(self, lo, hi, level):
+        # indices in [lo, hi) of the transitions that leave the channel at level
+        idx = np.arange(lo, hi)
+        return idx[(((idx + 1) & 1) ^ self.initial) == level]
+
+def nss_windows(nss):
+    # (starts, ends) of every nSS-low window
+    falls = nss.edges(0, len(nss.times), 0)
+    falls = falls[falls + 1 < len(nss.times)]  # drop a transaction still open at the end
+    return nss.times[falls], nss.times[falls + 1]
+
+def transactions(sclk, mosi, miso, nss, cpol=0, cpha=0, lsb_first=False):
+    # yield (start, end, mosi bytes, miso bytes) of every nSS-low window
+    starts, ends = nss_windows(nss)
+    return window_transactions(sclk, mosi, miso, starts, ends, cpol, cpha, lsb_first)
+
+def window_transactions(sclk, mosi, miso, starts_all, ends_all, cpol=0, cpha=0, lsb_first=False):
+    # yield (start, end, mosi bytes, miso bytes) of every window, in the order of
+    # starts_all (ascending).  a clock edge where windows overlap goes to the later one.
+    # SCLK transitions before each transaction's end: blocks are cut on these
+    clock_ends = np.maximum.accumulate(np.searchsorted(sclk.times, ends_all, side='left'))
+    # data is sampled on the leading clock edge for CPHA 0, the trailing one for CPHA 1;
+    # the leading edge is rising when the clock idles low (CPOL 0)
+    sample_level = 1 if cpol == cpha else 0
+    bitorder = 'little' if lsb_first else 'big'
+    k = 0
+    while k < len(starts_all):
+        lo = np.searchsorted(sclk.times, starts_all[k], side='right')
+        # the transactions whose clock edges all fit in BLOCK_EDGES transitions from lo
+        n = max(int(np.searchsorted(clock_ends, lo + BLOCK_EDGES, side='right')), k + 1)
+        starts = np.asarray(starts_all[k:n])
+        ends = np.asarray(ends_all[k:n])
+        hi = clock_ends[n - 1]
+        k = n
+        t = sclk.times[sclk.edges(lo, hi, sample_level)]
+        txn = np.searchsorted(starts, t, side='right') - 1
+        inside = (txn >= 0) & (t < ends[np.maximum(txn, 0)])
+        t = t[inside]
+        txn = txn[inside]
+        # whole bytes only: a transaction's trailing partial byte is dropped
+        counts = np.bincount(txn, minlength=len(starts))
+        first = np.cumsum(counts) - counts
+        nbytes = counts // 8
+        keep = (np.arange(len(t)) - first[txn]) < nbytes[txn] * 8
+        t = t[keep]
+        mosi_bytes = np.packbits(mosi.level(t), bitorder=bitorder).tobytes()
+        miso_bytes = np.packbits(miso.level(t), bitorder=bitorder).tobytes()
+        offsets = np.concatenate(([0], np.cumsum(nbytes))).tolist()
+        for i, (start, end) in enumerate(zip(starts.tolist(), ends.tolist())):
+            a = offsets[i]
+            b = offsets[i + 1]
+            yield start, end, mosi_bytes[a:b], miso_bytes[a:b]
+
+def channel_path(export, n):
+    return os.path.join(export, f'digital_{n}.bin')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='decode a Logic 2 raw digital binary export as LR11xx commands')
+    parser.add_argument('export', help='directory of the digital_<n>.bin channel files')
+    parser.add_argument('--sclk', type=int, default=0, help='SCLK channel, default 0')
+    parser.add_argument('--mosi', type=int, default=1, help='MOSI channel, default 1')
+    parser.add_argument('--miso', type=int, default=2, help='MISO channel, default 2')
+    parser.add_argument('--nss', type=int, default=3, help='nSS channel, default 3')
+    parser.add_argument('--cpol', type=int, choices=(0, 1), default=0, help='clock idle level, default 0')
+    parser.add_argument('--cpha', type=int, choices=(0, 1), default=0,
+                        help='0: sample on the leading clock edge (default), 1: on the trailing edge')
+    parser.add_argument('--lsb-first', action='store_true', help='bytes are sent LSB first')
+    parser.add_argument('-o', '--output', help='write decoded transactions here instead of stdout')
+    parser.add_argument('--firmware', choices=('auto', 'modem-e', 'transceiver'),
+                        help='LR11xx firmware, default $LR11XX_FIRMWARE or auto')
+    args = parser.parse_args(argv)
+    if np is None:
+        parser.error('decoding raw exports needs numpy')
+
+    sclk, mosi, miso, nss = (RawChannel(channel_path(args.export, n))
+                             for n in (args.sclk, args.mosi, args.miso, args.nss))
+    dst = sys.stdout if args.output is None else open(args.output, 'w')
+    try:
+        hla = spi_hla.new_hla(args.firmware)
+        txns = transactions(sclk, mosi, miso, nss, args.cpol, args.cpha, args.lsb_first)
+        dst.writelines(spi_hla.format_frame(fr) for fr in spi_hla.decode_transactions(hla, txns))
+    finally:
+        if dst is not sys.stdout:
+            dst.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+# declarative command/response schemas, compiled into decoder functions
+# a schema lists each opcode of a group with the fields its command and response
+# frames carry.  compile_schema turns it into Python source for one specialized
+# function per frame (same names and output as handwritten handlers), compiles it
+# once and caches the code object in __pycache__, keyed by a hash of the schema,
+# so later imports skip code generation and compile() entirely.
+#
+# schema = {
+#     'name': 'modem_e_bsp',        # cache file name
+#     'rc': '_rc',                  # response status helper appended as ' (...)', or None
+#     'request': ' (request)',      # text of a read command without fields
+#     'env': ('_rc', 'paSelDict'),  # names the generated code takes from the caller
+#     'ops': (
+#         {'opcode': 0x060005, 'name': 'BspSetRfOutput', 'kind': 'write',
+#          'fields': (('enum', 3, ' ', '', 'paSelDict'),)},
+#         {'opcode': 0x060008, 'name': 'BspGetXoscCapaTrimAB', 'kind': 'read',
+#          'response': (('hex8', 1, ' A=', ''), ('hex8', 2, ' B=', ''))},
+#         ...
+#     ),
+# }
+#
+# a field is (type, offset, prefix, suffix[, enum table name]); its text is
+# prefix + value + suffix.  types:
+#   u8 s8 u16 u32  decimal            hex8  hex() of one byte
+#   enum           table.get(byte, hex(byte) + '?')
+#   len            bytes from offset to the end of the frame (a command frame
+#                  always reaches its offset; a response may not and shows 0)
+# 'response_min': n makes the response fields optional: a shorter response shows
+# only the name and status.
+
+import hashlib
+import importlib.util
+import marshal
+import os
+import struct
+import sys
+
+# generated code reads multi-byte fields with these, bound into its namespace
+_unpackers = {
+    'u16': ('_u16', struct.Struct('>H').unpack_from),
+    'u32': ('_u32', struct.Struct('>I').unpack_from),
+}
+
+_widths = {'u8': 1, 's8': 1, 'hex8': 1, 'enum': 1, 'u16': 2, 'u32': 4}
+
+class CompiledSchema:
+    __slots__ = ('cmdDict', 'cmdResponseDict', 'cmdMinLen', 'cmdResponseMinLen')
+
+    def __init__(self):
+        self.cmdDict = {}
+        self.cmdResponseDict = {}
+        self.cmdMinLen = {}
+        self.cmdResponseMinLen = {}
+
+def _min_len(fields):
+    n = 0
+    for field in fields:
+        if field[0] != 'len':
+            n = max(n, field[1] + _widths[field[0]])
+    return n
+
+def _field_expr(field, var, clamp):
+    kind, offset = field[0], field[1]
+    if kind == 'u8':
+        return f'str(b[{offset}])'
+    if kind == 'hex8':
+        return f'hex(b[{offset}])'
+    if kind == 'len':
+        if clamp:
+            return f'str(max(0, len(b) - {offset}))'
+        return f'str(len(b) - {offset})'
+    if kind == 'enum':
+        return f"{field[4]}.get({var}, hex({var}) + '?')"
+    if kind == 's8':
+        return f'str({var} - 256 if {var} > 127 else {var})'
+    return f'str({_unpackers[kind][0]}(b, {offset})[0])'
+
+def _text(name, fields, lines, tail=(), clamp=False):
+    # lines gets the statements; returns the expression for the text
+    parts = [repr(name)]
+    for i, field in enumerate(fields):
+        var = f'v{i}'
+        if field[0] in ('enum', 's8'):
+            lines.append(f'    {var} = b[{field[1]}]')
+        if field[2]:
+            parts.append(repr(field[2]))
+        parts.append(_field_expr(field, var, clamp))
+        if field[3]:
+            parts.append(repr(field[3]))
+    parts.extend(tail)
+    # merge adjacent literals
+    merged = []
+    for part in parts:
+        if merged and part[0] in '\'"' and merged[-1][0] in '\'"':
+            merged[-1] = repr(eval(merged[-1]) + eval(part))
+        else:
+            merged.append(part)
+    return ' + '.join(merged)
+
+def generate(schema):
+    # Python source of every decoder in the schema
+    out = []
+    rc = schema.get('rc')
+    status = (repr(' ('), f'{rc}(b)', repr(')')) if rc else ()
+    for op in schema['ops']:
+        name = op['name']
+        fields = op.get('fields', ())
+        lines = [f'def {name}(self):']
+        if fields:
+            lines.append('    b = self.ba_mosi')
+        if op['kind'] == 'read':
+            lines.append('    self.state.next_transfer_response = 1')
+        if op['kind'] == 'read' and not fields:
+            lines.append(f"    return {repr(name + schema.get('request', ''))}")
+        else:
+            lines.append('    return ' + _text(name, fields, lines))
+        out.append('\n'.join(lines))
+        if op['kind'] != 'read':
+            continue
+        lines = [f'def Response{name}(self):', '    b = self.ba_miso']
+        if 'response_min' in op:
+            lines.append(f"    if len(b) < {op['response_min']}:")
+            lines.append('        return ' + _text(name, (), lines, status, True))
+        lines.append('    return ' + _text(name, op.get('response', ()), lines, status, True))
+        out.append('\n'.join(lines))
+    return '\n\n'.join(out) + '\n'
+
+def _cache_key(schema):
+    # the schema, this compiler and the bytecode format
+    h = hashlib.sha256()
+    h.update(repr(schema).encode())
+    with open(__file__, 'rb') as f:
+        h.update(f.read())
+    h.update(importlib.util.MAGIC_NUMBER)
+    return h.digest()[:16]
+
+def _cache_path(schema):
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), '__pycache__',
+                        f"lr_schema.{schema['name']}.{sys.implementation.cache_tag}.bin")
+
+def _load_code(schema):
+    key = _cache_key(schema)
+    path = _cache_path(schema)
+    try:
+        with open(path, 'rb') as f:
+            if f.read(16) == key:
+                return marshal.loads(f.read())
+    except (OSError, ValueError, EOFError, TypeError):
+        pass
+    code = compile(generate(schema), f"<schema {schema['name']}>", 'exec')
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f'{path}.{os.getpid()}'
+        with open(tmp, 'wb') as f:
+            f.write(key)
+            f.write(marshal.dumps(code))
+        os.replace(tmp, path)
+    except OSError:
+        pass  # read-only install: compile again next time
+    return code
+
+def compile_schema(schema, env):
+    # env: the caller's globals, providing the names listed in schema['env']
+    ns = {name: env[name] for name in schema.get('env', ())}
+    for helper, unpack in _unpackers.values():
+        ns[helper] = unpack
+    exec(_load_code(schema), ns)
+    compiled = CompiledSchema()
+    for op in schema['ops']:
+        opcode = op['opcode']
+        compiled.cmdDict[opcode] = ns[op['name']]
+        n = _min_len(op.get('fields', ()))
+        if n:
+            compiled.cmdMinLen[opcode] = n
+        if op['kind'] == 'read':
+            compiled.cmdResponseDict[opcode] = ns['Response' + op['name']]
+            if 'response_min' not in op:
+                n = _min_len(op.get('response', ()))
+                if n:
+                    compiled.cmdResponseMinLen[opcode] = n
+    return compiled
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# multiprocess decode of large captures
+# the capture is cut into shards of about --shard-size transactions, each cut made at
+# a command that restarts the host driver's sequence (Reboot, cold-start SetSleep,
+# BootloaderReboot, SetPacketType).  every shard decodes in a worker process, first
+# running the --warmup transactions before its cut to rebuild the short-lived state
+# (pending response reads, RC read-backs), and the shards are written back in order.
+# parsing the CSV costs more than decoding it, so for a file the cutting pass only
+# splits the lines and reads the first MOSI bytes of each transaction; each worker
+# parses its own byte range of the file.  stdin is parsed here and shipped to the
+# workers as transactions.
+#
+# Hla doesn't forget everything at those commands: the packet type and auto firmware
+# detection outlive them.  the cutting pass tracks both (the last SetPacketType, any
+# 0x06xx command) and seeds each shard with them, but that's a guess, so a shard is
+# speculative: it reports its state after warm-up, at every --check-every
+# transactions and after each SetPacketType, and if its start state differs from the
+# previous shard's end state it is re-decoded here from the right state until the
+# two agree again at a checkpoint.  the output is always identical to spi_hla.py's.
+#
+#   python3 lr_shard.py capture.csv [-o decoded.txt] [--firmware modem-e] [--jobs 16]
+
+import argparse
+import collections
+import csv
+import itertools
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import spi_hla
+from HighLevelAnalyzer import PacketType
+
+resetOpcodes = (
+    0x0118,  # Reboot
+    0x020e,  # SetPacketType
+    0x8005,  # BootloaderReboot
+)
+OP_SET_SLEEP = 0x011b
+
+def reset_boundary(mosi):
+    # a shard may start at this transaction
+    if len(mosi) < 3:
+        return False
+    op = mosi[0] << 8 | mosi[1]
+    if op == OP_SET_SLEEP:
+        return not mosi[2] & 1  # cold start: no retention
+    return op in resetOpcodes
+
+def next_seed(seed, mosi):
+    # (packet type, modem-e seen) after a transaction starting with mosi
+    if len(mosi) >= 3:
+        if mosi[0] == 0x02 and mosi[1] == 0x0e and mosi[2] <= PacketType.RTTOF.value:
+            return (mosi[2], seed[1])  # SetPacketType
+        if mosi[0] == 0x06:
+            return (seed[0], 1)
+    return seed
+
+def shards(txns, size, warmup):
+    # yield (warm-up transactions, transactions, (packet type, modem-e seen) guessed
+    # at the cut) of each shard
+    prev = collections.deque(maxlen=warmup)
+    cur = []
+    seed = shard_seed = (PacketType.NONE.value, 0)
+    for txn in txns:
+        mosi = txn[2]
+        if len(cur) >= size and reset_boundary(mosi):
+            yield list(prev), cur, shard_seed
+            prev.extend(cur[-warmup:] if warmup else ())
+            cur = []
+            shard_seed = seed
+        cur.append(txn)
+        seed = next_seed(seed, mosi)
+    if cur:
+        yield list(prev), cur, shard_seed
+
+def file_shards(path, size, warmup):
+    # the shards of a CSV file as byte ranges: yield (warm-up offset, warm-up
+    # transactions, shard offset, end offset, seed).  only the type column and the
+    # first three MOSI bytes of each transaction are read
+    with open(path, 'rb') as f:
+        header = f.readline()
+        cols = [h.strip().strip('"').lower() for h in next(csv.reader([header.decode()]))]
+        i_type = cols.index('type')
+        i_mosi = cols.index('mosi') if 'mosi' in cols else None
+        offset = len(header)
+        starts = collections.deque(maxlen=warmup)  # offsets of the last transactions
+        shard_off = warm_off = offset
+        nwarm = 0
+        shard_seed = seed = (PacketType.NONE.value, 0)
+        count = 0
+        txn_off = None  # offset of the open transaction's enable row
+        head = bytearray()
+        for line in f:
+            if b'"' in line:
+                fields = [field.encode() for field in next(csv.reader([line.decode()]), ())]
+            else:
+                fields = line.split(b',')
+            if len(fields) > i_type:
+                ftype = fields[i_type].strip().strip(b'"')
+                if ftype == b'enable':
+                    txn_off = offset
+                    head = bytearray()
+                elif ftype == b'result':
+                    if txn_off is not None and len(head) < 3 and i_mosi is not None and i_mosi < len(fields):
+                        value = fields[i_mosi].strip().strip(b'"')
+                        if value:
+                            head.append(int(value, 0) & 0xff)
+                elif ftype == b'disable' and txn_off is not None:
+                    if count >= size and reset_boundary(head):
+                        yield warm_off, nwarm, shard_off, txn_off, shard_seed
+                        shard_off = txn_off
+                        warm_off = starts[0] if starts else txn_off
+                        nwarm = len(starts)
+                        shard_seed = seed
+                        count = 0
+                    count += 1
+                    seed = next_seed(seed, head)
+                    if warmup:
+                        starts.append(txn_off)
+                    txn_off = None
+            offset += len(line)
+        if count:
+            yield warm_off, nwarm, shard_off, offset, shard_seed
+
+def read_range(path, start, end):
+    # the transactions of a CSV file's rows in bytes [start, end)
+    with open(path, 'rb') as f:
+        header = f.readline().decode()
+        f.seek(start)
+        rows = f.read(end - start).decode().splitlines(True)
+    return list(spi_hla.read_csv_transactions(itertools.chain((header,), rows)))
+
+def decode_shard(firmware, typed, warmup, txns, check_every, seed):
+    # worker: (start state, lines, {transactions decoded: state}, end state)
+    hla = spi_hla.new_hla(firmware, typed)
+    hla.state.pt = PacketType(seed[0])
+    hla.state.modem_e_seen = seed[1]
+    for _ in spi_hla.decode_transactions(hla, warmup):
+        pass
+    start = hla.get_state()
+    lines = []
+    checks = {}
+    for i, (txn, frame) in enumerate(zip(txns, spi_hla.decode_transactions(hla, txns)), 1):
+        lines.append(spi_hla.format_frame(frame))
+        if i % check_every == 0 or i == 1 or txn[2][:2] == b'\x02\x0e':
+            # the first: the cut command usually sets what the start state got wrong;
+            # SetPacketType: the packet type, the state a cold-start cut can't know, is set
+            checks[i] = hla.get_state()
+    return start, lines, checks, hla.get_state()
+
+def decode_file_shard(path, firmware, typed, warm_off, nwarm, off, end, check_every, seed):
+    # worker: decode_shard of the rows in bytes [off, end), after the nwarm
+    # transactions from warm_off
+    txns = read_range(path, warm_off, end)
+    return decode_shard(firmware, typed, txns[:nwarm], txns[nwarm:], check_every, seed)
+
+def repair(hla, st, txns, result):
+    # re-decode a shard from state st until it agrees with the worker's checkpoints
+    _, lines, checks, end = result
+    hla.set_state(st)
+    out = []
+    for i, frame in enumerate(spi_hla.decode_transactions(hla, txns), 1):
+        out.append(spi_hla.format_frame(frame))
+        if checks.get(i) == hla.get_state():
+            return out + lines[i:], end, i
+    return out, hla.get_state(), len(txns)
+
+def merge(submitted, jobs, firmware, typed, stats):
+    # yield the output lines of (shard transactions loader, future) in order,
+    # repairing the shards that started from the wrong state
+    hla = spi_hla.new_hla(firmware, typed)  # repairs run here
+    prev_end = hla.get_state()
+    pending = collections.deque()
+
+    def drain(keep):
+        nonlocal prev_end
+        while len(pending) > keep:
+            load, future = pending.popleft()
+            result = future.result()
+            if stats is not None:
+                stats['shards'] += 1
+            if result[0] == prev_end:
+                lines, prev_end = result[1], result[3]
+            else:
+                lines, prev_end, redone = repair(hla, prev_end, load(), result)
+                if stats is not None:
+                    stats['repaired'] += 1
+                    stats['redecoded'] += redone
+            yield from lines
+    for item in submitted:
+        pending.append(item)
+        yield from drain(2 * jobs)  # bounds the shards held in memory
+    yield from drain(0)
+
+def decode(txns, firmware=None, typed=False, jobs=None, size=20000, warmup=16, check_every=256, stats=None):
+    # yield the output lines of the whole capture, in order
+    jobs = jobs or os.cpu_count() or 1
+    with ProcessPoolExecutor(jobs) as pool:
+        submitted = ((lambda shard=shard: shard,
+                      pool.submit(decode_shard, firmware, typed, warm, shard, check_every, seed))
+                     for warm, shard, seed in shards(txns, size, warmup))
+        yield from merge(submitted, jobs, firmware, typed, stats)
+
+def decode_file(path, firmware=None, typed=False, jobs=None, size=20000, warmup=16, check_every=256, stats=None):
+    # decode() of a CSV file, each worker parsing its own shard
+    jobs = jobs or os.cpu_count() or 1
+    with ProcessPoolExecutor(jobs) as pool:
+        submitted = ((lambda off=off, end=end: read_range(path, off, end),
+                      pool.submit(decode_file_shard, path, firmware, typed, warm_off, nwarm, off, end,
+                                  check_every, seed))
+                     for warm_off, nwarm, off, end, seed in file_shards(path, size, warmup))
+        yield from merge(submitted, jobs, firmware, typed, stats)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='decode a Logic 2 SPI analyzer CSV export as LR11xx commands on all cores')
+    parser.add_argument('csv', help="SPI analyzer table export, '-' for stdin")
+    parser.add_argument('-o', '--output', help='write decoded transactions here instead of stdout')
+    parser.add_argument('--firmware', choices=('auto', 'modem-e', 'transceiver'),
+                        help='LR11xx firmware, default $LR11XX_FIRMWARE or auto')
+    parser.add_argument('--typed', action='store_true',
+                        help="typed output: raw fields for the opcodes with typed result types")
+    parser.add_argument('--jobs', type=int, help='worker processes, default one per core')
+    parser.add_argument('--shard-size', type=int, default=20000, help='minimum transactions per shard')
+    parser.add_argument('--warmup', type=int, default=16, help='transactions replayed before each shard')
+    parser.add_argument('--check-every', type=int, default=256, help='transactions between state checkpoints')
+    parser.add_argument('--stats', action='store_true', help='print shard and repair counts to stderr')
+    args = parser.parse_args(argv)
+
+    dst = sys.stdout if args.output is None else open(args.output, 'w')
+    stats = collections.Counter()
+    options = (args.firmware, args.typed, args.jobs, args.shard_size, args.warmup, args.check_every, stats)
+    try:
+        if args.csv == '-':
+            dst.writelines(decode(spi_hla.read_csv_transactions(sys.stdin), *options))
+        else:
+            dst.writelines(decode_file(args.csv, *options))
+        if args.stats:
+            print(f"{stats['shards']} shards, {stats['repaired']} repaired, "
+                  f"{stats['redecoded']} transactions re-decoded", file=sys.stderr)
+    finally:
+        if dst is not sys.stdout:
+            dst.close()
+
+if __name__ == '__main__':
+    main()
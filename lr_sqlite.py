@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# SQLite export of decoded LR11xx traffic
+# decodes CSV exports and appends them to one SQLite file, so a week of captures can
+# be queried with plain SQL without decoding them again:
+#   captures        one row per imported export
+#   commands        opcode -> group and decoder name, from every group's cmdDict
+#   kinds           transaction kind names (lr_store TXN_*)
+#   transactions    every transaction: times, kind, opcode, status bytes, bytes, text
+#   responses       response read -> the command transaction it answers
+#   irq_events      irq words read back (irq reads, GetStatus), with parseIrqs' names
+#   modem_e_events  ModemGetEvent responses: event, missed count, data
+# rows are inserted in batches of executemany, each batch its own transaction, and
+# the indexes (time, opcode) are created once the data is in.
+#
+#   python3 lr_sqlite.py capture.csv [more.csv ...] -o soak.db [--firmware auto]
+#
+#   SELECT t.start_time, t.text FROM transactions t JOIN commands c USING (opcode)
+#   WHERE c.name = 'SetRfFrequency' AND t.kind = 0 AND t.start_time BETWEEN 10 AND 20;
+
+import argparse
+import sqlite3
+import sys
+
+import spi_hla
+from lr_store import classify, TXN_COMMAND, TXN_RESPONSE, TXN_READ, TXN_WAKEUP
+from lr_index import registry
+
+BATCH_ROWS = 100000  # transactions per executemany batch and commit
+
+OP_GET_STATUS = 0x0100
+OP_MODEM_GET_EVENT = 0x060104
+RC_NO_EVENT = 0x12
+
+sqliteSchema = '''
+CREATE TABLE IF NOT EXISTS captures (
+    id INTEGER PRIMARY KEY, path TEXT, firmware TEXT, output TEXT, transactions INTEGER);
+CREATE TABLE IF NOT EXISTS commands (
+    opcode INTEGER PRIMARY KEY, grp INTEGER, name TEXT);
+CREATE TABLE IF NOT EXISTS kinds (
+    kind INTEGER PRIMARY KEY, name TEXT);
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY, capture INTEGER REFERENCES captures,
+    start_time REAL, end_time REAL, kind INTEGER REFERENCES kinds, opcode INTEGER,
+    stat1 INTEGER, stat2 INTEGER, modem_e INTEGER, mosi BLOB, miso BLOB, text TEXT);
+CREATE TABLE IF NOT EXISTS responses (
+    txn INTEGER PRIMARY KEY REFERENCES transactions, command_txn INTEGER REFERENCES transactions);
+CREATE TABLE IF NOT EXISTS irq_events (
+    txn INTEGER REFERENCES transactions, time REAL, irq_mask INTEGER, flags TEXT);
+CREATE TABLE IF NOT EXISTS modem_e_events (
+    txn INTEGER REFERENCES transactions, time REAL, event INTEGER, name TEXT, missed INTEGER, data INTEGER);
+'''
+
+sqliteIndexes = '''
+CREATE INDEX IF NOT EXISTS transactions_time ON transactions (start_time);
+CREATE INDEX IF NOT EXISTS transactions_opcode ON transactions (opcode, start_time);
+CREATE INDEX IF NOT EXISTS responses_command ON responses (command_txn);
+CREATE INDEX IF NOT EXISTS irq_events_time ON irq_events (time);
+CREATE INDEX IF NOT EXISTS modem_e_events_time ON modem_e_events (time);
+'''
+
+def connect(path):
+    db = sqlite3.connect(path)
+    db.execute('PRAGMA journal_mode = WAL')
+    db.execute('PRAGMA synchronous = OFF')  # a failed import is simply run again
+    db.executescript(sqliteSchema)
+    with db:
+        db.executemany('INSERT OR REPLACE INTO commands VALUES (?, ?, ?)',
+                       ((op, entry.group, entry.name) for op, entry in registry().items()))
+        db.executemany('INSERT OR REPLACE INTO kinds VALUES (?, ?)',
+                       ((TXN_COMMAND, 'command'), (TXN_RESPONSE, 'response'), (TXN_READ, 'read'),
+                        (TXN_WAKEUP, 'wakeup')))
+    return db
+
+def irq_word(kind, opcode, modem_e, miso):
+    # the irq word MISO[2:6] carries, or None: transceiver irq reads and GetStatus
+    if modem_e or len(miso) < 6:
+        return None
+    if kind == TXN_READ or (kind == TXN_COMMAND and opcode == OP_GET_STATUS):
+        return int.from_bytes(miso[2:6], 'big')
+    return None
+
+def import_capture(db, path, txns, hla):
+    # decode (start, end, mosi, miso) transactions into the tables; the number imported
+    from HighLevelAnalyzer import decodeIrqs
+    from lr_modem_e import eventDict
+    cur = db.execute('INSERT INTO captures (path, firmware, output) VALUES (?, ?, ?)',
+                     (path, hla.firmware_mode(), hla.output_mode()))
+    capture = cur.lastrowid
+    txn_id = db.execute('SELECT COALESCE(MAX(id), 0) FROM transactions').fetchone()[0]
+    first = txn_id + 1
+    last_command = {}  # opcode -> id of its latest command transaction
+    rows, responses, irqs, events = [], [], [], []
+
+    def flush():
+        with db:
+            db.executemany('INSERT INTO transactions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            db.executemany('INSERT INTO responses VALUES (?, ?)', responses)
+            db.executemany('INSERT INTO irq_events VALUES (?, ?, ?, ?)', irqs)
+            db.executemany('INSERT INTO modem_e_events VALUES (?, ?, ?, ?, ?, ?)', events)
+        for batch in (rows, responses, irqs, events):
+            batch.clear()
+
+    decode_transaction = hla.decode_transaction
+    for start, end, mosi, miso in txns:
+        txn_id += 1
+        kind, opcode = classify(hla.state, mosi)
+        text = spi_hla.frame_text(decode_transaction(mosi, miso, start, end))
+        modem_e = 1 if hla.modem_e_active() else 0
+        rows.append((txn_id, capture, start, end, kind, opcode, miso[0] if miso else None,
+                     miso[1] if len(miso) > 1 else None, modem_e, mosi, miso, text))
+        if kind == TXN_COMMAND:
+            last_command[opcode] = txn_id
+        elif kind == TXN_RESPONSE:
+            responses.append((txn_id, last_command.get(opcode)))
+            # the rows ResponseModemGetEvent decodes as an event, whatever the RC
+            if opcode == OP_MODEM_GET_EVENT and len(miso) >= 5 and miso[0] != RC_NO_EVENT:
+                ev = miso[1]
+                events.append((txn_id, start, ev, eventDict.get(ev), miso[2], miso[3] << 8 | miso[4]))
+        word = irq_word(kind, opcode, modem_e, miso)
+        if word:
+            irqs.append((txn_id, start, word, decodeIrqs(word)[0].strip()))
+        if len(rows) >= BATCH_ROWS:
+            flush()
+    flush()
+    with db:
+        db.execute('UPDATE captures SET transactions = ? WHERE id = ?', (txn_id - first + 1, capture))
+    return txn_id - first + 1
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='export decoded LR11xx captures to SQLite')
+    parser.add_argument('csv', nargs='+', help='SPI analyzer table exports')
+    parser.add_argument('-o', '--output', required=True, help='SQLite file, created or appended to')
+    parser.add_argument('--firmware', choices=('auto', 'modem-e', 'transceiver'),
+                        help='LR11xx firmware, default $LR11XX_FIRMWARE or auto')
+    parser.add_argument('--typed', action='store_true',
+                        help="typed output: raw fields for the opcodes with typed result types")
+    args = parser.parse_args(argv)
+
+    db = connect(args.output)
+    try:
+        for path in args.csv:
+            with open(path, newline='') as src:
+                n = import_capture(db, path, spi_hla.read_csv_transactions(src),
+                                   spi_hla.new_hla(args.firmware, args.typed))
+            print(f'{path}: {n} transactions', file=sys.stderr)
+        db.executescript(sqliteIndexes)
+    finally:
+        db.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
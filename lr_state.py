@@ -0,0 +1,42 @@
+# per-analyzer decoder state
+# everything one transaction leaves for the ones after it lives in the analyzer's
+# DecodeState (hla.state): the group decoders are unbound functions called with the
+# Hla as self, and they keep their state there too, never on a module or a decoder
+# class.  so analyzers decoding side by side -- two radios on separate SPI buses in
+# one capture, captures decoded in threads -- never see each other's state.
+
+class DecodeState:
+    __slots__ = (
+        'pt',                      # PacketType, from SetPacketType / GetPacketType
+        'cmd_direct_read',         # opcode whose response the next transfer clocks out, 0: none
+        'next_transfer_response',  # the decoder just run expects a response read
+        'modem_e_rc_pending',      # a modem-e write command was sent; expect a 2-byte RC read-back
+        'modem_e_seen',            # any modem-e traffic decoded yet in this capture
+        'len',                     # length of the last command
+        # kept by a command for its response decoder only; cleared with cmd_direct_read
+        'wifi_result_format',      # WifiReadResults format, for its response
+        'wifi_result_count',
+        'ranging_result_type',     # GetRangingResult result type, for its response
+        'modem_e_test_sub',        # ModemTest sub-command, for its response
+    )
+
+    def __init__(self, pt):
+        self.pt = pt
+        self.cmd_direct_read = 0
+        self.next_transfer_response = 0
+        self.modem_e_rc_pending = 0
+        self.modem_e_seen = 0
+        self.len = 0
+        self.wifi_result_format = None
+        self.wifi_result_count = 0
+        self.ranging_result_type = None
+        self.modem_e_test_sub = None
+
+    def end_response(self):
+        # the pending response was read, or abandoned: forget what was kept for it, so
+        # the state after it doesn't depend on which responses came before
+        self.cmd_direct_read = 0
+        self.wifi_result_format = None
+        self.wifi_result_count = 0
+        self.ranging_result_type = None
+        self.modem_e_test_sub = None
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# columnar store of decoded transactions
+# one array per field instead of one object per transaction: start / end times
+# (float64), kind and flags (uint8), opcode (uint32), the two status bytes, and
+# offsets into two shared arenas, one holding every transaction's MOSI then MISO
+# bytes and one holding the decoded text.  about 50 bytes a transaction plus its bytes
+# and text, against several hundred for the frames and strings.
+# saved as one file: a header, a column directory, then each column 8-byte aligned,
+# so TransactionStore.open() maps the file and casts the columns in place -- reopening
+# a multi-hour capture costs nothing, whatever its size.
+#
+#   python3 lr_store.py build capture.csv -o capture.lrs [--firmware modem-e] [--typed]
+#   python3 lr_store.py dump capture.lrs [--start 12.5 --end 13]
+
+import argparse
+import bisect
+import mmap
+import struct
+import sys
+from array import array
+
+import spi_hla
+from lr_dispatch import opcode_key
+
+# transaction kinds
+TXN_COMMAND = 0   # command frame; opcode is its registry key
+TXN_RESPONSE = 1  # response read; opcode is the command it answers
+TXN_READ = 2      # MOSI 00 ... without a pending response: status / irq / RC read-back
+TXN_WAKEUP = 3    # nSS pulse with no bytes
+
+# flags
+FLAG_MODEM_E = 0x01  # decoded with Modem-E framing: MISO[0] is an RC, not stat1
+FLAG_CRC_CHECKED = 0x02  # the decoder checked the frame's Modem-E CRC (Hla.crc_check)
+FLAG_CRC_BAD = 0x04      # ... and it didn't match
+
+storeMagic = b'LR11STOR'
+STORE_VERSION = 2
+storeHeader = struct.Struct('<8sIIQ')     # magic, version, columns, transactions
+storeColumn = struct.Struct('<12sc3xQQ')  # name, array typecode, offset, bytes
+
+# name -> array typecode; the arenas are 'B'
+storeColumns = (
+    ('start', 'd'),
+    ('end', 'd'),
+    ('opcode', 'I'),
+    ('kind', 'B'),
+    ('flags', 'B'),
+    ('stat1', 'B'),
+    ('stat2', 'B'),
+    ('data_off', 'q'),  # MOSI at data[data_off:data_off + data_len], MISO right after
+    ('data_len', 'I'),
+    ('text_off', 'q'),  # UTF-8 decoded text at text[text_off:text_off + text_len]
+    ('text_len', 'I'),
+    ('data', 'B'),
+    ('text', 'B'),
+)
+
+def classify(state, mosi):
+    # (kind, opcode) of a transaction, from the decoder state before it is decoded
+    if not mosi:
+        return TXN_WAKEUP, 0
+    cmd = state.cmd_direct_read
+    if cmd and not ((cmd >> 16) == 0x06 and mosi[0] == 0x06):
+        return TXN_RESPONSE, cmd
+    if mosi[0] == 0:
+        return TXN_READ, 0
+    return TXN_COMMAND, opcode_key(mosi)
+
+class TransactionStore:
+    __slots__ = tuple(name for name, _ in storeColumns) + ('_map',)
+
+    def __init__(self):
+        for name, typecode in storeColumns:
+            setattr(self, name, array(typecode))
+        self._map = None
+
+    def __len__(self):
+        return len(self.start)
+
+    def append(self, start, end, kind, opcode, flags, mosi, miso, text):
+        self.start.append(start)
+        self.end.append(end)
+        self.opcode.append(opcode)
+        self.kind.append(kind)
+        self.flags.append(flags)
+        self.stat1.append(miso[0] if len(miso) > 0 else 0)
+        self.stat2.append(miso[1] if len(miso) > 1 else 0)
+        self.data_off.append(len(self.data))
+        self.data_len.append(len(mosi))
+        self.data.frombytes(mosi)
+        self.data.frombytes(miso)
+        encoded = text.encode()
+        self.text_off.append(len(self.text))
+        self.text_len.append(len(encoded))
+        self.text.frombytes(encoded)
+
+    def mosi(self, i):
+        off = self.data_off[i]
+        return bytes(self.data[off:off + self.data_len[i]])
+
+    def miso(self, i):
+        n = self.data_len[i]
+        off = self.data_off[i] + n
+        return bytes(self.data[off:off + n])
+
+    def text_at(self, i):
+        off = self.text_off[i]
+        return bytes(self.text[off:off + self.text_len[i]]).decode()
+
+    def span(self, start, end):
+        # index range of the transactions starting in [start, end)
+        return bisect.bisect_left(self.start, start), bisect.bisect_left(self.start, end)
+
+    def line(self, i):
+        # spi_hla.py output line of transaction i
+        return '%.9f\t%.9f\t%s\n' % (self.start[i], self.end[i], self.text_at(i))
+
+    def save(self, path):
+        cols = [(name, typecode, getattr(self, name)) for name, typecode in storeColumns]
+        offset = storeHeader.size + storeColumn.size * len(cols)
+        directory = []
+        for name, typecode, col in cols:
+            offset = (offset + 7) & ~7
+            nbytes = len(col) * col.itemsize
+            directory.append(storeColumn.pack(name.encode(), typecode.encode(), offset, nbytes))
+            offset += nbytes
+        with open(path, 'wb') as f:
+            f.write(storeHeader.pack(storeMagic, STORE_VERSION, len(cols), len(self)))
+            f.writelines(directory)
+            for (name, typecode, col), entry in zip(cols, directory):
+                f.write(bytes(storeColumn.unpack(entry)[2] - f.tell()))
+                f.write(col)
+
+    @classmethod
+    def open(cls, path):
+        # read-only store over the mapped file; the columns are memoryviews
+        with open(path, 'rb') as f:
+            m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, ncols, _ = storeHeader.unpack_from(m, 0)
+        if magic != storeMagic or version != STORE_VERSION:
+            raise ValueError(f'{path}: not an LR11xx transaction store')
+        store = cls.__new__(cls)
+        view = memoryview(m)
+        for k in range(ncols):
+            name, typecode, offset, nbytes = storeColumn.unpack_from(m, storeHeader.size + k * storeColumn.size)
+            setattr(store, name.rstrip(b'\0').decode(), view[offset:offset + nbytes].cast(typecode.decode()))
+        store._map = m
+        return store
+
+def decode_into(store, hla, txns):
+    # decode (start, end, mosi, miso) transactions, appending each to store
+    decode_transaction = hla.decode_transaction
+    for start, end, mosi, miso in txns:
+        kind, opcode = classify(hla.state, mosi)
+        frame = decode_transaction(mosi, miso, start, end)
+        flags = FLAG_MODEM_E if hla.modem_e_active() else 0
+        if hla.crc_check is not None:
+            flags |= FLAG_CRC_CHECKED if hla.crc_check else FLAG_CRC_CHECKED | FLAG_CRC_BAD
+        store.append(start, end, kind, opcode, flags, mosi, miso, spi_hla.frame_text(frame))
+    return store
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='columnar store of decoded LR11xx transactions')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    p = sub.add_parser('build', help='decode a CSV export into a store file')
+    p.add_argument('csv', help="SPI analyzer table export, '-' for stdin")
+    p.add_argument('-o', '--output', required=True, help='store file to write')
+    p.add_argument('--firmware', choices=('auto', 'modem-e', 'transceiver'),
+                   help='LR11xx firmware, default $LR11XX_FIRMWARE or auto')
+    p.add_argument('--typed', action='store_true',
+                   help="typed output: raw fields for the opcodes with typed result types")
+    p = sub.add_parser('dump', help='print stored transactions in spi_hla.py format')
+    p.add_argument('store', help='store file')
+    p.add_argument('--start', type=float, default=float('-inf'), help='window start, seconds')
+    p.add_argument('--end', type=float, default=float('inf'), help='window end, seconds')
+    args = parser.parse_args(argv)
+
+    if args.cmd == 'build':
+        src = sys.stdin if args.csv == '-' else open(args.csv, newline='')
+        try:
+            store = decode_into(TransactionStore(), spi_hla.new_hla(args.firmware, args.typed),
+                                spi_hla.read_csv_transactions(src))
+        finally:
+            if src is not sys.stdin:
+                src.close()
+        store.save(args.output)
+        print(f'{len(store)} transactions, {len(store.data)} data bytes, {len(store.text)} text bytes',
+              file=sys.stderr)
+        return 0
+    store = TransactionStore.open(args.store)
+    lo, hi = store.span(args.start, args.end)
+    sys.stdout.writelines(store.line(i) for i in range(lo, hi))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,115 @@
+# deterministic synthetic LR11xx SPI traffic, for benchmarks
+# every opcode of every decoder group is sent, with its matching response read for
+# read commands, interleaved with the status / irq polls real host drivers issue.
+# transceiver framing covers the system, radio, bootloader, wifi and gnss groups;
+# Modem-E framing covers system, radio and the 0x06xx groups, with command CRCs,
+# [RC, payload, CRC] responses and the RC read-back after each write.
+#
+#   txns = transactions(seed=1, modem_e=False, rounds=4)   # [(family, mosi, miso)]
+#   for frame in frames(txns): hla.decode(frame)
+
+import random
+
+from lr_dispatch import lazyGroups, GROUP_MODEM_E
+from lr_modem_e_frame import crc8
+
+# stat1 bytes a healthy chip returns: CMD_OK / CMD_DAT, with and without intActive
+stat1Ok = (0x04, 0x05, 0x06, 0x07)
+
+# transceiver status / irq polls: (family, mosi, miso)
+pollTxns = (
+    ('poll', b'\x00\x00\x00\x00\x00\x00', b'\x05\x00\x00\x00\x00\x0c'),  # irq read: RxDone TxDone
+    ('poll', b'\x01\x00\x00\x00\x00\x00', b'\x04\x02\x00\x00\x00\x00'),  # GetStatus
+)
+
+# leading command parameters / response payload bytes that must hold values real
+# firmware sends (enums the decoders index tables with)
+paramHints = {
+    0x0117: lambda r: bytes((r.randrange(8),)),         # SetTcxoMode: tune
+    0x020e: lambda r: bytes((r.choice((1, 2)),)),       # SetPacketType: FSK or LoRa
+    0x0211: lambda r: bytes((r.randrange(256), r.randrange(16))),  # SetTxParams: power, ramp time
+    0x0409: lambda r: _random_bytes(r, 4) + bytes((r.randrange(2),)),  # GnssAutonomous: gps time, effort
+    0x040a: lambda r: _random_bytes(r, 4) + bytes((r.randrange(2),)),  # GnssAssisted: gps time, effort
+}
+responseHints = {
+    0x0202: lambda r: bytes((r.choice((1, 2)),)),       # GetPacketType
+}
+
+def family(opcode):
+    # opcode family a benchmark reports on
+    if opcode > 0xffff:
+        return {0x0600: 'modem-e bsp', 0x0601: 'modem-e modem', 0x0602: 'modem-e lorawan',
+                0x0603: 'modem-e relay'}.get(opcode >> 8, 'modem-e')
+    return {0x01: 'system', 0x02: 'radio', 0x03: 'wifi', 0x04: 'gnss', 0x80: 'bootloader'}.get(opcode >> 8, 'other')
+
+def groups(modem_e):
+    # (decoder class, header length) of the groups the framing carries
+    from HighLevelAnalyzer import Hla
+    if modem_e:
+        first_bytes = (0x06,)
+    else:
+        first_bytes = (0x03, 0x04)
+    out = [(Hla, 2)]
+    for first in first_bytes:
+        module, cls, group = lazyGroups[first]
+        out.append((getattr(__import__(module), cls), 3 if group == GROUP_MODEM_E else 2))
+    return out
+
+def _longest(need):
+    # a min length keyed by PacketType: long enough for every packet type
+    if need.__class__ is dict:
+        return max(need.values(), default=0)
+    return need
+
+def _random_bytes(r, n):
+    return bytes(r.randrange(256) for _ in range(n))
+
+def transactions(seed=1, modem_e=False, rounds=4):
+    r = random.Random(seed)
+    out = []
+    tables = groups(modem_e)
+    for _ in range(rounds):
+        for cls, header_len in tables:
+            min_lens = getattr(cls, 'cmdMinLen', {})
+            resp_min_lens = getattr(cls, 'cmdResponseMinLen', {})
+            for opcode in sorted(cls.cmdDict):
+                fam = family(opcode)
+                mosi = opcode.to_bytes(header_len, 'big')
+                hint = paramHints.get(opcode)
+                if hint is not None:
+                    mosi += hint(r)
+                n = max(_longest(min_lens.get(opcode, 0)), len(mosi)) + r.randrange(4)
+                mosi += _random_bytes(r, n - len(mosi))
+                if modem_e:
+                    mosi += bytes((crc8(0xFF, mosi),))
+                    miso = bytes(len(mosi))
+                else:
+                    miso = bytes((r.choice(stat1Ok), r.randrange(256))) + bytes(len(mosi) - 2)
+                out.append((fam, mosi, miso))
+                if opcode in cls.cmdResponseDict:
+                    n = max(_longest(resp_min_lens.get(opcode, 0)), 4) + r.randrange(8)
+                    # [stat1, data] or, under Modem-E, [RC, data, CRC]
+                    miso = b'\x00' if modem_e else bytes((r.choice(stat1Ok),))
+                    hint = responseHints.get(opcode)
+                    if hint is not None:
+                        miso += hint(r)
+                    miso += _random_bytes(r, n - len(miso))
+                    if modem_e:
+                        miso += bytes((crc8(0xFF, miso),))
+                    out.append((fam, bytes(len(miso)), miso))
+                elif modem_e:
+                    out.append((fam, b'\x00\x00', bytes((0x00, crc8(0xFF, b'\x00')))))
+                if not modem_e and r.random() < 0.25:
+                    out.append(r.choice(pollTxns))
+    return out
+
+def frames(txns, start=0.0, period=0.001):
+    # the enable / result per byte / disable AnalyzerFrames of each transaction
+    from saleae.analyzers import AnalyzerFrame
+    t = start
+    for _, mosi, miso in txns:
+        yield AnalyzerFrame('enable', t, t)
+        for i in range(len(mosi)):
+            yield AnalyzerFrame('result', t, t, {'mosi': mosi[i:i + 1], 'miso': miso[i:i + 1]})
+        yield AnalyzerFrame('disable', t, t + period / 2)
+        t += period
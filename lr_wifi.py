@@ -1,3 +1,8 @@
+import struct
+from lr_fields import u16, u32
+
+# lr11xx_wifi_cumulative_timings_t, after stat1
+cumulTimingsLayout = struct.Struct('>4I')
 
 class LrWifi:
     def __init__(self):
@@ -7,12 +12,12 @@ class LrWifi:
         return 'wifi NBresults:' + str(self.ba_miso[1])
 
     def WifiGetNbResults(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'WifiGetNbResults'
 
     def ResponseWifiReadResults(self):
-        result_format = getattr(self, 'wifi_result_format', None)
-        result_count = getattr(self, 'wifi_result_count', 0)
+        result_format = self.state.wifi_result_format
+        result_count = self.state.wifi_result_count
 
         if result_format is None:
             return 'WifiReadResults response ' + str(len(self.ba_miso) - 1) + ' bytes'
@@ -52,8 +57,8 @@ class LrWifi:
         _str = "index:" + str(self.ba_mosi[2])
         _str = _str +  " NbResults:" + str(self.ba_mosi[3])
         _format = self.ba_mosi[4]
-        self.wifi_result_format = _format
-        self.wifi_result_count = self.ba_mosi[3]
+        self.state.wifi_result_format = _format
+        self.state.wifi_result_count = self.ba_mosi[3]
         _str = _str + ' format:'
         if _format == 1:
             _str = _str + "basic"
@@ -61,17 +66,14 @@ class LrWifi:
             _str = _str + "mac/type/ch"
         else:
             _str = _str + hex(_format)
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'WifiReadResults ' + _str
 
     def ResponseWifiReadCumulTimings(self):
         if len(self.ba_miso) < 17:  # Need stat1 + 16 bytes of data
             return 'WifiReadCumulTimings response (insufficient data)'
 
-        rx_detection_us = int.from_bytes(bytearray(self.ba_miso[1:5]), 'big')
-        rx_correlation_us = int.from_bytes(bytearray(self.ba_miso[5:9]), 'big')
-        rx_capture_us = int.from_bytes(bytearray(self.ba_miso[9:13]), 'big')
-        demodulation_us = int.from_bytes(bytearray(self.ba_miso[13:17]), 'big')
+        rx_detection_us, rx_correlation_us, rx_capture_us, demodulation_us = cumulTimingsLayout.unpack_from(self.ba_miso, 1)
 
         total_us = rx_detection_us + rx_correlation_us + rx_capture_us + demodulation_us
 
@@ -85,7 +87,7 @@ class LrWifi:
         return _str
 
     def WifiReadCumulTimings(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'WifiReadCumulTimings'
 
     def WifiScan(self):
@@ -103,11 +105,11 @@ class LrWifi:
         }
 
         signal_type = self.ba_mosi[2]
-        channels = int.from_bytes(bytearray(self.ba_mosi[3:5]), 'big')
+        channels = u16(self.ba_mosi, 3)
         scan_mode = self.ba_mosi[5]
         max_results = self.ba_mosi[6]
         nb_scan_per_channel = self.ba_mosi[7]
-        timeout_ms = int.from_bytes(bytearray(self.ba_mosi[8:10]), 'big')
+        timeout_ms = u16(self.ba_mosi, 8)
         abort_on_timeout = self.ba_mosi[10]
 
         # Decode channel mask
@@ -143,11 +145,11 @@ class LrWifi:
         }
 
         signal_type = self.ba_mosi[2]
-        channels = int.from_bytes(bytearray(self.ba_mosi[3:5]), 'big')
+        channels = u16(self.ba_mosi, 3)
         scan_mode = self.ba_mosi[5]
         max_results = self.ba_mosi[6]
-        timeout_per_channel_ms = int.from_bytes(bytearray(self.ba_mosi[7:9]), 'big')
-        timeout_per_scan_ms = int.from_bytes(bytearray(self.ba_mosi[9:11]), 'big')
+        timeout_per_channel_ms = u16(self.ba_mosi, 7)
+        timeout_per_scan_ms = u16(self.ba_mosi, 9)
 
         # Decode channel mask
         channel_list = []
@@ -167,10 +169,10 @@ class LrWifi:
         return _str
 
     def WifiCountryCode(self):
-        channels = int.from_bytes(bytearray(self.ba_mosi[2:4]), 'big')
+        channels = u16(self.ba_mosi, 2)
         max_results = self.ba_mosi[4]
         nb_scan_per_channel = self.ba_mosi[5]
-        timeout_ms = int.from_bytes(bytearray(self.ba_mosi[6:8]), 'big')
+        timeout_ms = u16(self.ba_mosi, 6)
         abort_on_timeout = self.ba_mosi[8]
 
         # Decode channel mask
@@ -190,10 +192,10 @@ class LrWifi:
         return _str
 
     def WifiCountryCodeTimeLimit(self):
-        channels = int.from_bytes(bytearray(self.ba_mosi[2:4]), 'big')
+        channels = u16(self.ba_mosi, 2)
         max_results = self.ba_mosi[4]
-        timeout_per_channel_ms = int.from_bytes(bytearray(self.ba_mosi[5:7]), 'big')
-        timeout_per_scan_ms = int.from_bytes(bytearray(self.ba_mosi[7:9]), 'big')
+        timeout_per_channel_ms = u16(self.ba_mosi, 5)
+        timeout_per_scan_ms = u16(self.ba_mosi, 7)
 
         # Decode channel mask
         channel_list = []
@@ -218,7 +220,7 @@ class LrWifi:
         return f'WifiGetNbCountryCodeResults nb={nb_results}'
 
     def WifiGetNbCountryCodeResults(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'WifiGetNbCountryCodeResults (request)'
 
     def ResponseWifiReadCountryCodeResults(self):
@@ -264,18 +266,25 @@ class LrWifi:
         0x0320: ResponseWifiReadVersion,
     }
 
+    # bytes a response decoder reads, status/RC byte included
+    cmdResponseMinLen = {
+        0x0305: 2, # WifiGetNbResults
+        0x0309: 2, # WifiGetNbCountryCodeResults
+        0x0320: 3, # WifiReadVersion
+    }
+
     def WifiReadCountryCodeResults(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         start_index = self.ba_mosi[2]
         nb_results = self.ba_mosi[3]
         return f'WifiReadCountryCodeResults index={start_index} nb={nb_results}'
 
     def WifiCfgTimestampAPphone(self):
-        ts = int.from_bytes(bytearray(self.ba_mosi[2:6]), 'big')
+        ts = u32(self.ba_mosi, 2)
         return 'WifiCfgTimestampAPphone ' + str(ts) + ' seconds'
 
     def WifiReadVersion(self):
-        self.next_transfer_response = 1
+        self.state.next_transfer_response = 1
         return 'WifiReadVersion (request)'
 
     cmdDict = {
@@ -292,3 +301,20 @@ class LrWifi:
         0x030b: WifiCfgTimestampAPphone, # LR11XX_WIFI_CONFIGURE_TIMESTAMP_AP_PHONE_OC
         0x0320: WifiReadVersion, # LR11XX_WIFI_GET_VERSION_OC
     }
+
+    # decoders that keep state outside the decode cache key
+    cmdUncacheable = (
+        0x0306,  # WifiReadResults: format and count select the response decoder
+    )
+
+    # bytes a command decoder reads, opcode included; a shorter frame is reported as
+    # truncated without running the decoder.  opcodes not listed need only the opcode
+    cmdMinLen = {
+        0x0300: 11, # WifiScan
+        0x0301: 11, # WifiScanTimeLimit
+        0x0302: 9, # WifiCountryCode
+        0x0303: 9, # WifiCountryCodeTimeLimit
+        0x0306: 5, # WifiReadResults
+        0x030a: 4, # WifiReadCountryCodeResults
+        0x030b: 6, # WifiCfgTimestampAPphone
+    }
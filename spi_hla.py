@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# offline decoding of LR11xx SPI captures, without Logic 2
+# reads a Logic 2 SPI analyzer CSV export (Data table -> Export Table), groups its
+# enable/result/disable frames into transactions and decodes each with
+# Hla.decode_transaction, writing one line per decoded transaction: start_time <tab> end_time <tab> match string
+#
+#   python3 spi_hla.py capture.csv [-o decoded.txt] [--firmware modem-e]
+#
+# every stage is a generator, so memory use does not depend on capture length.
+
+import argparse
+import csv
+import os
+import sys
+import types
+
+def _install_saleae_shim():
+    # stand-in for the saleae.analyzers module Logic 2 provides to extensions
+    try:
+        import saleae.analyzers
+        return
+    except ImportError:
+        pass
+
+    class HighLevelAnalyzer:
+        pass
+
+    class AnalyzerFrame:
+        __slots__ = ('type', 'start_time', 'end_time', 'data')
+
+        def __init__(self, type, start_time, end_time, data=None):
+            self.type = type
+            self.start_time = start_time
+            self.end_time = end_time
+            self.data = data if data is not None else {}
+
+    class _Setting:
+        def __init__(self, **kwargs):
+            self.__dict__.update(kwargs)
+
+    class StringSetting(_Setting):
+        pass
+
+    class NumberSetting(_Setting):
+        pass
+
+    class ChoicesSetting(_Setting):
+        def __init__(self, choices, **kwargs):
+            super().__init__(choices=choices, **kwargs)
+
+    saleae = types.ModuleType('saleae')
+    analyzers = types.ModuleType('saleae.analyzers')
+    for cls in (HighLevelAnalyzer, AnalyzerFrame, StringSetting, NumberSetting, ChoicesSetting):
+        cls.__module__ = 'saleae.analyzers'
+        setattr(analyzers, cls.__name__, cls)
+    saleae.analyzers = analyzers
+    sys.modules['saleae'] = saleae
+    sys.modules['saleae.analyzers'] = analyzers
+
+_install_saleae_shim()
+
+from saleae.analyzers import AnalyzerFrame
+from HighLevelAnalyzer import Hla
+
+def _byte(value):
+    # Logic 2 exports SPI words as '0x01' (hex display radix) or '1' (decimal)
+    value = value.strip()
+    if value == '':
+        return b''
+    return bytes((int(value, 0) & 0xff,))
+
+def read_csv(f):
+    # yield the AnalyzerFrames of a Logic 2 SPI analyzer table export
+    reader = csv.reader(f)
+    header = [h.strip().strip('"').lower() for h in next(reader)]
+    col = {name: i for i, name in enumerate(header)}
+    i_type = col['type']
+    i_start = col['start_time']
+    i_dur = col['duration']
+    i_mosi = col.get('mosi')
+    i_miso = col.get('miso')
+    for row in reader:
+        if not row:
+            continue
+        start = float(row[i_start])
+        end = start + float(row[i_dur])
+        ftype = row[i_type]
+        if ftype == 'result':
+            data = {
+                'mosi': _byte(row[i_mosi]) if i_mosi is not None else b'',
+                'miso': _byte(row[i_miso]) if i_miso is not None else b'',
+            }
+        else:
+            data = {}
+        yield AnalyzerFrame(ftype, start, end, data)
+
+def read_csv_transactions(f):
+    # yield (start, end, mosi, miso) of each nSS-bounded transaction of the export
+    start = None
+    mosi = bytearray()
+    miso = bytearray()
+    for frame in read_csv(f):
+        if frame.type == 'result':
+            mosi += frame.data['mosi']
+            miso += frame.data['miso']
+        elif frame.type == 'enable':
+            start = frame.start_time
+            mosi = bytearray()
+            miso = bytearray()
+        elif frame.type == 'disable' and start is not None:
+            yield start, frame.end_time, bytes(mosi), bytes(miso)
+            start = None
+
+def read_csv_radio_transactions(f):
+    # yield (analyzer name, start, end, mosi, miso) of each transaction of an export
+    # holding several SPI analyzers, one per chip select; the name column tells them apart
+    reader = csv.reader(f)
+    header = [h.strip().strip('"').lower() for h in next(reader)]
+    col = {name: i for i, name in enumerate(header)}
+    i_name = col['name']
+    i_type = col['type']
+    i_start = col['start_time']
+    i_dur = col['duration']
+    i_mosi = col.get('mosi')
+    i_miso = col.get('miso')
+    selected = {}  # analyzer name -> [start, mosi, miso] of its open transaction
+    for row in reader:
+        if not row:
+            continue
+        name = row[i_name]
+        ftype = row[i_type]
+        if ftype == 'result':
+            txn = selected.get(name)
+            if txn is not None:
+                if i_mosi is not None:
+                    txn[1] += _byte(row[i_mosi])
+                if i_miso is not None:
+                    txn[2] += _byte(row[i_miso])
+        elif ftype == 'enable':
+            selected[name] = [float(row[i_start]), bytearray(), bytearray()]
+        elif ftype == 'disable':
+            txn = selected.pop(name, None)
+            if txn is not None:
+                end = float(row[i_start]) + float(row[i_dur])
+                yield name, txn[0], end, bytes(txn[1]), bytes(txn[2])
+
+def decode_transactions(hla, txns):
+    # whole transactions through Hla.decode_transaction, one call each
+    decode_transaction = hla.decode_transaction
+    if hla.coalesce_mode() != 'on':
+        for start, end, mosi, miso in txns:
+            yield decode_transaction(mosi, miso, start, end)
+        return
+    coalesce_frame = hla.coalesce_frame
+    for start, end, mosi, miso in txns:
+        out = coalesce_frame(decode_transaction(mosi, miso, start, end))
+        if out is not None:
+            yield out
+    out = hla.flush()
+    if out is not None:
+        yield out
+
+def decode_frames(hla, frames):
+    # yield every frame the analyzer emits
+    for frame in frames:
+        out = hla.decode(frame)
+        if out is None:
+            continue
+        if isinstance(out, list):
+            yield from out
+        else:
+            yield out
+
+def frame_text(frame):
+    if frame.type != 'match':
+        # typed output: result type, then the raw fields
+        return ' '.join([frame.type] + ['%s=%s' % kv for kv in frame.data.items()])
+    return frame.data.get('string', '')
+
+def format_frame(frame):
+    return '%.9f\t%.9f\t%s\n' % (frame.start_time, frame.end_time, frame_text(frame))
+
+def new_hla(firmware=None, typed=False, coalesce=False, cache=False):
+    # settings are attributes set before __init__ runs, as Logic 2 sets them
+    hla = Hla.__new__(Hla)
+    if firmware is not None:
+        hla.firmware = firmware
+    if typed:
+        hla.output = 'typed'
+    if coalesce:
+        hla.coalesce = 'on'
+    if cache:
+        hla.cache = 'on'
+    hla.__init__()
+    return hla
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='decode a Logic 2 SPI analyzer CSV export as LR11xx commands')
+    parser.add_argument('csv', help="SPI analyzer table export, '-' for stdin")
+    parser.add_argument('-o', '--output', help='write decoded transactions here instead of stdout')
+    parser.add_argument('--firmware', choices=('auto', 'modem-e', 'transceiver'),
+                        help='LR11xx firmware, default $LR11XX_FIRMWARE or auto')
+    parser.add_argument('--typed', action='store_true',
+                        help="typed output: raw fields for the opcodes with typed result types")
+    parser.add_argument('--coalesce', action='store_true',
+                        help='merge runs of identical results into one line with a repeat count')
+    parser.add_argument('--profile', action='store_true',
+                        help='print per-opcode decode times to stderr when done')
+    parser.add_argument('--stats', action='store_true',
+                        help='turn the decode cache on, unless $LR11XX_DECODE_CACHE says otherwise, '
+                             'and print its hits/misses to stderr')
+    args = parser.parse_args(argv)
+
+    src = sys.stdin if args.csv == '-' else open(args.csv, newline='')
+    dst = sys.stdout if args.output is None else open(args.output, 'w')
+    try:
+        if args.profile:
+            os.environ['LR11XX_PROFILE'] = 'on'
+        cache = args.stats and 'LR11XX_DECODE_CACHE' not in os.environ
+        hla = new_hla(args.firmware, args.typed, args.coalesce, cache)
+        dst.writelines(format_frame(fr) for fr in decode_transactions(hla, read_csv_transactions(src)))
+        if args.stats:
+            cache = hla.decode_cache
+            if cache is None:
+                # LR11XX_DECODE_CACHE=off, or --profile, which decodes every transaction
+                print('decode cache: off', file=sys.stderr)
+            else:
+                print(f'decode cache: {cache.hits} hits, {cache.misses} misses, {len(cache)} entries',
+                      file=sys.stderr)
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+# lr_checkpoint: a window decoded from the checkpoint before it must give the
+# spi_hla.decode_transactions lines of the whole stream's transactions in that window,
+# after the index has been through its JSON file
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import spi_hla
+import lr_checkpoint
+from lr_corpus import corpusDir, corpusStreams
+
+def csv_path(name):
+    return os.path.join(corpusDir, name + '.csv')
+
+def serial(name, typed):
+    with open(csv_path(name), newline='') as f:
+        txns = list(spi_hla.read_csv_transactions(f))
+    hla = spi_hla.new_hla(corpusStreams[name], typed)
+    return [(txn[0], spi_hla.format_frame(fr)) for txn, fr in zip(txns, spi_hla.decode_transactions(hla, txns))]
+
+def saved(index):
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, 'capture.ckpt')
+        lr_checkpoint.save(index, path)
+        return lr_checkpoint.load(path)
+
+class CheckpointWindowTest(unittest.TestCase):
+    def test_windows(self):
+        for name in corpusStreams:
+            for typed in (False, True):
+                with self.subTest(stream=name, typed=typed):
+                    decoded = serial(name, typed)
+                    index = saved(lr_checkpoint.build(csv_path(name), corpusStreams[name], typed, every=5))
+                    self.assertEqual(len(index['checkpoints']), len(decoded) // 5 + 1)
+                    starts = [t for t, _ in decoded]
+                    # windows of a few transactions, starting on and off checkpoints
+                    for i in range(0, len(starts), 3):
+                        start, end = starts[i], starts[min(i + 7, len(starts) - 1)]
+                        expected = [line for t, line in decoded if start <= t < end]
+                        lines = list(lr_checkpoint.window(index, csv_path(name), start, end))
+                        self.assertEqual(lines, expected, (start, end))
+
+    def test_whole_capture(self):
+        name = 'modem_e'
+        index = lr_checkpoint.build(csv_path(name), corpusStreams[name], every=4)
+        lines = list(lr_checkpoint.window(index, csv_path(name), float('-inf'), float('inf')))
+        self.assertEqual(lines, [line for _, line in serial(name, False)])
+
+if __name__ == '__main__':
+    unittest.main()
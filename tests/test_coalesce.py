@@ -0,0 +1,72 @@
+# coalesce through the Logic 2 path, Hla.decode() per frame: a polling run must come
+# out without the offline harness's final Hla.flush(), once the bus has gone idle
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import spi_hla
+from saleae.analyzers import AnalyzerFrame
+
+POLL = (b'\x01\x00\x00\x00\x00\x00', b'\x04\x03\x00\x00\x00\x04')  # GetStatus, irq TxDone
+OTHER = (b'\x01\x00\x00\x00\x00\x00', b'\x04\x03\x00\x00\x00\x08')  # GetStatus, irq RxDone
+
+def transactions(*runs):
+    # (start, end, mosi, miso) of each (count, (mosi, miso), gap before the run) run,
+    # one transaction per millisecond
+    t = 0.0
+    out = []
+    for count, (mosi, miso), gap in runs:
+        t += gap
+        for _ in range(count):
+            out.append((t, t + 0.0005, mosi, miso))
+            t += 0.001
+    return out
+
+def frames(txns):
+    # the enable / result per byte / disable frames the SPI analyzer gives Logic 2
+    for start, end, mosi, miso in txns:
+        yield AnalyzerFrame('enable', start, start)
+        for i in range(len(mosi)):
+            yield AnalyzerFrame('result', start, start, {'mosi': mosi[i:i + 1], 'miso': miso[i:i + 1]})
+        yield AnalyzerFrame('disable', start, end)
+
+def logic2(txns):
+    # the lines Logic 2 shows: decode() only, no flush at the end
+    hla = spi_hla.new_hla('transceiver', coalesce=True)
+    return [spi_hla.format_frame(fr) for fr in spi_hla.decode_frames(hla, frames(txns))]
+
+def offline(txns):
+    hla = spi_hla.new_hla('transceiver', coalesce=True)
+    return [spi_hla.format_frame(fr) for fr in spi_hla.decode_transactions(hla, txns)]
+
+class CoalesceTest(unittest.TestCase):
+    def test_run_before_idle_bus(self):
+        # the polling run ends when the next transaction starts after a gap, even
+        # though that transaction repeats it; only the run after the gap stays held
+        txns = transactions((5, POLL, 0), (2, POLL, 0.5))
+        lines = logic2(txns)
+        self.assertEqual(len(lines), 1)
+        self.assertTrue(lines[0].endswith(' [x5]\n'))
+        self.assertEqual(lines, offline(txns)[:1])
+
+    def test_short_run(self):
+        # a run well under coalesceMaxRepeat / coalesceMaxSpan doesn't wait for a
+        # different result
+        txns = transactions((3, POLL, 0), (1, OTHER, 0.5), (4, OTHER, 0), (1, POLL, 0.5))
+        lines = logic2(txns)
+        self.assertEqual(lines, offline(txns)[:2])
+        self.assertTrue(lines[0].endswith(' [x3]\n'))
+        self.assertTrue(lines[1].endswith(' [x5]\n'))
+
+    def test_error_frame(self):
+        txns = transactions((3, POLL, 0))
+        hla = spi_hla.new_hla('transceiver', coalesce=True)
+        self.assertEqual(list(spi_hla.decode_frames(hla, frames(txns))), [])
+        out = hla.decode(AnalyzerFrame('error', 1.0, 1.0))
+        self.assertEqual(spi_hla.format_frame(out), offline(txns)[0])
+
+if __name__ == '__main__':
+    unittest.main()
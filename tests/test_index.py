@@ -0,0 +1,91 @@
+# lr_index: queries over a stored corpus stream and its saved index must select the
+# transactions spi_hla.decode_transactions' lines and CRC verdicts say they should
+
+import os
+import re
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import spi_hla
+import lr_index
+import lr_store
+from lr_corpus import corpusDir, corpusStreams
+from lr_modem_e_frame import rcDict
+
+def csv_transactions(name):
+    with open(os.path.join(corpusDir, name + '.csv'), newline='') as f:
+        return list(spi_hla.read_csv_transactions(f))
+
+def corrupted(txns, mosi_at, miso_at):
+    # the transactions with the last MOSI byte of those at mosi_at and the last MISO
+    # byte of those at miso_at flipped: their Modem-E CRC no longer matches
+    out = []
+    for i, (start, end, mosi, miso) in enumerate(txns):
+        if i in mosi_at:
+            mosi = mosi[:-1] + bytes([mosi[-1] ^ 1])
+        if i in miso_at:
+            miso = miso[:-1] + bytes([miso[-1] ^ 1])
+        out.append((start, end, mosi, miso))
+    return out
+
+def serial(firmware, txns):
+    # (text, Hla.crc_check) of each transaction
+    hla = spi_hla.new_hla(firmware)
+    return [(spi_hla.frame_text(fr), hla.crc_check) for fr in spi_hla.decode_transactions(hla, txns)]
+
+class IndexQueryTest(unittest.TestCase):
+    def indexed(self, firmware, txns):
+        # the store of txns and its index, both through their files
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'capture.lrs')
+            lr_store.decode_into(lr_store.TransactionStore(), spi_hla.new_hla(firmware), txns).save(path)
+            store = lr_store.TransactionStore.open(path)
+            lr_index.save(lr_index.build(store), len(store), lr_index.index_path(path))
+            return store, lr_index.load(lr_index.index_path(path), len(store))
+
+    def check(self, firmware, txns, matches, **filters):
+        store, postings = self.indexed(firmware, txns)
+        decoded = serial(firmware, txns)
+        expected = [i for i, (txn, (text, crc)) in enumerate(zip(txns, decoded)) if matches(txn, text, crc)]
+        self.assertTrue(expected)
+        self.assertEqual(list(lr_index.query(store, postings, **filters)), expected)
+
+    def test_ops(self):
+        # a command and the response reads answering it
+        for name, op in (('modem_e', 'ModemGetEvent'), ('modem_e', 'LorawanGetDownlinkData'),
+                         ('transceiver_lora', 'GetRxBufferStatus'), ('transceiver_lora', 'SetRfFrequency')):
+            with self.subTest(stream=name, op=op):
+                self.check(corpusStreams[name], csv_transactions(name),
+                           lambda txn, text, crc: text.split()[0] == op, ops=lr_index.resolve_ops([op]))
+
+    def test_time_window(self):
+        txns = csv_transactions('transceiver_lora')
+        start, end = txns[20][0], txns[50][0]
+        self.check('transceiver', txns,
+                   lambda txn, text, crc: start <= txn[0] < end and text.startswith('ClearIrq'),
+                   ops=lr_index.resolve_ops(['ClearIrq']), start=start, end=end)
+        self.check('transceiver', txns, lambda txn, text, crc: start <= txn[0] < end, start=start, end=end)
+
+    def test_kind_status_rc_text(self):
+        txns = csv_transactions('transceiver_lora')
+        self.check('transceiver', txns, lambda txn, text, crc: not txn[2], kind=lr_store.TXN_WAKEUP)
+        self.check('transceiver', txns, lambda txn, text, crc: 'intActive' in text,
+                   kind=lr_store.TXN_READ, status=lr_index.status_codes('CMD_OK'))
+        self.check('transceiver', txns, lambda txn, text, crc: 'RxDone' in text, text=re.compile('RxDone'))
+        invalid = next(code for code, rc in rcDict.items() if rc == 'INVALID')
+        self.check('modem-e', csv_transactions('modem_e'), lambda txn, text, crc: 'RC=INVALID' in text, rc=invalid)
+
+    def test_crc(self):
+        # two bad command frames, a bad RC-only response and a bad ModemGetEvent response
+        txns = corrupted(csv_transactions('modem_e'), mosi_at=(5, 7), miso_at=(8, 22))
+        self.check('modem-e', txns, lambda txn, text, crc: 'crc BAD' in text, crc=False)
+        self.check('modem-e', txns, lambda txn, text, crc: crc is False, crc=False)
+        self.check('modem-e', txns, lambda txn, text, crc: crc is True, crc=True)
+        self.check('modem-e', txns, lambda txn, text, crc: crc is True and text.startswith('ModemGetEvent'),
+                   ops=lr_index.resolve_ops(['ModemGetEvent']), crc=True)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+# lr_multi: two corpus streams interleaved on one bus, each radio on its own chip
+# select, must decode per radio to what spi_hla.decode_transactions gives for that
+# radio's transactions alone, from a CSV with one analyzer per radio and from a raw
+# export with one nSS channel per radio
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import spi_hla
+import lr_multi
+import lr_raw
+from lr_corpus import corpusDir, corpusStreams
+from test_raw import csv_transactions, write_channel, write_export
+
+RADIOS = {'LR1110': 'transceiver_lora', 'LR1121': 'modem_e'}
+FIRMWARES = {radio: corpusStreams[name] for radio, name in RADIOS.items()}
+
+def interleaved():
+    # (radio, start, end, mosi, miso): the streams' transactions taken in turn and laid
+    # out one after the other, on times a CSV's %.9f columns give back exactly
+    streams = [[(radio,) + txn for txn in csv_transactions(name)] for radio, name in RADIOS.items()]
+    merged = [txn for turn in zip(*streams) for txn in turn]
+    for stream in streams:
+        merged += stream[len(merged) // len(streams):]
+    out = []
+    t = 0.001
+    for radio, start, end, mosi, miso in merged:
+        t0 = float('%.9f' % t)
+        out.append((radio, t0, t0 + float('%.9f' % (end - start)), mosi, miso))
+        t = out[-1][2] + 0.0002
+    return out
+
+def expected(txns):
+    # per radio, the lines of its transactions decoded alone
+    lines = {}
+    for radio, firmware in FIRMWARES.items():
+        own = [txn[1:] for txn in txns if txn[0] == radio]
+        hla = spi_hla.new_hla(firmware)
+        lines[radio] = [lr_multi.format_radio_frame(radio, fr) for fr in spi_hla.decode_transactions(hla, own)]
+    return lines
+
+def by_radio(frames):
+    lines = {radio: [] for radio in RADIOS}
+    for radio, frame in frames:
+        lines[radio].append(lr_multi.format_radio_frame(radio, frame))
+    return lines
+
+def write_csv(path, txns):
+    with open(path, 'w', newline='') as f:
+        f.write('name,type,start_time,duration,"mosi","miso"\n')
+        for radio, start, end, mosi, miso in txns:
+            f.write('"%s","enable",%.9f,0\n' % (radio, start))
+            for bm, bs in zip(mosi, miso):
+                f.write('"%s","result",%.9f,0.000001,0x%02X,0x%02X\n' % (radio, start, bm, bs))
+            f.write('"%s","disable",%.9f,%.9f\n' % (radio, start, end - start))
+
+class MultiRadioTest(unittest.TestCase):
+    def test_csv(self):
+        txns = interleaved()
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'capture.csv')
+            write_csv(path, txns)
+            with open(path, newline='') as f:
+                frames = list(lr_multi.decode(spi_hla.read_csv_radio_transactions(f), FIRMWARES))
+        self.assertEqual(by_radio(frames), expected(txns))
+
+    def test_default_firmware(self):
+        # a radio without a firmware of its own takes the default
+        txns = interleaved()
+        firmwares = {'LR1121': 'modem-e'}
+        frames = lr_multi.decode(txns, firmwares, default_firmware='transceiver')
+        self.assertEqual(by_radio(frames), expected(txns))
+
+    @unittest.skipIf(lr_raw.np is None, 'lr_raw needs numpy')
+    def test_raw(self):
+        # SCLK/MOSI/MISO on channels 0-2, the radios' nSS on 3 and 4
+        txns = interleaved()
+        channels = {radio: str(3 + i) for i, radio in enumerate(RADIOS)}
+        with tempfile.TemporaryDirectory() as export:
+            write_export(export, [txn[1:] for txn in txns], 0, 0, False)
+            for radio, channel in channels.items():
+                nss = [t for txn in txns if txn[0] == radio for t in txn[1:3]]
+                write_channel(lr_raw.channel_path(export, int(channel)), 1, nss)
+            raw = list(lr_multi.raw_transactions(export, list(channels.values()), 0, 1, 2))
+        names = {channel: radio for radio, channel in channels.items()}
+        frames = lr_multi.decode(((names[txn[0]],) + txn[1:] for txn in raw), FIRMWARES)
+        self.assertEqual(by_radio(frames), expected(txns))
+
+if __name__ == '__main__':
+    unittest.main()
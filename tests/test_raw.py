@@ -0,0 +1,99 @@
+# lr_raw: a corpus stream clocked out as Logic 2 raw digital channel files must decode
+# to what spi_hla.decode_transactions gives for the stream's CSV, in every SPI mode
+# and however the transactions are cut into NumPy blocks
+
+import os
+import struct
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import spi_hla
+import lr_raw
+from lr_corpus import corpusDir, corpusStreams
+
+STREAMS = ('transceiver_lora', 'modem_e')
+
+def csv_transactions(name):
+    with open(os.path.join(corpusDir, name + '.csv'), newline='') as f:
+        return list(spi_hla.read_csv_transactions(f))
+
+def write_channel(path, initial, times):
+    with open(path, 'wb') as f:
+        f.write(lr_raw.rawHeader.pack(b'<SALEAE>', 1, lr_raw.RAW_DIGITAL, initial, 0.0,
+                                      times[-1] if times else 0.0, len(times)))
+        f.write(struct.pack('<%dd' % len(times), *times))
+
+def write_export(export, txns, cpol, cpha, lsb_first):
+    # channels 0-3: SCLK, MOSI, MISO, nSS; each transaction's clock fits inside its
+    # nSS-low window, so the windows keep the CSV's start and end times
+    sclk, nss = [], []
+    data = {'mosi': [], 'miso': []}
+    level = {'mosi': 0, 'miso': 0}
+
+    def put(ch, t, bit):
+        if level[ch] != bit:
+            level[ch] = bit
+            data[ch].append(t)
+    for start, end, mosi, miso in txns:
+        nss += (start, end)
+        bit_time = (end - start) / (8 * len(mosi) + 2) if mosi else 0
+        t = start + bit_time / 2
+        for bm, bs in zip(mosi, miso):
+            for k in (range(8) if lsb_first else range(7, -1, -1)):
+                # data settles a quarter bit before the sampling edge
+                lead, trail = t + bit_time / 4, t + bit_time * 3 / 4
+                change = lead - bit_time / 8 if cpha == 0 else (lead + trail) / 2
+                put('mosi', change, bm >> k & 1)
+                put('miso', change, bs >> k & 1)
+                sclk += (lead, trail)
+                t += bit_time
+    write_channel(os.path.join(export, 'digital_0.bin'), cpol, sclk)
+    write_channel(os.path.join(export, 'digital_1.bin'), 0, data['mosi'])
+    write_channel(os.path.join(export, 'digital_2.bin'), 0, data['miso'])
+    write_channel(os.path.join(export, 'digital_3.bin'), 1, nss)
+
+def decode(name, txns):
+    hla = spi_hla.new_hla(corpusStreams[name])
+    return [spi_hla.format_frame(fr) for fr in spi_hla.decode_transactions(hla, txns)]
+
+@unittest.skipIf(lr_raw.np is None, 'lr_raw needs numpy')
+class RawDecodeTest(unittest.TestCase):
+    def raw_lines(self, name, txns, cpol=0, cpha=0, lsb_first=False):
+        with tempfile.TemporaryDirectory() as export:
+            write_export(export, txns, cpol, cpha, lsb_first)
+            channels = [lr_raw.RawChannel(lr_raw.channel_path(export, n)) for n in range(4)]
+            lines = decode(name, lr_raw.transactions(*channels, cpol, cpha, lsb_first))
+            del channels  # the memory maps, before the directory goes
+        return lines
+
+    def test_modes(self):
+        for name in STREAMS:
+            txns = csv_transactions(name)
+            expected = decode(name, txns)
+            for cpol in (0, 1):
+                for cpha in (0, 1):
+                    with self.subTest(stream=name, cpol=cpol, cpha=cpha):
+                        self.assertEqual(self.raw_lines(name, txns, cpol, cpha), expected)
+
+    def test_lsb_first(self):
+        name = STREAMS[0]
+        txns = csv_transactions(name)
+        self.assertEqual(self.raw_lines(name, txns, lsb_first=True), decode(name, txns))
+
+    def test_small_blocks(self):
+        # blocks of a few transactions, and transactions longer than a block
+        saved = lr_raw.BLOCK_EDGES
+        lr_raw.BLOCK_EDGES = 64
+        try:
+            for name in STREAMS:
+                txns = csv_transactions(name)
+                with self.subTest(stream=name):
+                    self.assertEqual(self.raw_lines(name, txns), decode(name, txns))
+        finally:
+            lr_raw.BLOCK_EDGES = saved
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+# lr_shard: decoding shard by shard in worker processes, from transactions or straight
+# from the CSV file, must give spi_hla.decode_transactions' lines for the whole
+# capture, also when a shard starts from the wrong state and has to be repaired
+
+import collections
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import spi_hla
+import lr_shard
+from lr_corpus import corpusDir, corpusStreams
+
+STREAMS = ('transceiver_lora', 'transceiver_fsk', 'bootloader')  # the ones with cuts
+
+def csv_path(name):
+    return os.path.join(corpusDir, name + '.csv')
+
+def csv_transactions(name):
+    with open(csv_path(name), newline='') as f:
+        return list(spi_hla.read_csv_transactions(f))
+
+def serial(firmware, txns):
+    hla = spi_hla.new_hla(firmware)
+    return [spi_hla.format_frame(fr) for fr in spi_hla.decode_transactions(hla, txns)]
+
+class ShardDecodeTest(unittest.TestCase):
+    # small shards and checkpoints so that the corpus streams get cut at all
+    options = dict(jobs=2, size=4, check_every=8)
+
+    def test_transactions(self):
+        # the transceiver streams back to back: a capture with several cuts
+        txns = []
+        t = 0.0
+        for name in STREAMS:
+            stream = csv_transactions(name)
+            txns += [(start + t, end + t, mosi, miso) for start, end, mosi, miso in stream]
+            t = txns[-1][1] + 1.0
+        expected = serial('transceiver', txns)
+        for warmup in (16, 0):
+            with self.subTest(warmup=warmup):
+                stats = collections.Counter()
+                lines = list(lr_shard.decode(txns, 'transceiver', warmup=warmup, stats=stats, **self.options))
+                self.assertEqual(lines, expected)
+                self.assertGreater(stats['shards'], len(STREAMS))
+
+    def test_file(self):
+        for name in STREAMS:
+            firmware = corpusStreams[name]
+            expected = serial(firmware, csv_transactions(name))
+            with self.subTest(stream=name):
+                lines = list(lr_shard.decode_file(csv_path(name), firmware, **self.options))
+                self.assertEqual(lines, expected)
+
+    def test_repair(self):
+        # no warm-up: the shard after a cut misses the state the transactions before
+        # it left, so merge() re-decodes it
+        name = STREAMS[0]
+        stats = collections.Counter()
+        lines = list(lr_shard.decode_file(csv_path(name), corpusStreams[name], warmup=0, stats=stats,
+                                          **self.options))
+        self.assertEqual(lines, serial(corpusStreams[name], csv_transactions(name)))
+        self.assertEqual(stats['repaired'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+# lr_sqlite: corpus streams imported into one database must give a transactions row
+# per transaction with spi_hla.decode_transactions' text, and response, irq and
+# ModemGetEvent rows that agree with the decoded lines
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import spi_hla
+import lr_sqlite
+from lr_corpus import corpusDir, corpusStreams
+
+STREAMS = ('transceiver_lora', 'modem_e')
+
+def csv_transactions(name):
+    with open(os.path.join(corpusDir, name + '.csv'), newline='') as f:
+        return list(spi_hla.read_csv_transactions(f))
+
+def serial(name, txns):
+    hla = spi_hla.new_hla(corpusStreams[name])
+    return [spi_hla.frame_text(fr) for fr in spi_hla.decode_transactions(hla, txns)]
+
+def responses(txns, texts):
+    # response read -> index of the command it answers: a read decoded under the name
+    # of the last command.  a bare Modem-E RC read-back is a read, not a response
+    out = {}
+    command = None
+    for i, ((_, _, mosi, _), text) in enumerate(zip(txns, texts)):
+        if mosi and mosi[0]:
+            command = i
+        elif mosi and command is not None:
+            if text.split()[0] == texts[command].split()[0]:
+                out[i] = command
+    return out
+
+class SqliteImportTest(unittest.TestCase):
+    def setUp(self):
+        self.db = lr_sqlite.connect(':memory:')
+        self.imported = {}
+        for name in STREAMS:
+            txns = csv_transactions(name)
+            n = lr_sqlite.import_capture(self.db, name, txns, spi_hla.new_hla(corpusStreams[name]))
+            self.assertEqual(n, len(txns))
+            self.imported[name] = txns
+
+    def tearDown(self):
+        self.db.close()
+
+    def rows(self, name):
+        # the capture's first transaction id, and its rows in order
+        capture, = self.db.execute('SELECT id FROM captures WHERE path = ?', (name,)).fetchone()
+        rows = self.db.execute('SELECT id, start_time, end_time, mosi, miso, text FROM transactions '
+                               'WHERE capture = ? ORDER BY id', (capture,)).fetchall()
+        return rows[0][0], rows
+
+    def test_transactions(self):
+        total = 0
+        for name, txns in self.imported.items():
+            with self.subTest(stream=name):
+                first, rows = self.rows(name)
+                count, = self.db.execute('SELECT transactions FROM captures WHERE path = ?', (name,)).fetchone()
+                self.assertEqual(count, len(txns))
+                self.assertEqual([row[1:5] for row in rows], txns)
+                self.assertEqual([row[5] for row in rows], serial(name, txns))
+                total += len(txns)
+        self.assertEqual(self.db.execute('SELECT COUNT(*) FROM transactions').fetchone()[0], total)
+
+    def test_responses(self):
+        for name, txns in self.imported.items():
+            with self.subTest(stream=name):
+                first, rows = self.rows(name)
+                linked = dict(self.db.execute('SELECT txn - ?, command_txn - ? FROM responses '
+                                              'WHERE txn BETWEEN ? AND ?', (first, first, first, rows[-1][0])))
+                self.assertEqual(linked, responses(txns, serial(name, txns)))
+
+    def test_irq_events(self):
+        name = 'transceiver_lora'
+        first, rows = self.rows(name)
+        texts = serial(name, self.imported[name])
+        expected = [(i, text.split(' (')[0].strip()) for i, text in enumerate(texts) if 'intActive' in text]
+        got = self.db.execute('SELECT txn - ?, flags FROM irq_events ORDER BY txn', (first,)).fetchall()
+        self.assertEqual(got, expected)
+
+    def test_modem_e_events(self):
+        name = 'modem_e'
+        first, rows = self.rows(name)
+        texts = serial(name, self.imported[name])
+        expected = [(i, text.split()[1]) for i, text in enumerate(texts)
+                    if text.startswith('ModemGetEvent') and '(request)' not in text and 'no event' not in text]
+        self.assertTrue(expected)
+        got = self.db.execute('SELECT txn - ?, name FROM modem_e_events ORDER BY txn', (first,)).fetchall()
+        self.assertEqual(got, expected)
+
+if __name__ == '__main__':
+    unittest.main()
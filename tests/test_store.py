@@ -0,0 +1,70 @@
+# lr_store: a corpus stream decoded into a TransactionStore, saved and opened again,
+# must hold spi_hla.decode_transactions' lines and each transaction's bytes and
+# columns unchanged
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import spi_hla
+import lr_store
+from lr_corpus import corpusDir, corpusStreams
+
+def csv_transactions(name):
+    with open(os.path.join(corpusDir, name + '.csv'), newline='') as f:
+        return list(spi_hla.read_csv_transactions(f))
+
+def serial(name, txns, typed=False):
+    hla = spi_hla.new_hla(corpusStreams[name], typed)
+    return [spi_hla.format_frame(fr) for fr in spi_hla.decode_transactions(hla, txns)]
+
+class StoreTest(unittest.TestCase):
+    def round_trip(self, store):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'capture.lrs')
+            store.save(path)
+            return lr_store.TransactionStore.open(path)
+
+    def test_round_trip(self):
+        for name in corpusStreams:
+            for typed in (False, True):
+                with self.subTest(stream=name, typed=typed):
+                    txns = csv_transactions(name)
+                    hla = spi_hla.new_hla(corpusStreams[name], typed)
+                    built = lr_store.decode_into(lr_store.TransactionStore(), hla, txns)
+                    opened = self.round_trip(built)
+                    self.assertEqual(len(opened), len(txns))
+                    for col, _ in lr_store.storeColumns:
+                        self.assertEqual(list(getattr(opened, col)), list(getattr(built, col)), col)
+                    lines = serial(name, txns, typed)
+                    self.assertEqual([opened.line(i) for i in range(len(opened))], lines)
+                    for i, (start, end, mosi, miso) in enumerate(txns):
+                        self.assertEqual((opened.start[i], opened.end[i]), (start, end))
+                        self.assertEqual((opened.mosi(i), opened.miso(i)), (mosi, miso))
+                        self.assertEqual(opened.stat1[i], miso[0] if miso else 0)
+                        self.assertEqual(opened.kind[i] == lr_store.TXN_WAKEUP, not mosi)
+
+    def test_span(self):
+        name = 'transceiver_lora'
+        txns = csv_transactions(name)
+        hla = spi_hla.new_hla(corpusStreams[name])
+        store = self.round_trip(lr_store.decode_into(lr_store.TransactionStore(), hla, txns))
+        lines = serial(name, txns)
+        start, end = txns[10][0], txns[30][0]
+        lo, hi = store.span(start, end)
+        self.assertEqual([store.line(i) for i in range(lo, hi)],
+                         [line for txn, line in zip(txns, lines) if start <= txn[0] < end])
+
+    def test_not_a_store(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'capture.csv')
+            with open(path, 'wb') as f:
+                f.write(b'name,type,start_time,duration\n' * 4)
+            with self.assertRaises(ValueError):
+                lr_store.TransactionStore.open(path)
+
+if __name__ == '__main__':
+    unittest.main()
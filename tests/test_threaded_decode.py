@@ -0,0 +1,65 @@
+# decode the corpus streams concurrently in a thread pool, one Hla per thread, and
+# check every stream still gives its expected output: analyzers must not share state
+
+import os
+import sys
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import spi_hla
+from lr_corpus import corpusDir, corpusStreams
+
+COPIES = 4  # decodes of each stream in flight at once
+
+def load(name):
+    # (frames, transactions, expected lines) of a corpus stream
+    path = os.path.join(corpusDir, name)
+    with open(path + '.csv', newline='') as f:
+        frames = list(spi_hla.read_csv(f))
+    with open(path + '.csv', newline='') as f:
+        txns = list(spi_hla.read_csv_transactions(f))
+    with open(path + '.expected') as f:
+        expected = f.readlines()
+    return frames, txns, expected
+
+def decode_frames(name, stream):
+    # the Logic 2 path: one decode() per frame
+    hla = spi_hla.new_hla(corpusStreams[name])
+    return [spi_hla.format_frame(fr) for fr in spi_hla.decode_frames(hla, stream[0])]
+
+def decode_transactions(name, stream):
+    # the offline path: one decode_transaction() per transaction
+    hla = spi_hla.new_hla(corpusStreams[name])
+    return [spi_hla.format_frame(fr) for fr in spi_hla.decode_transactions(hla, stream[1])]
+
+class ThreadedDecodeTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.streams = {name: load(name) for name in corpusStreams}
+
+    def setUp(self):
+        # switch threads every few bytecodes, so the decodes interleave mid-transaction
+        self.switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+
+    def tearDown(self):
+        sys.setswitchinterval(self.switch_interval)
+
+    def check(self, decode):
+        jobs = [name for name in self.streams for _ in range(COPIES)]
+        with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+            futures = [(name, pool.submit(decode, name, self.streams[name])) for name in jobs]
+            for name, future in futures:
+                with self.subTest(stream=name):
+                    self.assertEqual(future.result(), self.streams[name][2])
+
+    def test_frames(self):
+        self.check(decode_frames)
+
+    def test_transactions(self):
+        self.check(decode_transactions)
+
+if __name__ == '__main__':
+    unittest.main()